@@ -45,6 +45,41 @@ def mock_user():
     }
 
 
+@pytest.fixture
+def make_user():
+    """Factory for user profiles; defaults to a free plan on the platform API key."""
+    from datetime import datetime
+    from src.models.auth import UserProfile
+
+    def factory(user_id: str = "test-user-123", plan_type: str = "free", api_key: str = None) -> UserProfile:
+        return UserProfile(
+            id=user_id,
+            email=f"{user_id}@example.com",
+            plan_type=plan_type,
+            openai_api_key=api_key,
+            created_at=datetime.now(),
+            updated_at=datetime.now()
+        )
+
+    return factory
+
+
+@pytest.fixture
+def make_form_data():
+    """Factory for journey form data as the API receives it (camelCase)."""
+    def factory() -> dict:
+        return {
+            "title": "Test Journey",
+            "industry": "Technology",
+            "businessGoals": "Improve user onboarding",
+            "targetPersonas": ["Developers"],
+            "journeyPhases": ["Awareness", "Consideration", "Purchase"],
+            "additionalContext": "Testing context"
+        }
+
+    return factory
+
+
 @pytest.fixture
 def mock_journey_form_data():
     """Create mock journey form data for testing."""
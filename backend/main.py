@@ -14,8 +14,6 @@ from fastapi.responses import JSONResponse, FileResponse, Response
 from typing import List, Dict, Any, Optional, Callable
 import logging
 from dotenv import load_dotenv
-import aiofiles
-import uuid
 import json
 import traceback
 from io import BytesIO
@@ -31,11 +29,18 @@ try:
     from src.models.journey import JourneyFormData, Job, JourneyMap, JobStatus
     from src.services.job_manager import JobManager
     from src.services.usage_service import UsageService
+    from src.services.research_extraction import research_extraction_service
+    from src.services.llm_cache import llm_response_cache
+    from src.services.llm_client_pool import llm_client_pool
+    from src.services.rate_limiter import rate_limiter
+    from src.services.upload_service import upload_service
+    from src.services.upload_store import upload_store
     from src.routes.auth_routes import router as auth_router
     from src.routes.analytics_routes import router as analytics_router
     from src.routes import journey_routes
     from src.routes import export_routes
     from src.middleware.auth_middleware import require_auth
+    from src.middleware.upload_limit_middleware import UploadLimitMiddleware
     from src.models.auth import UserProfile, UserJourney, UsageLimitResponse
 
     # Initialize services
@@ -85,6 +90,11 @@ else:
     # In production, restrict to explicit domains
     ALLOWED_ORIGINS = PROD_ALLOWED_ORIGINS
 
+# Upload endpoints: refuse bodies over the upload cap before or while the multipart parser spools them
+UPLOAD_PATHS = ("/api/files/upload", "/api/journey/create")
+app.add_middleware(UploadLimitMiddleware, paths=UPLOAD_PATHS, service=upload_service)
+
+# Added after the upload check so CORS headers are also set on its 413 responses
 app.add_middleware(
     CORSMiddleware,
     allow_origins=ALLOWED_ORIGINS,
@@ -124,6 +134,9 @@ async def startup_event():
         else:
             logger.info("No in-progress journeys found to recover")
 
+        # Remove research uploads no journey needs any more
+        upload_store.start_gc()
+
         # Set dependencies for journey and export routes
         journey_routes.set_dependencies(job_manager, usage_service)
         export_routes.set_dependencies(job_manager)
@@ -149,6 +162,10 @@ async def shutdown_event():
                     job_manager.close()
             logger.info("Job manager shut down successfully")
         
+        research_extraction_service.shutdown()
+        upload_store.stop_gc()
+        await llm_client_pool.close_all()
+        
         # Add any other cleanup code here
         logger.info("Application shutdown complete")
     except Exception as e:
@@ -183,6 +200,26 @@ async def health_check_k8s():
     """Kubernetes-style health check endpoint"""
     return {"status": "ok"}
 
+@app.get("/health/jobs")
+async def job_manager_stats():
+    """Job scheduler and job cache statistics for monitoring"""
+    if not job_manager:
+        raise HTTPException(status_code=503, detail="Job manager not initialized")
+
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "scheduler": job_manager.get_scheduler_stats(),
+        "cache": job_manager.get_cache_stats(),
+        "progress_writes": job_manager.get_progress_write_stats(),
+        "research_extraction": research_extraction_service.get_stats(),
+        "llm_cache": llm_response_cache.get_stats(),
+        "llm_clients": llm_client_pool.get_stats(),
+        "rate_limits": rate_limiter.get_stats(),
+        "uploads": upload_service.get_stats(),
+        "upload_store": upload_store.get_stats(),
+        "token_usage": job_manager.get_token_usage_stats()
+    }
+
 # File upload endpoint
 @app.post("/api/files/upload")
 async def upload_files(
@@ -191,27 +228,18 @@ async def upload_files(
 ):
     """Upload research files for journey mapping"""
     try:
-        uploaded_files = []
-        upload_dir = "/tmp/uploads"
-        os.makedirs(upload_dir, exist_ok=True)
+        stored = await upload_service.save_all(files)
+        for upload in stored:
+            # Start text extraction now so the research step finds it ready
+            research_extraction_service.submit(upload.path)
         
-        for file in files:
-            # Generate unique filename
-            file_id = str(uuid.uuid4())
-            file_extension = os.path.splitext(file.filename)[1]
-            filename = f"{file_id}{file_extension}"
-            file_path = os.path.join(upload_dir, filename)
-            
-            # Save file
-            async with aiofiles.open(file_path, 'wb') as f:
-                content = await file.read()
-                await f.write(content)
-            
-            uploaded_files.append(file_path)
-            logger.info(f"Uploaded file: {file.filename} -> {file_path}")
-        
-        return {"uploaded_files": uploaded_files}
+        return {
+            "uploaded_files": [upload.content_id for upload in stored],
+            "files": [upload.to_dict() for upload in stored]
+        }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"File upload error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"File upload failed: {str(e)}")
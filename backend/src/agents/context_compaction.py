@@ -0,0 +1,168 @@
+import json
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+import logging
+from .output_parser import iter_json_spans
+
+logger = logging.getLogger(__name__)
+
+_encoder = None
+_encoder_failed = False
+
+# Chatty lines that carry no content for the next agent
+FILLER_PATTERN = re.compile(
+    r"^(certainly|sure|of course|absolutely|great|here is|here's|below is|i hope this|let me know|in conclusion)\b",
+    re.IGNORECASE
+)
+BULLET_PATTERN = re.compile(r"^\s*([-*•]|\d+[.)])\s+")
+HEADING_PATTERN = re.compile(r"^\s*(#+\s+|[A-Z][A-Z0-9 &/:-]{3,}:?$|\*\*[^*]+\*\*:?$)")
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens with tiktoken when its encoding is available, otherwise estimate ~4 characters per token"""
+    global _encoder, _encoder_failed
+    if _encoder is None and not _encoder_failed:
+        try:
+            import tiktoken
+            _encoder = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            _encoder_failed = True
+            logger.info(f"tiktoken encoding unavailable, estimating token counts: {e}")
+    if _encoder is not None:
+        return len(_encoder.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def _compact_prose(text: str) -> List[str]:
+    """Content lines of a prose block, without markdown noise, filler or repeated lines"""
+    lines: List[str] = []
+    seen = set()
+    for raw in text.splitlines():
+        if raw.strip().startswith("```"):
+            continue  # Code fence around a JSON block
+        line = re.sub(r"\*\*|__|`", "", raw).strip()
+        line = re.sub(r"\s+", " ", line)
+        line = re.sub(r"^#+\s*", "", line)
+        if not line or set(line) <= set("-=_*#|: ") or FILLER_PATTERN.match(line):
+            continue
+        key = line.lower()
+        if key in seen:
+            continue
+        seen.add(key)
+        lines.append(line)
+    return lines
+
+
+def compact_text(text: str) -> str:
+    """Reduce agent output to its content: headings, bullets and statements, without markdown noise.
+
+    Embedded JSON is minified onto one line instead, so structured agent
+    output stays valid for the steps that parse it.
+    """
+    lines: List[str] = []
+    position = 0
+    for start, end, value in iter_json_spans(text):
+        lines.extend(_compact_prose(text[position:start]))
+        lines.append(json.dumps(value, separators=(",", ":"), ensure_ascii=False))
+        position = end
+    lines.extend(_compact_prose(text[position:]))
+    return "\n".join(lines)
+
+
+def _line_score(line: str, index: int, total: int) -> float:
+    """Rank lines for extractive trimming: structure, figures and quotes first, early lines over late ones"""
+    score = 1.0 - index / max(total, 1) * 0.5
+    if HEADING_PATTERN.match(line) or line.endswith(":"):
+        score += 2.0
+    if BULLET_PATTERN.match(line):
+        score += 1.0
+    if re.search(r"\d", line):
+        score += 0.75
+    if '"' in line or "“" in line:
+        score += 0.75
+    return score
+
+
+def trim_to_budget(text: str, budget: int) -> str:
+    """Keep the highest-ranked lines, in their original order, within a token budget"""
+    if count_tokens(text) <= budget:
+        return text
+    lines = text.splitlines()
+    ranked = sorted(range(len(lines)), key=lambda i: _line_score(lines[i], i, len(lines)), reverse=True)
+    kept = set()
+    used = count_tokens("[...trimmed]")
+    for i in ranked:
+        cost = count_tokens(lines[i]) + 1
+        if used + cost > budget:
+            continue
+        kept.add(i)
+        used += cost
+    return "\n".join([lines[i] for i in sorted(kept)] + ["[...trimmed]"])
+
+
+def allocate_budget(sizes: Dict[str, int], budget: int) -> Dict[str, int]:
+    """Split a token budget across inputs; small inputs keep everything and leave their share to larger ones"""
+    allocation: Dict[str, int] = {}
+    remaining = budget
+    pending = sorted(sizes.items(), key=lambda item: item[1])
+    while pending:
+        share = remaining // len(pending)
+        name, size = pending.pop(0)
+        allocation[name] = min(size, share)
+        remaining -= allocation[name]
+    return allocation
+
+
+class ContextCompactor:
+    """Keeps the upstream context passed to each agent step within a token budget.
+
+    Every earlier step's output is first compacted to its structured content.
+    If the step's inputs still exceed STEP_CONTEXT_TOKEN_BUDGET, the budget is
+    shared between them and oversized inputs are trimmed extractively.
+    """
+
+    def __init__(self, step_budget: Optional[int] = None):
+        self.step_budget = step_budget if step_budget is not None else int(os.getenv("STEP_CONTEXT_TOKEN_BUDGET", "6000"))
+        self.degraded = False
+        self._compacted: Dict[Tuple[str, int], str] = {}  # (input name, hash) -> compacted text, reused by later steps
+
+    @property
+    def enabled(self) -> bool:
+        return self.step_budget > 0
+
+    def degrade(self):
+        """Halve the step budget once, for journeys close to their token budget"""
+        if self.enabled and not self.degraded:
+            self.step_budget = max(500, self.step_budget // 2)
+            self.degraded = True
+            logger.warning(f"Context budget reduced to {self.step_budget} tokens per step")
+
+    def _compact(self, name: str, text: str) -> str:
+        key = (name, hash(text))
+        if key not in self._compacted:
+            self._compacted[key] = compact_text(text)
+        return self._compacted[key]
+
+    def compact_inputs(self, step_name: str, inputs: Dict[str, str]) -> Dict[str, str]:
+        """Return the inputs compacted to fit the step budget, logging token counts before and after"""
+        if not self.enabled or not inputs:
+            return inputs
+
+        before = {name: count_tokens(text) for name, text in inputs.items()}
+        compacted = {name: self._compact(name, text) for name, text in inputs.items()}
+        sizes = {name: count_tokens(text) for name, text in compacted.items()}
+
+        if sum(sizes.values()) > self.step_budget:
+            allocation = allocate_budget(sizes, self.step_budget)
+            for name, limit in allocation.items():
+                if sizes[name] > limit:
+                    compacted[name] = trim_to_budget(compacted[name], limit)
+                    sizes[name] = count_tokens(compacted[name])
+
+        total_before, total_after = sum(before.values()), sum(sizes.values())
+        logger.info(
+            f"{step_name} context: {total_before} -> {total_after} tokens (budget {self.step_budget}); "
+            + ", ".join(f"{name} {before[name]}->{sizes[name]}" for name in inputs)
+        )
+        return compacted
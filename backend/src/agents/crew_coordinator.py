@@ -1,11 +1,15 @@
 import asyncio
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime
 from crewai import Crew
-from typing import Dict, Any, Callable, Optional
+from typing import Dict, Any, Awaitable, Callable, Optional, Tuple
 import json
 import logging
 import os
+import openai
 from ..models.auth import UserProfile
-from langchain_openai import ChatOpenAI
 from .context_agent import ContextAgent
 from .persona_agent import PersonaAgent
 from .journey_agent import JourneyAgent
@@ -14,11 +18,101 @@ from .quote_agent import QuoteAgent
 from .emotion_agent import EmotionAgent
 from .formatting_agent import FormattingAgent
 from .qa_agent import QAAgent
+from .workflow_graph import WorkflowGraph, WorkflowNode
+from .context_compaction import ContextCompactor, compact_text, count_tokens, trim_to_budget
+from ..services.research_extraction import research_extraction_service
+from ..services.llm_cache import llm_response_cache, make_cache_key
+from ..services.token_ledger import TokenLedger
+from ..services.llm_client_pool import llm_client_pool
+from .output_parser import parse_journey_output
+from .fast_pipeline import StructuredTask, build_journey_map, journey_task, profile_task, research_task
 
 logger = logging.getLogger(__name__)
 
+
+@dataclass(frozen=True)
+class WorkflowStep:
+    number: int
+    key: str  # Name of the step output, also used as its checkpoint key
+    name: str
+    start_message: str
+    running_message: str
+    processing_message: str
+    completed_message: str
+
+
+WORKFLOW_STEPS = [
+    WorkflowStep(1, "context_analysis", "Context Analysis", "Starting business context analysis...", "Analyzing business goals and objectives...", "Processing industry and market context...", "Context analysis completed successfully"),
+    WorkflowStep(2, "personas", "Persona Creation", "Starting customer persona development...", "Analyzing target audience segments...", "Creating detailed persona profiles...", "Customer personas completed successfully"),
+    WorkflowStep(3, "journey_phases", "Journey Mapping", "Starting customer journey mapping...", "Identifying key journey phases...", "Creating detailed journey map...", "Journey mapping completed successfully"),
+    WorkflowStep(4, "research_insights", "Research Integration", "Starting research data integration...", "Processing uploaded research materials...", "Extracting key research insights...", "Research integration completed successfully"),
+    WorkflowStep(5, "customer_quotes", "Quote Generation", "Starting customer quote generation...", "Analyzing persona voice and tone...", "Creating authentic customer quotes...", "Customer quotes generated successfully"),
+    WorkflowStep(6, "emotion_validation", "Emotion Validation", "Starting emotion and pain point validation...", "Analyzing emotional journey aspects...", "Validating emotional authenticity...", "Emotion validation completed successfully"),
+    WorkflowStep(7, "formatted_output", "Output Formatting", "Starting professional output formatting...", "Structuring journey map data...", "Applying professional formatting standards...", "Output formatting completed successfully"),
+    WorkflowStep(8, "final_output", "Quality Assurance", "Starting final quality check...", "Performing comprehensive quality review...", "Refining and finalizing journey map...", "Quality assurance completed successfully"),
+]
+
+# Fast pipeline: two or three schema-constrained calls; numbers place them on the same 8-step progress scale
+FAST_WORKFLOW_STEPS = [
+    WorkflowStep(2, "fast_research", "Research Digest", "Reading your research files...", "Condensing research findings and quotes...", "Structuring research evidence...", "Research digest ready"),
+    WorkflowStep(4, "fast_profile", "Context & Personas", "Analyzing your business context...", "Creating personas from your context...", "Structuring personas...", "Personas created"),
+    WorkflowStep(8, "fast_journey", "Journey Map", "Mapping the customer journey...", "Writing phases, emotions and quotes...", "Structuring the journey map...", "Journey map completed successfully"),
+]
+
+
+@dataclass(frozen=True)
+class StepRetryPolicy:
+    """Deadline and retry settings applied to each workflow step"""
+    timeout_seconds: float = 180.0
+    max_attempts: int = 3
+    base_delay_seconds: float = 2.0
+    max_delay_seconds: float = 30.0
+
+    @classmethod
+    def from_env(cls) -> "StepRetryPolicy":
+        return cls(
+            timeout_seconds=float(os.getenv("STEP_TIMEOUT_SECONDS", "180")),
+            max_attempts=max(1, int(os.getenv("STEP_MAX_ATTEMPTS", "3"))),
+            base_delay_seconds=float(os.getenv("STEP_RETRY_BASE_DELAY_SECONDS", "2")),
+            max_delay_seconds=float(os.getenv("STEP_RETRY_MAX_DELAY_SECONDS", "30"))
+        )
+
+    def timeout_for(self, step: WorkflowStep) -> float:
+        """Per-step deadline, overridable with e.g. STEP_TIMEOUT_RESEARCH_INSIGHTS"""
+        return float(os.getenv(f"STEP_TIMEOUT_{step.key.upper()}", self.timeout_seconds))
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff before the next attempt"""
+        return random.uniform(0, min(self.max_delay_seconds, self.base_delay_seconds * 2 ** (attempt - 1)))
+
+
+class StepFailedError(RuntimeError):
+    """A workflow step gave up; the original error is kept as __cause__"""
+
+    def __init__(self, step: WorkflowStep, reason: str):
+        super().__init__(f"{step.name} failed: {reason}")
+        self.step = step
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    """Timeouts, rate limits, connection errors and 5xx responses are worth retrying"""
+    if isinstance(error, asyncio.TimeoutError):
+        return True
+    if "quota" in str(error).lower():
+        # An exhausted quota will not recover within a retry window
+        return False
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)):
+        return True
+    status_code = getattr(error, "status_code", None)
+    return isinstance(status_code, int) and (status_code == 429 or status_code >= 500)
+
+
+# Inputs passed to agents verbatim rather than compacted
+UNCOMPACTED_INPUTS = ("form_data", "formatted_output")
+
+
 class CrewCoordinator:
-    def __init__(self, user: UserProfile):
+    def __init__(self, user: UserProfile, deterministic: Optional[bool] = None, ledger: Optional[TokenLedger] = None):
         self.user = user
         
         # Get OpenAI API key (BYOK or default)
@@ -26,11 +120,17 @@ class CrewCoordinator:
         if not api_key:
             raise ValueError("No OpenAI API key available")
         
-        self.llm = ChatOpenAI(
-            model=os.getenv("OPENAI_MODEL", "gpt-4o"),
-            temperature=0.7,
-            openai_api_key=api_key
-        )
+        # Response cache: LLM_CACHE_MODE=on reuses step results for identical prompts;
+        # deterministic mode (per env or per job) forces the cache and generates misses at temperature 0
+        cache_mode = os.getenv("LLM_CACHE_MODE", "off").lower()
+        self.deterministic = deterministic if deterministic is not None else cache_mode == "deterministic"
+        self.response_cache = llm_response_cache if self.deterministic or cache_mode == "on" else None
+        self.model = os.getenv("OPENAI_MODEL", "gpt-4o")
+        self.temperature = 0.0 if self.deterministic else 0.7
+        
+        # Leased from the process-wide pool and shared by all agents; close() returns it
+        self.llm = llm_client_pool.acquire(api_key, self.model, self.temperature)
+        self._llm_reusable = True
         
         # Initialize all agents
         self.context_agent = ContextAgent(self.llm)
@@ -41,319 +141,401 @@ class CrewCoordinator:
         self.emotion_agent = EmotionAgent(self.llm)
         self.formatting_agent = FormattingAgent(self.llm)
         self.qa_agent = QAAgent(self.llm)
+
+        self.retry_policy = StepRetryPolicy.from_env()
+
+        # Partial output of the running step is published at most every STREAM_PROGRESS_INTERVAL_SECONDS (0 disables streaming)
+        self.stream_interval = float(os.getenv("STREAM_PROGRESS_INTERVAL_SECONDS", "0.5"))
+        self.stream_max_chars = int(os.getenv("STREAM_PROGRESS_MAX_CHARS", "1500"))
+        self.llm.stream = self.stream_interval > 0  # The pooled LLM may have streamed for an earlier job
+        self.ledger = ledger or TokenLedger.for_user(user, self.model)
+
+    def close(self):
+        """Return the LLM client to the pool once the workflow is over"""
+        llm_client_pool.release(self.llm, reusable=self._llm_reusable)
     
-    async def execute_workflow(self, form_data: Dict[str, Any], progress_callback: Optional[Callable] = None, job_id: Optional[str] = None) -> Dict[str, Any]:
-        """Execute the complete 8-step CrewAI workflow"""
+    async def execute_workflow(self, form_data: Dict[str, Any], progress_callback: Optional[Callable] = None, job_id: Optional[str] = None,
+                               checkpoints: Optional[Dict[str, str]] = None, checkpoint_callback: Optional[Callable] = None) -> Dict[str, Any]:
+        """Execute the complete 8-step CrewAI workflow.
+
+        Steps run as a dependency graph (see _build_graph), so work that does
+        not depend on earlier steps overlaps with them.
+        Steps whose output is already in checkpoints are skipped, so a
+        workflow interrupted by a restart resumes from the first incomplete
+        step. checkpoint_callback(key, output) is awaited after each step.
+        progress_callback(step, step_name, message, details=None) receives
+        retry and timing details as the optional fourth argument.
+        """
         
         try:
             logger.info(f"Starting CrewAI workflow with form data: {form_data}")
-
-            # Step 1: Context Analysis
-            if progress_callback:
-                await progress_callback(1, "Context Analysis", "Starting business context analysis...")
-
-            context_task = self.context_agent.create_task(form_data)
-            context_crew = Crew(
-                agents=[self.context_agent.agent],
-                tasks=[context_task],
-                verbose=True
-            )
-
-            if progress_callback:
-                await progress_callback(1, "Context Analysis", "Analyzing business goals and objectives...")
-
-            try:
-                context_result = await asyncio.to_thread(context_crew.kickoff)
-                context_analysis = str(context_result)
-
-                if progress_callback:
-                    await progress_callback(1, "Context Analysis", "Processing industry and market context...")
-
-            except Exception as e:
-                logger.error(f"Error in Context Analysis: {str(e)}")
-                if progress_callback:
-                    await progress_callback(1, "Context Analysis", f"Error: {str(e)}")
-                raise RuntimeError(f"Context Analysis failed: {str(e)}")
-
-            if progress_callback:
-                await progress_callback(1, "Context Analysis", "Context analysis completed successfully")
-
-            logger.info("Step 1 completed: Context Analysis")
-            
-            # Step 2: Persona Creation
-            if progress_callback:
-                await progress_callback(2, "Persona Creation", "Starting customer persona development...")
-
-            persona_task = self.persona_agent.create_task(form_data, context_analysis)
-            persona_crew = Crew(
-                agents=[self.persona_agent.agent],
-                tasks=[persona_task],
-                verbose=True
-            )
-
-            if progress_callback:
-                await progress_callback(2, "Persona Creation", "Analyzing target audience segments...")
-
-            try:
-                persona_result = await asyncio.to_thread(persona_crew.kickoff)
-                personas = str(persona_result)
-
-                if progress_callback:
-                    await progress_callback(2, "Persona Creation", "Creating detailed persona profiles...")
-
-            except Exception as e:
-                logger.error(f"Error in Persona Creation: {str(e)}")
-                if progress_callback:
-                    await progress_callback(2, "Persona Creation", f"Error: {str(e)}")
-                raise RuntimeError(f"Persona Creation failed: {str(e)}")
-
-            if progress_callback:
-                await progress_callback(2, "Persona Creation", "Customer personas completed successfully")
-
-            logger.info("Step 2 completed: Persona Creation")
-            
-            # Step 3: Journey Mapping
-            if progress_callback:
-                await progress_callback(3, "Journey Mapping", "Starting customer journey mapping...")
-
-            journey_task = self.journey_agent.create_task(form_data, context_analysis, personas)
-            journey_crew = Crew(
-                agents=[self.journey_agent.agent],
-                tasks=[journey_task],
-                verbose=True
-            )
-
-            if progress_callback:
-                await progress_callback(3, "Journey Mapping", "Identifying key journey phases...")
-
-            try:
-                journey_result = await asyncio.to_thread(journey_crew.kickoff)
-                journey_phases = str(journey_result)
-
-                if progress_callback:
-                    await progress_callback(3, "Journey Mapping", "Creating detailed journey map...")
-
-            except Exception as e:
-                logger.error(f"Error in Journey Mapping: {str(e)}")
-                if progress_callback:
-                    await progress_callback(3, "Journey Mapping", f"Error: {str(e)}")
-                raise RuntimeError(f"Journey Mapping failed: {str(e)}")
-
-            if progress_callback:
-                await progress_callback(3, "Journey Mapping", "Journey mapping completed successfully")
-
-            logger.info("Step 3 completed: Journey Mapping")
+            outputs: Dict[str, str] = dict(checkpoints or {})
+            if outputs:
+                logger.info(f"Resuming workflow for job {job_id} with checkpoints: {list(outputs)}")
+
+            graph = self._build_graph(outputs, self._ordered_progress(progress_callback), checkpoint_callback)
+            started = time.monotonic()
+            results = await graph.execute({"form_data": form_data})
+            logger.info(f"Workflow graph finished in {time.monotonic() - started:.1f}s for job {job_id}")
             
-            # Step 4: Research Integration
-            if progress_callback:
-                await progress_callback(4, "Research Integration", "Starting research data integration...")
-
-            research_task = self.research_agent.create_task(form_data, context_analysis, personas, journey_phases)
-            research_crew = Crew(
-                agents=[self.research_agent.agent],
-                tasks=[research_task],
-                verbose=True
-            )
-
-            if progress_callback:
-                await progress_callback(4, "Research Integration", "Processing uploaded research materials...")
-
-            try:
-                research_result = await asyncio.to_thread(research_crew.kickoff)
-                research_insights = str(research_result)
-
-                if progress_callback:
-                    await progress_callback(4, "Research Integration", "Extracting key research insights...")
-
-            except Exception as e:
-                logger.error(f"Error in Research Integration: {str(e)}")
-                if progress_callback:
-                    await progress_callback(4, "Research Integration", f"Error: {str(e)}")
-                raise RuntimeError(f"Research Integration failed: {str(e)}")
-
-            if progress_callback:
-                await progress_callback(4, "Research Integration", "Research integration completed successfully")
-
-            logger.info("Step 4 completed: Research Integration")
+            # Parse the final output to extract structured data
+            journey_map_data = self._parse_final_output(results["final_output"], form_data, results.get("formatted_output"))
             
-            # Step 5: Quote Generation
-            if progress_callback:
-                await progress_callback(5, "Quote Generation", "Starting customer quote generation...")
-
-            quote_task = self.quote_agent.create_task(form_data, context_analysis, personas, journey_phases, research_insights)
-            quote_crew = Crew(
-                agents=[self.quote_agent.agent],
-                tasks=[quote_task],
-                verbose=True
-            )
-
-            if progress_callback:
-                await progress_callback(5, "Quote Generation", "Analyzing persona voice and tone...")
-
-            try:
-                quote_result = await asyncio.to_thread(quote_crew.kickoff)
-                customer_quotes = str(quote_result)
-
-                if progress_callback:
-                    await progress_callback(5, "Quote Generation", "Creating authentic customer quotes...")
-
-            except Exception as e:
-                logger.error(f"Error in Quote Generation: {str(e)}")
-                if progress_callback:
-                    await progress_callback(5, "Quote Generation", f"Error: {str(e)}")
-                raise RuntimeError(f"Quote Generation failed: {str(e)}")
-
-            if progress_callback:
-                await progress_callback(5, "Quote Generation", "Customer quotes generated successfully")
-
-            logger.info("Step 5 completed: Quote Generation")
+            return journey_map_data
             
-            # Step 6: Emotion Validation
-            if progress_callback:
-                await progress_callback(6, "Emotion Validation", "Starting emotion and pain point validation...")
-
-            emotion_task = self.emotion_agent.create_task(form_data, context_analysis, personas, journey_phases, research_insights, customer_quotes)
-            emotion_crew = Crew(
-                agents=[self.emotion_agent.agent],
-                tasks=[emotion_task],
-                verbose=True
-            )
+        except Exception as e:
+            logger.error(f"Error in CrewAI workflow: {str(e)}")
+            raise e
 
+    async def execute_fast_workflow(self, form_data: Dict[str, Any], progress_callback: Optional[Callable] = None, job_id: Optional[str] = None,
+                                    checkpoints: Optional[Dict[str, str]] = None, checkpoint_callback: Optional[Callable] = None) -> Dict[str, Any]:
+        """Produce the same journey map with two or three schema-constrained calls instead of eight crews.
+
+        Research files, when uploaded, are first condensed into a digest; then
+        one call analyzes the context and creates personas and one maps the
+        phases. Checkpoints, caching, retries and token accounting work as in
+        execute_workflow.
+        """
+        outputs: Dict[str, str] = dict(checkpoints or {})
+        research_step, profile_step, journey_step = FAST_WORKFLOW_STEPS
+        progress_callback = self._ordered_progress(progress_callback)
+        started = time.monotonic()
+
+        async def run(step: WorkflowStep, task_factory: Callable[[], StructuredTask]):
+            output = await self._run_step(step, None, task_factory, outputs, progress_callback, checkpoint_callback,
+                                          run_attempt=self._call_structured)
+            return task_factory().response_model.model_validate_json(output)
+
+        research = None
+        uploaded_files = form_data.get("uploaded_files") or []
+        if uploaded_files:
+            content = ""
+            if research_step.key not in outputs:
+                extracted = await research_extraction_service.get_contents(uploaded_files)
+                content = await asyncio.to_thread(self.research_agent.extract_research_content, form_data, extracted)
+                compactor = ContextCompactor()
+                if compactor.enabled:
+                    content = trim_to_budget(compact_text(content), compactor.step_budget)
+            research = await run(research_step, lambda: research_task(content))
+
+        profile = await run(profile_step, lambda: profile_task(form_data, research))
+        journey = await run(journey_step, lambda: journey_task(form_data, profile, research))
+        logger.info(f"Fast pipeline finished in {time.monotonic() - started:.1f}s for job {job_id}")
+        return build_journey_map(form_data, profile, journey, research)
+
+    async def _call_structured(self, task: StructuredTask) -> str:
+        """One LLM call constrained to the task's response schema; returns the validated JSON"""
+        messages = [{"role": "user", "content": f"{task.description}\n\nReturn: {task.expected_output}"}]
+        result = await asyncio.to_thread(self.llm.call, messages, response_model=task.response_model)
+        if isinstance(result, str):
+            result = task.response_model.model_validate_json(result)
+        return result.model_dump_json()
+
+    def _build_graph(self, outputs: Dict[str, str], progress_callback: Optional[Callable] = None,
+                     checkpoint_callback: Optional[Callable] = None) -> WorkflowGraph:
+        """Declare each step's inputs so independent work runs concurrently"""
+
+        compactor = ContextCompactor()
+
+        def agent_node(step: WorkflowStep, agent: Any, inputs: Tuple[str, ...]) -> WorkflowNode:
+            async def run(values: Dict[str, Any]) -> str:
+                # Earlier outputs are compacted to the step's token budget; the form and
+                # the formatted JSON handed to QA are passed through untouched
+                context = {name: values[name] for name in inputs if name not in UNCOMPACTED_INPUTS}
+                if self.ledger.degraded:
+                    compactor.degrade()
+                values = {**values, **compactor.compact_inputs(step.name, context)}
+                args = [values[name] for name in inputs if name != "research_content"]
+                kwargs = {"research_content": values["research_content"]} if "research_content" in inputs else {}
+                return await self._run_step(step, agent, lambda: agent.create_task(*args, **kwargs),
+                                            outputs, progress_callback, checkpoint_callback)
+            return WorkflowNode(key=step.key, inputs=inputs, run=run, step=step.number)
+
+        async def quality_check(values: Dict[str, Any]) -> str:
+            step = WORKFLOW_STEPS[7]
+            form_data, formatted_output = values["form_data"], values["formatted_output"]
+            task_factory = lambda: self.qa_agent.create_task(form_data, formatted_output)
+            if step.key not in outputs:
+                parsed = parse_journey_output(formatted_output, form_data)
+                if parsed.valid:
+                    return await self._skip_step(step, formatted_output, outputs, progress_callback, checkpoint_callback,
+                                                 "formatting output passed validation")
+                # Ask for fixes to the specific problems instead of a full rewrite
+                logger.info(f"Formatting output failed validation, requesting repair: {parsed.issues}")
+                journey_json = json.dumps(parsed.raw) if parsed.raw else formatted_output
+                task_factory = lambda: self.qa_agent.create_repair_task(form_data, journey_json, parsed.issues)
+            return await self._run_step(step, self.qa_agent, task_factory, outputs, progress_callback, checkpoint_callback)
+
+        async def extract_research(values: Dict[str, Any]) -> str:
+            if WORKFLOW_STEPS[3].key in outputs:
+                return ""  # Research step is checkpointed; its files are not needed
+            form_data = values["form_data"]
+            # Extraction started in the process pool at upload time; this usually just collects it
+            extracted = await research_extraction_service.get_contents(form_data.get("uploaded_files") or [])
+            # Label lookups and BM25 chunk scoring still take CPU time, so keep them off the event loop
+            return await asyncio.to_thread(self.research_agent.extract_research_content, form_data, extracted)
+
+        return WorkflowGraph([
+            # Collecting research file text only needs the form, so it overlaps with context analysis
+            WorkflowNode(key="research_content", inputs=("form_data",), run=extract_research),
+            agent_node(WORKFLOW_STEPS[0], self.context_agent, ("form_data",)),
+            agent_node(WORKFLOW_STEPS[1], self.persona_agent, ("form_data", "context_analysis")),
+            agent_node(WORKFLOW_STEPS[2], self.journey_agent, ("form_data", "context_analysis", "personas")),
+            agent_node(WORKFLOW_STEPS[3], self.research_agent, ("form_data", "context_analysis", "personas", "journey_phases", "research_content")),
+            agent_node(WORKFLOW_STEPS[4], self.quote_agent, ("form_data", "context_analysis", "personas", "journey_phases", "research_insights")),
+            agent_node(WORKFLOW_STEPS[5], self.emotion_agent, ("form_data", "context_analysis", "personas", "journey_phases", "research_insights", "customer_quotes")),
+            agent_node(WORKFLOW_STEPS[6], self.formatting_agent, ("form_data", "context_analysis", "personas", "journey_phases", "research_insights", "customer_quotes", "emotion_validation")),
+            WorkflowNode(key=WORKFLOW_STEPS[7].key, inputs=("form_data", "formatted_output"), run=quality_check, step=WORKFLOW_STEPS[7].number),
+        ], initial_inputs=("form_data",))
+
+    @staticmethod
+    def _ordered_progress(progress_callback: Optional[Callable]) -> Optional[Callable]:
+        """Keep the reported step from moving backwards when steps run concurrently.
+
+        Plain messages from a step behind the furthest one reported are
+        dropped; messages with details (retries, failures, timings) always
+        go through.
+        """
+        if not progress_callback:
+            return None
+        furthest = {"step": 0}
+
+        async def callback(step: int, step_name: str, message: str, details: Optional[Dict[str, Any]] = None):
+            if step < furthest["step"] and not details:
+                return
+            furthest["step"] = max(furthest["step"], step)
+            if details:
+                await progress_callback(step, step_name, message, details)
+            else:
+                await progress_callback(step, step_name, message)
+
+        return callback
+
+    async def _run_step(self, step: WorkflowStep, agent: Any, task_factory: Callable, outputs: Dict[str, str],
+                        progress_callback: Optional[Callable] = None, checkpoint_callback: Optional[Callable] = None,
+                        run_attempt: Optional[Callable[[Any], Awaitable[Any]]] = None) -> str:
+        """Run one workflow step with a deadline and retries, or restore it from a checkpoint.
+
+        Each attempt kicks off a single-agent crew unless run_attempt(task) is given.
+        """
+        if step.key in outputs:
             if progress_callback:
-                await progress_callback(6, "Emotion Validation", "Analyzing emotional journey aspects...")
-
-            try:
-                emotion_result = await asyncio.to_thread(emotion_crew.kickoff)
-                emotion_validation = str(emotion_result)
-
-                if progress_callback:
-                    await progress_callback(6, "Emotion Validation", "Validating emotional authenticity...")
-
-            except Exception as e:
-                logger.error(f"Error in Emotion Validation: {str(e)}")
+                await progress_callback(step.number, step.name, f"{step.name} restored from checkpoint")
+            logger.info(f"Step {step.number} restored from checkpoint: {step.name}")
+            return outputs[step.key]
+
+        if progress_callback:
+            await progress_callback(step.number, step.name, step.start_message)
+
+        step_started = time.monotonic()
+        task = task_factory()
+        prompt = f"{getattr(task, 'description', task)}\n{getattr(task, 'expected_output', '')}"
+        role = getattr(getattr(agent, "agent", None), "role", step.key)
+        cache_key = None
+        if self.response_cache:
+            cache_key = make_cache_key(self.model, self.temperature, role, prompt)
+            cached = await self.response_cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"Step {step.number} served from LLM response cache: {step.name}")
+                elapsed = time.monotonic() - step_started
+                usage = self.ledger.record(step.key, {}, elapsed, attempts=0, cache_hit=True)
                 if progress_callback:
-                    await progress_callback(6, "Emotion Validation", f"Error: {str(e)}")
-                raise RuntimeError(f"Emotion Validation failed: {str(e)}")
-
-            if progress_callback:
-                await progress_callback(6, "Emotion Validation", "Emotion validation completed successfully")
-
-            logger.info("Step 6 completed: Emotion Validation")
-            
-            # Step 7: Output Formatting
-            if progress_callback:
-                await progress_callback(7, "Output Formatting", "Starting professional output formatting...")
-
-            formatting_task = self.formatting_agent.create_task(form_data, context_analysis, personas, journey_phases, research_insights, customer_quotes, emotion_validation)
-            formatting_crew = Crew(
-                agents=[self.formatting_agent.agent],
-                tasks=[formatting_task],
-                verbose=True
-            )
-
-            if progress_callback:
-                await progress_callback(7, "Output Formatting", "Structuring journey map data...")
+                    await progress_callback(step.number, step.name, step.completed_message, {
+                        "event": "step_completed",
+                        "attempts": 0,
+                        "cache_hit": True,
+                        "elapsed_seconds": round(elapsed, 2),
+                        "usage": usage
+                    })
+                return await self._finish_step(step, cached, outputs, checkpoint_callback)
+
+        # Stop before spending tokens the journey's plan cannot cover
+        self.ledger.check_budget(step.name, count_tokens(prompt))
+
+        policy = self.retry_policy
+        timeout = policy.timeout_for(step)
+        usage_before = self._llm_usage()
+        attempt = 0
+        while True:
+            attempt += 1
+            attempt_started = time.monotonic()
+            if attempt > 1:
+                task = task_factory()
+
+            if progress_callback and attempt == 1:
+                await progress_callback(step.number, step.name, step.running_message)
 
             try:
-                formatting_result = await asyncio.to_thread(formatting_crew.kickoff)
-                formatted_output = str(formatting_result)
+                # A timed-out attempt keeps running in its worker thread; its result is discarded
+                call = run_attempt(task) if run_attempt else self._kickoff_crew(step, agent, task, progress_callback)
+                result = await asyncio.wait_for(call, timeout=timeout)
+                output = str(result)
 
                 if progress_callback:
-                    await progress_callback(7, "Output Formatting", "Applying professional formatting standards...")
+                    await progress_callback(step.number, step.name, step.processing_message)
+                break
 
             except Exception as e:
-                logger.error(f"Error in Output Formatting: {str(e)}")
+                elapsed = time.monotonic() - attempt_started
+                reason = f"timed out after {timeout:.0f}s" if isinstance(e, asyncio.TimeoutError) else str(e)
+                if isinstance(e, asyncio.TimeoutError):
+                    self._llm_reusable = False  # The abandoned call still uses the client and adds to its usage
+                if attempt >= policy.max_attempts or not is_retryable_error(e):
+                    logger.error(f"Error in {step.name} (attempt {attempt}): {reason}")
+                    if progress_callback:
+                        await progress_callback(step.number, step.name, f"Error: {reason}", {
+                            "event": "step_failed",
+                            "attempt": attempt,
+                            "elapsed_seconds": round(elapsed, 2)
+                        })
+                    raise StepFailedError(step, reason) from e
+
+                delay = policy.backoff(attempt)
+                logger.warning(f"{step.name} attempt {attempt} failed ({reason}), retrying in {delay:.1f}s")
                 if progress_callback:
-                    await progress_callback(7, "Output Formatting", f"Error: {str(e)}")
-                raise RuntimeError(f"Output Formatting failed: {str(e)}")
-
-            if progress_callback:
-                await progress_callback(7, "Output Formatting", "Output formatting completed successfully")
+                    await progress_callback(step.number, step.name, f"Attempt {attempt} failed, retrying in {delay:.0f}s...", {
+                        "event": "step_retry",
+                        "attempt": attempt,
+                        "error": reason,
+                        "elapsed_seconds": round(elapsed, 2),
+                        "retry_delay_seconds": round(delay, 2)
+                    })
+                await asyncio.sleep(delay)
+
+        elapsed = time.monotonic() - step_started
+        usage_after = self._llm_usage()
+        # The pooled LLM counts usage over its lifetime, so a step's usage is the difference
+        step_usage = usage_after.delta_since(usage_before) if usage_before and usage_after else getattr(result, "token_usage", None)
+        usage = self.ledger.record(step.key, step_usage or {}, elapsed, attempts=attempt)
+        logger.info(f"Step {step.number} used {usage['total_tokens']} tokens (${usage['cost_usd']:.4f}) in {elapsed:.1f}s")
+        if progress_callback:
+            await progress_callback(step.number, step.name, step.completed_message, {
+                "event": "step_completed",
+                "attempts": attempt,
+                "elapsed_seconds": round(elapsed, 2),
+                "usage": usage
+            })
 
-            logger.info("Step 7 completed: Output Formatting")
-            
-            # Step 8: Quality Assurance
-            if progress_callback:
-                await progress_callback(8, "Quality Assurance", "Starting final quality check...")
+        logger.info(f"Step {step.number} completed: {step.name}")
+        if cache_key:
+            await self.response_cache.put(cache_key, self.model, role, output)
 
-            qa_task = self.qa_agent.create_task(form_data, formatted_output)
-            qa_crew = Crew(
-                agents=[self.qa_agent.agent],
-                tasks=[qa_task],
-                verbose=True
-            )
+        return await self._finish_step(step, output, outputs, checkpoint_callback)
 
-            if progress_callback:
-                await progress_callback(8, "Quality Assurance", "Performing comprehensive quality review...")
+    async def _kickoff_crew(self, step: WorkflowStep, agent: Any, task: Any, progress_callback: Optional[Callable] = None) -> Any:
+        """Run the step's agent and task as a crew in a worker thread, streaming when progress is reported"""
+        streaming = bool(progress_callback) and self.stream_interval > 0
+        crew = Crew(
+            agents=[agent.agent],
+            tasks=[task],
+            verbose=True,
+            stream=streaming
+        )
+        if not streaming:
+            return await asyncio.to_thread(crew.kickoff)
+        chunks: list = []
+
+        def consume():
+            streaming = crew.kickoff()
+            for chunk in streaming:
+                if chunk.content:
+                    chunks.append(chunk.content)
+            return streaming.result
+
+        publisher = asyncio.create_task(self._publish_partial_output(step, chunks, progress_callback))
+        try:
+            return await asyncio.to_thread(consume)
+        finally:
+            publisher.cancel()
+
+    async def _publish_partial_output(self, step: WorkflowStep, chunks: list, progress_callback: Callable):
+        """Report the text a step has streamed so far, at most once per stream interval"""
+        published = 0
+        while True:
+            await asyncio.sleep(self.stream_interval)
+            text = "".join(chunks)
+            if len(text) > published:
+                published = len(text)
+                await progress_callback(step.number, step.name, step.running_message, {
+                    "event": "step_output",
+                    "partial_output": text[-self.stream_max_chars:],
+                    "output_chars": len(text)
+                })
+
+    def _llm_usage(self):
+        """Lifetime token usage of the LLM, when it reports one"""
+        get_summary = getattr(getattr(self, "llm", None), "get_token_usage_summary", None)
+        return get_summary() if get_summary else None
+
+    async def _skip_step(self, step: WorkflowStep, output: str, outputs: Dict[str, str], progress_callback: Optional[Callable] = None,
+                         checkpoint_callback: Optional[Callable] = None, reason: str = "") -> str:
+        """Complete a step without an LLM call, passing output through"""
+        logger.info(f"Step {step.number} skipped: {step.name} ({reason})")
+        usage = self.ledger.record(step.key, {}, 0.0, attempts=0)
+        if progress_callback:
+            await progress_callback(step.number, step.name, step.completed_message, {
+                "event": "step_completed",
+                "attempts": 0,
+                "skipped": True,
+                "reason": reason,
+                "usage": usage
+            })
+        return await self._finish_step(step, output, outputs, checkpoint_callback)
 
+    async def _finish_step(self, step: WorkflowStep, output: str, outputs: Dict[str, str],
+                           checkpoint_callback: Optional[Callable] = None) -> str:
+        """Record a step's output and checkpoint it"""
+        outputs[step.key] = output
+        if checkpoint_callback:
             try:
-                qa_result = await asyncio.to_thread(qa_crew.kickoff)
-                final_output = str(qa_result)
-
-                if progress_callback:
-                    await progress_callback(8, "Quality Assurance", "Refining and finalizing journey map...")
-
+                await checkpoint_callback(step.key, output)
             except Exception as e:
-                logger.error(f"Error in Quality Assurance: {str(e)}")
-                if progress_callback:
-                    await progress_callback(8, "Quality Assurance", f"Error: {str(e)}")
-                raise RuntimeError(f"Quality Assurance failed: {str(e)}")
+                # A lost checkpoint only costs a re-run of this step after a restart
+                logger.warning(f"Failed to checkpoint step {step.key}: {e}")
 
-            if progress_callback:
-                await progress_callback(8, "Quality Assurance", "Quality assurance completed successfully")
-
-            logger.info("Step 8 completed: Quality Assurance")
-            
-            # Parse the final output to extract structured data
-            journey_map_data = self._parse_final_output(final_output, form_data)
-            
-            return journey_map_data
-            
-        except Exception as e:
-            logger.error(f"Error in CrewAI workflow: {str(e)}")
-            raise e
+        return output
     
-    def _parse_final_output(self, final_output: str, form_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Parse the final QA output into structured journey map data"""
-        
-        try:
-            # Try to extract JSON from the output
-            # This is a simplified parser - in production, you'd want more robust parsing
-            
-            # For now, return a structured format based on the output
-            # In a real implementation, you'd parse the actual agent outputs
-            
-            return {
-                "id": f"journey_{hash(final_output) % 10000}",
-                "title": f"{form_data.get('industry', 'Business')} Customer Journey",
-                "industry": form_data.get('industry', ''),
-                "created_at": "2024-01-01T00:00:00Z",
-                "personas": self._extract_personas_from_output(final_output),
-                "phases": self._extract_phases_from_output(final_output, form_data),
-                "insights": {
-                    "key_findings": "Generated by CrewAI agents",
-                    "recommendations": ["Improve customer experience", "Optimize touchpoints"],
-                    "full_analysis": final_output
-                }
-            }
-            
-        except Exception as e:
-            logger.error(f"Error parsing final output: {str(e)}")
-            # Return a basic structure if parsing fails
-            return {
-                "id": "crewai_generated",
-                "title": f"{form_data.get('industry', 'Business')} Customer Journey",
-                "industry": form_data.get('industry', ''),
-                "created_at": "2024-01-01T00:00:00Z",
-                "personas": [],
-                "phases": [],
-                "insights": {"full_analysis": final_output}
-            }
+    def _parse_final_output(self, final_output: str, form_data: Dict[str, Any], formatted_output: Optional[str] = None) -> Dict[str, Any]:
+        """Build journey map data from the validated personas and phases JSON in the agents' output.
+
+        final_output is the formatting output that passed validation or the QA
+        repair of it; sections missing there are taken from formatted_output,
+        and placeholders are only used when no valid section exists at all.
+        """
+        parsed = parse_journey_output(final_output, form_data)
+        if (not parsed.valid or not parsed.recommendations) and formatted_output and formatted_output != final_output:
+            fallback = parse_journey_output(formatted_output, form_data)
+            parsed.personas = parsed.personas or fallback.personas
+            parsed.phases = parsed.phases or fallback.phases
+            parsed.recommendations = parsed.recommendations or fallback.recommendations
+        if parsed.issues:
+            logger.warning(f"Journey output has validation issues: {parsed.issues}")
+
+        personas = parsed.personas
+        if not personas:
+            logger.error("No valid personas in workflow output, using placeholders")
+            personas = self._extract_personas_from_output(final_output)
+        phases = parsed.phases
+        if not phases:
+            logger.error("No valid journey phases in workflow output, using placeholders")
+            phases = self._extract_phases_from_output(final_output, form_data)
+
+        return {
+            "id": f"journey_{hash(final_output) % 10000}",
+            "title": form_data.get("title") or f"{form_data.get('industry') or 'Business'} Customer Journey",
+            "industry": form_data.get('industry', ''),
+            "created_at": datetime.now().isoformat(),
+            "personas": personas,
+            "phases": phases,
+            "insights": {
+                "validation_issues": parsed.issues,
+                "full_analysis": formatted_output or final_output
+            },
+            "recommendations": parsed.recommendations or None
+        }
     
     def _extract_personas_from_output(self, output: str) -> list:
-        """Extract persona data from agent output"""
-        # This would parse the actual JSON from the formatting agent
-        # For now, return a basic structure
+        """Placeholder personas for output without usable persona JSON"""
         return [
             {
                 "id": "1",
@@ -368,7 +550,7 @@ class CrewCoordinator:
         ]
     
     def _extract_phases_from_output(self, output: str, form_data: Dict[str, Any]) -> list:
-        """Extract journey phases from agent output"""
+        """Placeholder phases for output without usable phase JSON"""
         phases = []
         journey_phases = form_data.get('journey_phases', ['Awareness', 'Consideration', 'Purchase'])
         
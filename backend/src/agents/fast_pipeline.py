@@ -0,0 +1,183 @@
+import os
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Type
+import logging
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+PIPELINE_MODES = ("full", "fast")
+DEFAULT_PLAN_PIPELINES = {"free": "fast", "starter": "full", "pro": "full"}
+
+
+def parse_plan_pipelines(value: Optional[str]) -> Dict[str, str]:
+    """Parse "free=fast,starter=full,pro=full" into the default pipeline per plan"""
+    pipelines = dict(DEFAULT_PLAN_PIPELINES)
+    for item in (value or "").split(","):
+        if "=" in item:
+            plan, mode = (part.strip() for part in item.split("=", 1))
+            if mode in PIPELINE_MODES:
+                pipelines[plan] = mode
+            else:
+                logger.warning(f"Ignoring invalid plan pipeline: {item}")
+    return pipelines
+
+
+def resolve_pipeline(requested: Optional[str], plan_type: str) -> str:
+    """The pipeline a journey runs: the plan's default, or fast if requested.
+
+    Any plan may opt down to the cheaper fast pipeline, but the full pipeline
+    is only run for plans whose default is full.
+    """
+    default = parse_plan_pipelines(os.getenv("PLAN_PIPELINE_MODES")).get(plan_type, "full")
+    if requested == "fast":
+        return "fast"
+    if requested == "full" and default != "full":
+        logger.info(f"Full pipeline requested on the {plan_type} plan; running the {default} pipeline")
+    return default
+
+
+# Response schemas for the structured calls. OpenAI strict JSON schemas need every field required.
+
+class ResearchDigest(BaseModel):
+    findings: List[str]
+    customer_quotes: List[str]
+    metrics: List[str]
+
+
+class PersonaDraft(BaseModel):
+    name: str
+    age: str
+    occupation: str
+    goals: List[str]
+    pain_points: List[str]
+    motivations: List[str]
+    quote: str
+
+
+class JourneyProfile(BaseModel):
+    context_summary: str
+    key_findings: List[str]
+    personas: List[PersonaDraft]
+
+
+class PhaseDraft(BaseModel):
+    name: str
+    actions: List[str]
+    touchpoints: List[str]
+    emotions: str
+    pain_points: List[str]
+    opportunities: List[str]
+    customer_quote: str
+
+
+class JourneyDraft(BaseModel):
+    phases: List[PhaseDraft]
+    recommendations: List[str]
+
+
+@dataclass
+class StructuredTask:
+    """One schema-constrained LLM call; description and expected_output mirror a CrewAI Task"""
+    description: str
+    expected_output: str
+    response_model: Type[BaseModel]
+
+
+def _form_summary(form_data: Dict[str, Any]) -> str:
+    return (
+        f"Industry: {form_data.get('industry')}\n"
+        f"Business Goals: {form_data.get('business_goals')}\n"
+        f"Target Personas: {', '.join(form_data.get('target_personas') or [])}\n"
+        f"Journey Phases: {', '.join(form_data.get('journey_phases') or [])}\n"
+        f"Additional Context: {form_data.get('additional_context') or 'None provided'}"
+    )
+
+
+def research_task(research_content: str) -> StructuredTask:
+    return StructuredTask(
+        description=(
+            "Condense this customer research into evidence for a customer journey map. "
+            "Keep verbatim customer quotes and concrete figures; drop everything else.\n\n"
+            f"{research_content}"
+        ),
+        expected_output="Key findings, verbatim customer quotes and metrics from the research",
+        response_model=ResearchDigest
+    )
+
+
+def profile_task(form_data: Dict[str, Any], research: Optional[ResearchDigest] = None) -> StructuredTask:
+    evidence = f"\n\nResearch evidence:\n{research.model_dump_json()}" if research else ""
+    return StructuredTask(
+        description=(
+            "You are a customer experience strategist. Analyze the business context and create one "
+            "persona per target persona, grounded in the context and any research evidence.\n\n"
+            f"{_form_summary(form_data)}{evidence}"
+        ),
+        expected_output="A short context summary, key findings, and realistic personas with goals, pain points, motivations and a quote",
+        response_model=JourneyProfile
+    )
+
+
+def journey_task(form_data: Dict[str, Any], profile: JourneyProfile, research: Optional[ResearchDigest] = None) -> StructuredTask:
+    phases = form_data.get("journey_phases") or []
+    evidence = f"\n\nResearch evidence:\n{research.model_dump_json()}" if research else ""
+    return StructuredTask(
+        description=(
+            "Map the customer journey for these personas. Return exactly these phases, in this order: "
+            f"{', '.join(phases)}. For each phase give concrete actions, touchpoints, the dominant emotion "
+            "with a short justification, pain points, opportunities and a realistic customer quote "
+            "(verbatim from the research when one fits). Finish with prioritized recommendations.\n\n"
+            f"{_form_summary(form_data)}\n\nContext and personas:\n{profile.model_dump_json()}{evidence}"
+        ),
+        expected_output="One entry per requested phase, in order, plus recommendations",
+        response_model=JourneyDraft
+    )
+
+
+def build_journey_map(form_data: Dict[str, Any], profile: JourneyProfile, journey: JourneyDraft,
+                      research: Optional[ResearchDigest] = None) -> Dict[str, Any]:
+    """Assemble the structured call results into the JourneyMap shape the full pipeline returns"""
+    industry = form_data.get("industry", "")
+    return {
+        "id": f"journey_{uuid.uuid4().hex[:12]}",
+        "title": form_data.get("title") or f"{industry or 'Business'} Customer Journey",
+        "industry": industry,
+        "created_at": datetime.now().isoformat(),
+        "personas": [
+            {
+                "id": str(i + 1),
+                "name": persona.name,
+                "age": persona.age,
+                "occupation": persona.occupation,
+                "goals": persona.goals,
+                "painPoints": persona.pain_points,
+                "motivations": persona.motivations,
+                "quote": persona.quote,
+                "avatar": "👤"
+            }
+            for i, persona in enumerate(profile.personas)
+        ],
+        "phases": [
+            {
+                "id": str(i + 1),
+                "name": phase.name,
+                "actions": phase.actions,
+                "touchpoints": phase.touchpoints,
+                "emotions": phase.emotions,
+                "painPoints": phase.pain_points,
+                "opportunities": phase.opportunities,
+                "customerQuote": phase.customer_quote
+            }
+            for i, phase in enumerate(journey.phases)
+        ],
+        "insights": {
+            "pipeline": "fast",
+            "context_summary": profile.context_summary,
+            "key_findings": profile.key_findings,
+            "research": research.model_dump() if research else None
+        },
+        "recommendations": journey.recommendations
+    }
@@ -70,7 +70,16 @@ class FormattingAgent:
             - Resource requirements
             - Timeline considerations
             
-            Format the personas and journey phases as valid JSON that matches the frontend data structure.
+            Format the personas and journey phases as valid JSON that matches the frontend data structure,
+            in one ```json block with exactly these fields (every field filled, one phase per requested phase, in order):
+            {{
+              "personas": [{{"id": "1", "name": "", "age": "", "occupation": "", "goals": [""], "painPoints": [""],
+                             "motivations": [""], "quote": "", "avatar": "👤"}}],
+              "phases": [{{"id": "1", "name": "", "actions": [""], "touchpoints": [""], "emotions": "",
+                           "painPoints": [""], "opportunities": [""], "customerQuote": ""}}],
+              "recommendations": [""]
+            }}
+            Requested phases: {form_data.get('journey_phases', [])}
             Ensure all content is professional, actionable, and stakeholder-ready.
             """,
             agent=self.agent,
@@ -0,0 +1,213 @@
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import logging
+from pydantic import ValidationError
+from ..models.journey import JourneyPhase, Persona
+
+logger = logging.getLogger(__name__)
+
+JSON_START = re.compile(r"[\[{]")
+TRAILING_COMMA = re.compile(r",(\s*[\]}])")
+
+# Accepted spellings of each model field (compared lowercase, without "_", "-" or spaces) -> field alias
+PERSONA_FIELDS = {
+    "id": "id", "name": "name", "age": "age", "agerange": "age", "occupation": "occupation", "role": "occupation",
+    "jobtitle": "occupation", "goals": "goals", "painpoints": "painPoints", "frustrations": "painPoints",
+    "quote": "quote", "avatar": "avatar", "demographics": "demographics", "motivations": "motivations"
+}
+PHASE_FIELDS = {
+    "id": "id", "name": "name", "phase": "name", "phasename": "name", "title": "name", "actions": "actions",
+    "touchpoints": "touchpoints", "emotions": "emotions", "emotion": "emotions", "emotionalstate": "emotions",
+    "painpoints": "painPoints", "opportunities": "opportunities", "customerquote": "customerQuote", "quote": "customerQuote"
+}
+PERSONA_LISTS = ("goals", "painPoints", "motivations")
+PHASE_LISTS = ("actions", "touchpoints", "painPoints", "opportunities")
+
+
+def _balanced_end(text: str, start: int) -> Optional[int]:
+    """Index just past the bracket closing the one at start, ignoring brackets inside strings"""
+    depth, in_string, escaped = 0, False, False
+    for i in range(start, len(text)):
+        char = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "[{":
+            depth += 1
+        elif char in "]}":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+    return None
+
+
+def iter_json_values(text: str) -> Iterator[Any]:
+    """Yield each top-level JSON object or array embedded in free text, in order"""
+    for _, _, value in iter_json_spans(text):
+        yield value
+
+
+def iter_json_spans(text: str) -> Iterator[Tuple[int, int, Any]]:
+    """Yield (start, end, value) for each top-level JSON object or array embedded in free text.
+
+    Scans once from left to right; a value that fails to parse is retried
+    without trailing commas before the scan moves past its opening bracket.
+    """
+    decoder = json.JSONDecoder()
+    pos = 0
+    while True:
+        match = JSON_START.search(text, pos)
+        if not match:
+            return
+        start = match.start()
+        try:
+            value, end = decoder.raw_decode(text, start)
+        except json.JSONDecodeError:
+            end = _balanced_end(text, start)
+            try:
+                value = json.loads(TRAILING_COMMA.sub(r"\1", text[start:end])) if end else None
+            except json.JSONDecodeError:
+                value = None
+            if value is None:
+                pos = start + 1
+                continue
+        yield start, end, value
+        pos = end
+
+
+def _item_lists(value: Any, key: str = "") -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+    """Lists of objects anywhere in a JSON value, with the key they were found under"""
+    if isinstance(value, list) and value and all(isinstance(item, dict) for item in value):
+        yield key, value
+        return
+    if isinstance(value, dict):
+        for child_key, child in value.items():
+            yield from _item_lists(child, str(child_key).lower())
+
+
+def _field_key(name: str) -> str:
+    return re.sub(r"[\s_\-]", "", name).lower()
+
+
+def _looks_like_personas(key: str, items: List[Dict[str, Any]]) -> bool:
+    keys = {_field_key(k) for k in items[0]}
+    return "persona" in key or ("name" in keys and bool(keys & {"goals", "painpoints", "occupation", "frustrations"}))
+
+
+def _looks_like_phases(key: str, items: List[Dict[str, Any]]) -> bool:
+    keys = {_field_key(k) for k in items[0]}
+    return "phase" in key or "journey" in key or bool(keys & {"touchpoints", "actions", "opportunities"})
+
+
+def _as_list(value: Any) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, dict):
+        return [f"{k}: {v}" for k, v in value.items()]
+    if isinstance(value, list):
+        return [item if isinstance(item, str) else json.dumps(item) for item in value if item not in (None, "")]
+    return [str(value)]
+
+
+def _as_text(value: Any) -> str:
+    if isinstance(value, dict):
+        return ", ".join(str(v) for v in value.values() if v)
+    if isinstance(value, list):
+        return "; ".join(str(v) for v in value if v)
+    return "" if value is None else str(value)
+
+
+def _normalize(item: Dict[str, Any], fields: Dict[str, str], list_fields: Tuple[str, ...], index: int) -> Dict[str, Any]:
+    normalized: Dict[str, Any] = {}
+    for key, value in item.items():
+        alias = fields.get(_field_key(str(key)))
+        if alias and alias not in normalized:
+            normalized[alias] = value
+    demographics = normalized.pop("demographics", None)
+    for alias, value in normalized.items():
+        normalized[alias] = _as_list(value) if alias in list_fields else _as_text(value)
+    if isinstance(demographics, dict):
+        normalized["demographics"] = demographics
+    normalized["id"] = normalized.get("id") or str(index + 1)
+    return normalized
+
+
+def _validate_items(kind: str, items: List[Dict[str, Any]], model: Any, fields: Dict[str, str],
+                    list_fields: Tuple[str, ...], issues: List[str]) -> List[Dict[str, Any]]:
+    valid = []
+    for i, raw in enumerate(items):
+        item = _normalize(raw, fields, list_fields, i)
+        if kind == "persona":
+            item.setdefault("avatar", "👤")
+        label = f"{kind} {i + 1}" + (f" ({item['name']})" if item.get("name") else "")
+        try:
+            model.model_validate(item)
+        except ValidationError as e:
+            missing = [str(error["loc"][0]) for error in e.errors()]
+            issues.append(f"{label}: missing or invalid {', '.join(missing)}")
+            continue
+        empty = [alias for alias, value in item.items() if alias != "avatar" and value in ("", [])]
+        if empty:
+            issues.append(f"{label}: empty {', '.join(empty)}")
+        valid.append(item)
+    return valid
+
+
+@dataclass
+class ParsedJourney:
+    personas: List[Dict[str, Any]] = field(default_factory=list)  # Validated, keyed by model alias
+    phases: List[Dict[str, Any]] = field(default_factory=list)
+    recommendations: List[str] = field(default_factory=list)
+    issues: List[str] = field(default_factory=list)
+    raw: Dict[str, Any] = field(default_factory=dict)  # The JSON the items came from, for repair prompts
+
+    @property
+    def valid(self) -> bool:
+        return bool(self.personas and self.phases) and not self.issues
+
+
+def parse_journey_output(text: str, form_data: Dict[str, Any]) -> ParsedJourney:
+    """Find the personas and phases JSON in agent output and validate them against the journey models"""
+    result = ParsedJourney()
+    persona_items: Optional[List[Dict[str, Any]]] = None
+    phase_items: Optional[List[Dict[str, Any]]] = None
+    for value in iter_json_values(text or ""):
+        if isinstance(value, dict) and not result.recommendations:
+            result.recommendations = _as_list(value.get("recommendations"))
+        for key, items in _item_lists(value):
+            if persona_items is None and _looks_like_personas(key, items):
+                persona_items = items
+            elif phase_items is None and _looks_like_phases(key, items):
+                phase_items = items
+        if persona_items is not None and phase_items is not None:
+            break
+
+    if persona_items is None:
+        result.issues.append("no personas JSON array found")
+    else:
+        result.raw["personas"] = persona_items
+        result.personas = _validate_items("persona", persona_items, Persona, PERSONA_FIELDS, PERSONA_LISTS, result.issues)
+    if phase_items is None:
+        result.issues.append("no journey phases JSON array found")
+    else:
+        result.raw["phases"] = phase_items
+        result.phases = _validate_items("phase", phase_items, JourneyPhase, PHASE_FIELDS, PHASE_LISTS, result.issues)
+
+    if phase_items is not None:
+        # Phases that exist but failed validation are already reported above
+        names = [_normalize(item, PHASE_FIELDS, PHASE_LISTS, i).get("name", "").lower() for i, item in enumerate(phase_items)]
+        for requested in form_data.get("journey_phases") or []:
+            if not any(name and (requested.lower() in name or name in requested.lower()) for name in names):
+                result.issues.append(f"requested phase '{requested}' is missing")
+    targets = form_data.get("target_personas") or []
+    if persona_items is not None and len(result.personas) < len(targets):
+        result.issues.append(f"{len(result.personas)} valid personas for {len(targets)} target personas")
+    return result
@@ -1,6 +1,6 @@
 from crewai import Agent, Task
 from langchain_openai import ChatOpenAI
-from typing import Dict, Any
+from typing import Dict, Any, List
 
 class QAAgent:
     def __init__(self, llm: ChatOpenAI):
@@ -66,4 +66,28 @@ class QAAgent:
             """,
             agent=self.agent,
             expected_output="The final, quality-assured journey map output with all refinements, corrections, and enhancements applied, ready for stakeholder presentation and implementation."
-        )
\ No newline at end of file
+        )
+
+    def create_repair_task(self, form_data: Dict[str, Any], journey_json: str, issues: List[str]) -> Task:
+        issue_list = "\n".join(f"- {issue}" for issue in issues)
+        return Task(
+            description=f"""
+            The journey map JSON below failed validation. Fix only these issues and keep all valid content unchanged:
+            {issue_list}
+
+            JOURNEY MAP JSON:
+            {journey_json}
+
+            ORIGINAL FORM DATA:
+            Industry: {form_data.get('industry')}
+            Business Goals: {form_data.get('business_goals')}
+            Target Personas: {form_data.get('target_personas', [])}
+            Journey Phases: {form_data.get('journey_phases', [])}
+
+            Every persona needs id, name, age, occupation, goals, painPoints, motivations, quote and avatar.
+            Every phase needs id, name, actions, touchpoints, emotions, painPoints, opportunities and customerQuote.
+            Include exactly one phase per requested journey phase, in order.
+            """,
+            agent=self.agent,
+            expected_output='Only the corrected JSON object: {"personas": [...], "phases": [...], "recommendations": [...]}'
+        )
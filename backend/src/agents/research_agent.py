@@ -1,11 +1,12 @@
 from crewai import Agent, Task
 from langchain_openai import ChatOpenAI
-from typing import Dict, Any, List
-import os
-import PyPDF2
-import docx
-import csv
+from itertools import groupby
+from typing import Dict, Any, List, Optional
 import logging
+import os
+from ..services.file_extraction import extract_file_content
+from ..services.upload_store import upload_store
+from .research_retrieval import TOKEN_BUDGET, ResearchIndex, research_query
 
 logger = logging.getLogger(__name__)
 
@@ -22,138 +23,54 @@ class ResearchAgent:
             allow_delegation=False
         )
     
-    def _extract_pdf_text(self, file_path: str) -> str:
-        """Extract text from PDF file using multiple methods for better accuracy"""
-        try:
-            # Method 1: Try pdfplumber first (best for tables and complex layouts)
-            try:
-                with pdfplumber.open(file_path) as pdf:
-                    text = ""
-                    for page in pdf.pages:
-                        page_text = page.extract_text()
-                        if page_text:
-                            text += page_text + "\n"
-                    
-                    if text.strip():
-                        logger.info(f"Successfully extracted PDF text using pdfplumber: {len(text)} characters")
-                        return text.strip()
-            except Exception as e:
-                logger.warning(f"pdfplumber failed for {file_path}: {e}")
-            
-            # Method 2: Try PyMuPDF (good for scanned documents and images)
-            try:
-                doc = fitz.open(file_path)
-                text = ""
-                for page_num in range(doc.page_count):
-                    page = doc[page_num]
-                    page_text = page.get_text()
-                    if page_text:
-                        text += page_text + "\n"
-                doc.close()
-                
-                if text.strip():
-                    logger.info(f"Successfully extracted PDF text using PyMuPDF: {len(text)} characters")
-                    return text.strip()
-            except Exception as e:
-                logger.warning(f"PyMuPDF failed for {file_path}: {e}")
-            
-            # Method 3: Fallback to PyPDF2
-            try:
-                with open(file_path, 'rb') as file:
-                    pdf_reader = PyPDF2.PdfReader(file)
-                    text = ""
-                    for page in pdf_reader.pages:
-                        page_text = page.extract_text()
-                        if page_text:
-                            text += page_text + "\n"
-                    
-                    if text.strip():
-                        logger.info(f"Successfully extracted PDF text using PyPDF2: {len(text)} characters")
-                        return text.strip()
-            except Exception as e:
-                logger.warning(f"PyPDF2 failed for {file_path}: {e}")
-            
-            return f"[Unable to extract text from PDF file: {file_path}. File may be image-based or corrupted.]"
-            
-        except Exception as e:
-            logger.error(f"Error extracting PDF text from {file_path}: {e}")
-            return f"[Error reading PDF file: {str(e)}]"
-    
-    def _extract_docx_text(self, file_path: str) -> str:
-        """Extract text from DOCX file"""
-        try:
-            doc = docx.Document(file_path)
-            text = ""
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
-            return text.strip()
-        except Exception as e:
-            logger.error(f"Error extracting DOCX text from {file_path}: {e}")
-            return f"[Error reading DOCX file: {str(e)}]"
-    
-    def _extract_csv_text(self, file_path: str) -> str:
-        """Extract text from CSV file"""
-        try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as file:
-                csv_reader = csv.reader(file)
-                rows = []
-                for i, row in enumerate(csv_reader):
-                    if i < 100:  # Limit to first 100 rows
-                        rows.append(", ".join(row))
-                    else:
-                        break
-                return "\n".join(rows)
-        except Exception as e:
-            logger.error(f"Error extracting CSV text from {file_path}: {e}")
-            return f"[Error reading CSV file: {str(e)}]"
+    def _extract_file_content(self, content_id: str) -> str:
+        """Extract content of an uploaded file from the upload store"""
+        file_path = upload_store.resolve(content_id)
+        if file_path is None:
+            return f"[File no longer available: {content_id}]"
+        return extract_file_content(file_path)
     
-    def _extract_txt_text(self, file_path: str) -> str:
-        """Extract text from TXT file"""
-        try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as file:
-                return file.read()
-        except Exception as e:
-            logger.error(f"Error extracting TXT text from {file_path}: {e}")
-            return f"[Error reading TXT file: {str(e)}]"
-    
-    def _extract_file_content(self, file_path: str) -> str:
-        """Extract content from various file types"""
-        if not os.path.exists(file_path):
-            return f"[File not found: {file_path}]"
-        
-        file_extension = os.path.splitext(file_path)[1].lower()
-        
-        if file_extension == '.pdf':
-            return self._extract_pdf_text(file_path)
-        elif file_extension == '.docx':
-            return self._extract_docx_text(file_path)
-        elif file_extension == '.csv':
-            return self._extract_csv_text(file_path)
-        elif file_extension == '.txt':
-            return self._extract_txt_text(file_path)
-        else:
-            return f"[Unsupported file type: {file_extension}]"
+    def extract_research_content(self, form_data: Dict[str, Any], extracted: Optional[Dict[str, str]] = None,
+                                 token_budget: int = TOKEN_BUDGET) -> str:
+        """Build the research prompt section from the passages most relevant to the journey, within token_budget"""
+        uploaded_files = form_data.get('uploaded_files') or []
+        if not uploaded_files:
+            return "No research files were uploaded."
+
+        # Label files by the names they were uploaded under; the store only knows their hashes
+        filenames = {file.get('content_id'): file.get('filename') for file in form_data.get('files') or [] if file.get('filename')}
+        documents = {}
+        for content_id in uploaded_files:
+            if extracted and content_id in extracted:
+                content = extracted[content_id]
+            else:
+                logger.info(f"Extracting content from file: {content_id}")
+                content = self._extract_file_content(content_id)
+            file_info = upload_store.describe(content_id)
+            label = f"{os.path.basename(filenames.get(content_id) or file_info['name'])} ({file_info['extension']})"
+            if label in documents:
+                label = f"{label} [{content_id[:8]}]"  # Different files uploaded under the same name
+            documents[label] = content
+
+        index = ResearchIndex(documents)
+        passages = index.select(research_query(form_data), token_budget)
+        research_content = f"UPLOADED RESEARCH FILES ({len(uploaded_files)} files"
+        if len(passages) < len(index.passages):
+            research_content += f", {len(passages)} most relevant of {len(index.passages)} passages"
+        research_content += "):\n"
+        for source, group in groupby(passages, key=lambda passage: passage.source):
+            research_content += f"\n\nFile: {source}\nContent:\n"
+            previous = None
+            for passage in group:
+                if previous is not None and passage.position != previous + 1:
+                    research_content += "\n[...]\n"
+                research_content += passage.text + "\n"
+                previous = passage.position
+        return research_content
     
-    def create_task(self, form_data: Dict[str, Any], context_analysis: str, personas: str, journey_phases: str) -> Task:
-        uploaded_files = form_data.get('uploaded_files', [])
-        
-        # Extract content from uploaded files
-        research_content = ""
-        if uploaded_files:
-            research_content += f"UPLOADED RESEARCH FILES ({len(uploaded_files)} files):\n"
-            for file_path in uploaded_files:
-                logger.info(f"Extracting content from file: {file_path}")
-                content = self._extract_file_content(file_path)
-                
-                # Limit content size to prevent overwhelming the LLM
-                if len(content) > 10000:
-                    content = content[:10000] + "\n[Content truncated due to length...]"
-                
-                file_extension = os.path.splitext(file_path)[1].lower()
-                research_content += f"\n\nFile: {os.path.basename(file_path)} ({file_extension})\nContent:\n{content}\n"
-        
-        if not research_content:
-            research_content = "No research files were uploaded."
+    def create_task(self, form_data: Dict[str, Any], context_analysis: str, personas: str, journey_phases: str, research_content: Optional[str] = None) -> Task:
+        if research_content is None:
+            research_content = self.extract_research_content(form_data)
         
         return Task(
             description=f"""
@@ -177,7 +94,7 @@ class ResearchAgent:
             Target Personas: {', '.join(form_data.get('target_personas', []))}
             Journey Phases: {', '.join(form_data.get('journey_phases', []))}
             Additional Context: {form_data.get('additional_context', 'None provided')}
-            Uploaded Files: {len(form_data.get('uploaded_files', []))} files
+            Uploaded Files: {len(form_data.get('uploaded_files') or [])} files
             
             Your task is to:
             1. **ANALYZE RESEARCH CONTENT THOROUGHLY**: Extract key insights, data points, customer quotes, statistics, and findings from the uploaded research files
@@ -0,0 +1,130 @@
+import math
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, List
+import logging
+from .context_compaction import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# Tokens of research passages put into a prompt, across all uploaded files
+TOKEN_BUDGET = int(os.getenv("RESEARCH_TOKEN_BUDGET", "4000"))
+PASSAGE_WORDS = 120
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset("""
+a about after all also an and any are as at be been but by can could did do does for from had has have
+how i if in into is it its just me more most my no not of on or our out so than that the their them then
+there these they this to too up us was we were what when which who will with would you your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase terms without stopwords, with plural "s" dropped so "users" matches "user" """
+    terms = []
+    for term in TOKEN_PATTERN.findall(text.lower()):
+        if len(term) < 2 or term in STOPWORDS:
+            continue
+        if len(term) > 3 and term.endswith("s") and not term.endswith("ss"):
+            term = term[:-1]
+        terms.append(term)
+    return terms
+
+
+def research_query(form_data: Dict[str, Any]) -> str:
+    """What the journey is about: industry, goals, personas, phases and extra context"""
+    return " ".join([
+        form_data.get("industry") or "",
+        form_data.get("business_goals") or "",
+        " ".join(form_data.get("target_personas") or []),
+        " ".join(form_data.get("journey_phases") or []),
+        form_data.get("additional_context") or ""
+    ])
+
+
+@dataclass
+class Passage:
+    source: str
+    position: int  # Order within its source
+    text: str
+    tokens: int
+
+
+def split_passages(source: str, text: str, passage_words: int = PASSAGE_WORDS) -> List[Passage]:
+    """Cut text into passages of about passage_words words, keeping lines together where possible"""
+    pieces: List[str] = []
+    for line in text.splitlines():
+        words = line.split()
+        for start in range(0, len(words), passage_words):
+            pieces.append(" ".join(words[start:start + passage_words]))
+
+    passages: List[Passage] = []
+    current: List[str] = []
+    words = 0
+    for piece in pieces + [None]:
+        piece_words = len(piece.split()) if piece else 0
+        if current and (piece is None or words + piece_words > passage_words):
+            passage = "\n".join(current)
+            passages.append(Passage(source=source, position=len(passages), text=passage, tokens=count_tokens(passage)))
+            current, words = [], 0
+        if piece:
+            current.append(piece)
+            words += piece_words
+    return passages
+
+
+class ResearchIndex:
+    """BM25 index over passages of a journey's research files, built in memory.
+
+    select() ranks passages against the journey's context and keeps the best
+    ones within a token budget, taking each file's best passage first so no
+    upload is dropped entirely. Selected passages are returned in document
+    order so the prompt still reads naturally.
+    """
+
+    def __init__(self, documents: Dict[str, str], k1: float = 1.5, b: float = 0.75):
+        self.passages = [passage for source, text in documents.items() for passage in split_passages(source, text)]
+        self.k1 = k1
+        self.b = b
+        self._term_counts = [Counter(tokenize(passage.text)) for passage in self.passages]
+        self._lengths = [sum(counts.values()) for counts in self._term_counts]
+        self._average_length = sum(self._lengths) / len(self._lengths) if self._lengths else 0.0
+        self._document_frequency: Counter = Counter()
+        for counts in self._term_counts:
+            self._document_frequency.update(counts.keys())
+
+    @property
+    def total_tokens(self) -> int:
+        return sum(passage.tokens for passage in self.passages)
+
+    def scores(self, query: str) -> List[float]:
+        passage_count = len(self.passages)
+        terms = set(tokenize(query))
+        idf = {
+            term: math.log(1 + (passage_count - self._document_frequency[term] + 0.5) / (self._document_frequency[term] + 0.5))
+            for term in terms if self._document_frequency[term]
+        }
+        scores = []
+        for counts, length in zip(self._term_counts, self._lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / self._average_length) if self._average_length else self.k1
+            scores.append(sum(weight * counts[term] * (self.k1 + 1) / (counts[term] + norm)
+                              for term, weight in idf.items() if counts[term]))
+        return scores
+
+    def select(self, query: str, token_budget: int) -> List[Passage]:
+        if self.total_tokens <= token_budget:
+            return list(self.passages)
+        scores = self.scores(query)
+        ranked = sorted(range(len(self.passages)), key=lambda i: (-scores[i], i))
+        best_per_source: Dict[str, int] = {}
+        for i in ranked:
+            best_per_source.setdefault(self.passages[i].source, i)
+        chosen, used = set(), 0
+        for i in list(best_per_source.values()) + ranked:
+            if i not in chosen and used + self.passages[i].tokens <= token_budget:
+                chosen.add(i)
+                used += self.passages[i].tokens
+        logger.info(f"Selected {len(chosen)} of {len(self.passages)} research passages ({used} of {self.total_tokens} tokens)")
+        return [self.passages[i] for i in sorted(chosen)]
+
@@ -0,0 +1,67 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Dict, Any, Callable, Awaitable, Tuple, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class WorkflowNode:
+    key: str  # Name of the value this node produces
+    inputs: Tuple[str, ...]  # Names of the values it needs
+    run: Callable[[Dict[str, Any]], Awaitable[Any]]  # Called with {input name: value}
+    step: Optional[int] = None  # Progress step this node reports as, if any
+
+
+class WorkflowGraph:
+    """Runs workflow nodes as soon as their inputs are available.
+
+    Nodes whose inputs do not depend on each other run concurrently. If a
+    node fails, the nodes still running are cancelled and the error is
+    raised to the caller.
+    """
+
+    def __init__(self, nodes: List[WorkflowNode], initial_inputs: Tuple[str, ...] = ()):
+        self.nodes = {node.key: node for node in nodes}
+        if len(self.nodes) != len(nodes):
+            raise ValueError("Workflow node keys must be unique")
+        self._validate(set(initial_inputs))
+
+    def _validate(self, initial_inputs: set):
+        """Check that every input is produced somewhere and that the graph has no cycles"""
+        available = set(initial_inputs)
+        remaining = dict(self.nodes)
+        while remaining:
+            ready = [key for key, node in remaining.items() if set(node.inputs) <= available]
+            if not ready:
+                raise ValueError(f"Workflow nodes have missing inputs or a cycle: {sorted(remaining)}")
+            for key in ready:
+                available.add(key)
+                del remaining[key]
+
+    async def execute(self, initial: Dict[str, Any]) -> Dict[str, Any]:
+        """Run all nodes and return every produced value, including the initial inputs"""
+        results = dict(initial)
+        pending = {key: node for key, node in self.nodes.items() if key not in results}
+        running: Dict[asyncio.Task, str] = {}
+        try:
+            while pending or running:
+                for key, node in list(pending.items()):
+                    if all(name in results for name in node.inputs):
+                        inputs = {name: results[name] for name in node.inputs}
+                        running[asyncio.create_task(node.run(inputs))] = key
+                        del pending[key]
+                        logger.debug(f"Started workflow node {key}")
+
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    key = running.pop(task)
+                    results[key] = task.result()
+                    logger.debug(f"Finished workflow node {key}")
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+        return results
@@ -0,0 +1,67 @@
+from typing import Iterable
+from fastapi import HTTPException
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from ..services.upload_service import MB, UploadService
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class UploadLimitMiddleware:
+    """Refuse upload requests over the total upload cap with 413.
+
+    Requests that declare a larger Content-Length are refused before their body
+    is read. Chunked requests are counted while the multipart parser reads them
+    and aborted once they pass the cap, so at most the cap is ever spooled. The
+    per-file cap is checked by UploadService when each file is copied.
+    """
+
+    def __init__(self, app: ASGIApp, paths: Iterable[str], service: UploadService):
+        self.app = app
+        self.paths = tuple(paths)
+        self.service = service
+
+    def _too_large(self) -> HTTPException:
+        return HTTPException(status_code=413, detail=f"Upload is larger than {self.service.max_request_bytes // MB} MB in total")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        if self.service.exceeds_request_limit(Headers(scope=scope).get("content-length")):
+            await self._reject(scope, receive, send)
+            return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.service.max_body_bytes:
+                    # Raised inside the form parser; routes re-raise HTTPException, so this becomes the response
+                    raise self._too_large()
+            return message
+
+        async def tracking_send(message: Message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except HTTPException as e:
+            if e.status_code != 413 or response_started:
+                raise
+            await self._reject(scope, receive, send)
+
+    async def _reject(self, scope: Scope, receive: Receive, send: Send):
+        logger.warning(f"Refused upload to {scope['path']} over {self.service.max_request_bytes // MB} MB")
+        response = JSONResponse(status_code=413, content={"detail": self._too_large().detail})
+        await response(scope, receive, send)
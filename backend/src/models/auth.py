@@ -40,6 +40,7 @@ class UserJourney(BaseModel):
     job_id: Optional[str] = None  # Job tracking ID
     error_message: Optional[str] = None  # Error message if failed
     progress_data: Optional[dict] = None  # Progress tracking data
+    checkpoint_data: Optional[dict] = None  # Completed workflow step outputs
 
 class SubscriptionPlan(BaseModel):
     id: str
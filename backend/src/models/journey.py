@@ -17,7 +17,10 @@ class JourneyFormData(BaseModel):
     target_personas: List[str] = Field(..., alias="targetPersonas")
     journey_phases: List[str] = Field(..., alias="journeyPhases")
     additional_context: Optional[str] = Field(None, alias="additionalContext")
-    files: Optional[List[dict]] = None
+    files: Optional[List[dict]] = None  # Original name of each upload: {"content_id", "filename"}
+    uploaded_files: Optional[List[str]] = None  # Content IDs of uploaded research files in the upload store
+    deterministic: Optional[bool] = None  # Force the LLM response cache for this journey (QA/demo replays)
+    pipeline: Optional[str] = None  # "full" (eight agent steps) or "fast" (two or three structured calls); capped by the plan
 
     # model_config = ConfigDict(populate_by_name=True)
 
@@ -77,4 +80,6 @@ class Job(BaseModel):
     progress: Optional[JobProgress] = None
     result: Optional[JourneyMap] = None
     error_message: Optional[str] = None
-    progress_history: Optional[List[Dict[str, Any]]] = Field(default_factory=list)
\ No newline at end of file
+    progress_history: Optional[List[Dict[str, Any]]] = Field(default_factory=list)
+    progress_version: int = Field(default=0, description="Incremented on every progress update")
+    usage: Optional[Dict[str, Any]] = Field(default=None, description="Token, cost and latency ledger per step")
\ No newline at end of file
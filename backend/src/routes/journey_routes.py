@@ -3,22 +3,33 @@ Journey Routes Module
 Handles all journey-related API endpoints for creation, status, and management
 """
 
-import os
+import json
 import logging
 import traceback
-import uuid
-import aiofiles
-from fastapi import APIRouter, HTTPException, Request, Depends
-from typing import Any
+from fastapi import APIRouter, HTTPException, Request, Depends, Query
+from fastapi.responses import StreamingResponse
+from typing import Any, Optional
 
 from src.models.journey import JobStatus
 from src.models.auth import UserProfile
 from src.middleware.auth_middleware import require_auth
+from src.services.progress_stream import ProgressSubscription, is_terminal_message
+from src.services.research_extraction import research_extraction_service
+from src.services.upload_service import upload_service
+from src.services.upload_store import upload_store
+from src.agents.fast_pipeline import PIPELINE_MODES
 
 # Initialize router
 router = APIRouter(prefix="/api/journey", tags=["journeys"])
 logger = logging.getLogger(__name__)
 
+# Upper bound for how long a long-poll request may be held open
+LONG_POLL_MAX_WAIT_SECONDS = 30
+
+# Server-Sent Events stream settings
+SSE_HEARTBEAT_SECONDS = 15
+SSE_MAX_PENDING_MESSAGES = 20
+
 # Global job_manager reference (will be set from main.py)
 job_manager = None
 usage_service = None
@@ -55,29 +66,26 @@ async def create_journey(
             "additionalContext": form.get("additionalContext", ""),
             "files": []
         }
+        if form.get("deterministic"):
+            form_data["deterministic"] = str(form.get("deterministic")).lower() in ("1", "true", "yes")
+        if form.get("pipeline") in PIPELINE_MODES:
+            form_data["pipeline"] = form.get("pipeline")
         
         # Handle uploaded files
-        uploaded_files = []
+        # Content IDs of files uploaded earlier through /api/files/upload, with optional fileNames in the same order
+        uploaded_files = [str(content_id) for content_id in form.getlist("fileIds")]
+        missing = upload_store.missing(uploaded_files)
+        if missing:
+            raise HTTPException(status_code=400, detail=f"Unknown or expired file IDs: {', '.join(missing)}")
+        # The store is keyed by content hash, so the journey keeps the names its user uploaded the files under
+        for content_id, filename in zip(uploaded_files, form.getlist("fileNames")):
+            form_data["files"].append({"content_id": content_id, "filename": str(filename)})
         if "files" in form:
-            files = form.getlist("files")
-            upload_dir = "/tmp/uploads"
-            os.makedirs(upload_dir, exist_ok=True)
-            
-            for file in files:
-                if hasattr(file, 'filename') and file.filename:
-                    # Generate unique filename
-                    file_id = str(uuid.uuid4())
-                    file_extension = os.path.splitext(file.filename)[1]
-                    filename = f"{file_id}{file_extension}"
-                    file_path = os.path.join(upload_dir, filename)
-                    
-                    # Save file
-                    async with aiofiles.open(file_path, 'wb') as f:
-                        content = await file.read()
-                        await f.write(content)
-                    
-                    uploaded_files.append(file_path)
-                    logger.info(f"Uploaded file: {file.filename} -> {file_path}")
+            for upload in await upload_service.save_all(form.getlist("files")):
+                uploaded_files.append(upload.content_id)
+                form_data["files"].append({"content_id": upload.content_id, "filename": upload.filename})
+                # Start text extraction now so the research step finds it ready
+                research_extraction_service.submit(upload.path)
         
         form_data["uploaded_files"] = uploaded_files
         
@@ -86,12 +94,18 @@ async def create_journey(
         # Create job
         job = await job_manager.create_job(form_data, current_user)
         
-        return {
+        response = {
             "id": job.id,
             "status": job.status.value,
             "created_at": job.created_at.isoformat(),
             "message": "Journey creation started"
         }
+
+        queue_info = job_manager.get_queue_position(job.id)
+        if queue_info:
+            response["queue"] = queue_info
+
+        return response
         
     except HTTPException:
         raise
@@ -131,6 +145,9 @@ async def get_journey_status(
         if hasattr(job, 'progress_history') and job.progress_history:
             response["progress_history"] = job.progress_history[-10:]  # Return last 10 progress updates
 
+        if job.usage:
+            response["usage"] = job.usage
+
         if job.result:
             response["result"] = job.result.dict()
 
@@ -322,12 +339,18 @@ async def get_journey_info(
 @router.get("/poll/{job_id}")
 async def poll_journey_status(
     job_id: str,
+    since_version: Optional[int] = Query(None, ge=0, description="Last progress version seen by the client"),
+    wait: float = Query(0, ge=0, description="Seconds to hold the request open waiting for a newer version"),
     current_user: UserProfile = Depends(require_auth)
 ):
     """Optimized polling endpoint for real-time job progress updates.
     
     This endpoint is designed for efficient polling with minimal overhead.
     Returns condensed progress information suitable for frequent polling.
+
+    Long-poll mode: pass since_version (the "version" from the previous
+    response) and wait (seconds, capped at LONG_POLL_MAX_WAIT_SECONDS) to
+    hold the request until the job's progress changes or the wait expires.
     """
     global job_manager
     from fastapi.responses import JSONResponse
@@ -340,11 +363,19 @@ async def poll_journey_status(
         job = await job_manager.get_job_async(job_id, current_user.id)
         if not job:
             raise HTTPException(status_code=404, detail="Job not found")
+
+        # Long-poll: hold the request until the progress version moves past since_version
+        if since_version is not None and wait > 0:
+            job = await job_manager.wait_for_progress(
+                job_id, since_version, min(wait, LONG_POLL_MAX_WAIT_SECONDS)
+            ) or job
         
         # Build optimized response for polling
         response = {
             "job_id": job_id,
             "status": job.status.value,
+            "version": job.progress_version,
+            "changed": since_version is None or job.progress_version > since_version,
             "timestamp": datetime.utcnow().isoformat()
         }
         
@@ -360,9 +391,18 @@ async def poll_journey_status(
             if hasattr(job.progress, 'estimatedTimeRemaining'):
                 response["progress"]["estimatedTimeRemaining"] = job.progress.estimatedTimeRemaining
 
+        # Include admission queue position while waiting for a workflow slot
+        if job.status == JobStatus.QUEUED:
+            queue_info = job_manager.get_queue_position(job_id)
+            if queue_info:
+                response["queue"] = queue_info
+
         # Include progress history for detailed progress tracking
         if hasattr(job, 'progress_history') and job.progress_history:
             response["progress_history"] = job.progress_history[-10:]  # Return last 10 progress updates
+
+        if job.usage:
+            response["usage"] = job.usage
         
         # Include result only if completed
         if job.status.value == "completed" and job.result:
@@ -390,3 +430,99 @@ async def poll_journey_status(
     except Exception as e:
         logger.error(f"Polling error for job {job_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Polling failed: {str(e)}")
+
+
+def _build_stream_snapshot(job) -> dict:
+    """Build an initial stream message in the same shape as JobManager progress updates"""
+    from datetime import datetime
+
+    message = {
+        "job_id": job.id,
+        "status": job.status.value,
+        "timestamp": datetime.utcnow().isoformat(),
+        "version": job.progress_version
+    }
+    if job.progress:
+        message["progress"] = job.progress.dict()
+        message["step_name"] = job.progress.step_name
+        message["message"] = job.progress.message
+    if job.usage:
+        message["usage"] = job.usage
+    if job.status == JobStatus.QUEUED:
+        queue_info = job_manager.get_queue_position(job.id)
+        if queue_info:
+            message["queue"] = queue_info
+    if job.status == JobStatus.COMPLETED and job.result:
+        message["result"] = job.result.dict()
+    if job.status == JobStatus.CANCELLED:
+        message["cancelled"] = True
+    if job.status == JobStatus.FAILED and job.error_message:
+        message["error"] = job.error_message
+        message["error_message"] = job.error_message
+    return message
+
+
+def _format_sse(event: str, data: dict) -> str:
+    """Format a Server-Sent Events frame"""
+    frame = f"event: {event}\n"
+    if data.get("version") is not None:
+        frame += f"id: {data['version']}\n"
+    return frame + f"data: {json.dumps(data, default=str)}\n\n"
+
+
+@router.get("/stream/{job_id}")
+async def stream_journey_progress(
+    job_id: str,
+    request: Request,
+    current_user: UserProfile = Depends(require_auth)
+):
+    """Stream job progress as Server-Sent Events.
+
+    Sends a "progress" event with the current state, one per progress update,
+    and a final "complete" event (with the full result when completed) before
+    closing. Comment heartbeats keep idle connections alive.
+    """
+    global job_manager
+
+    if not job_manager:
+        raise HTTPException(status_code=503, detail="Job manager not initialized")
+
+    job = await job_manager.get_job_async(job_id, current_user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    # Subscribe before taking the snapshot so no update falls in between
+    subscription = ProgressSubscription(job_id, max_pending=SSE_MAX_PENDING_MESSAGES)
+    job_manager.register_progress_callback(job_id, subscription.push)
+
+    async def event_stream():
+        try:
+            snapshot = _build_stream_snapshot(job)
+            if is_terminal_message(snapshot):
+                yield _format_sse("complete", snapshot)
+                return
+            yield _format_sse("progress", snapshot)
+
+            while True:
+                message = await subscription.next(timeout=SSE_HEARTBEAT_SECONDS)
+                if await request.is_disconnected():
+                    logger.debug(f"Stream client disconnected from job {job_id}")
+                    return
+                if message is None:
+                    yield ": heartbeat\n\n"
+                    continue
+                if is_terminal_message(message):
+                    yield _format_sse("complete", message)
+                    return
+                yield _format_sse("progress", message)
+        finally:
+            job_manager.unregister_progress_callback(job_id, subscription.push)
+            if subscription.dropped:
+                logger.info(f"Dropped {subscription.dropped} intermediate updates for slow stream on job {job_id}")
+
+    headers = {
+        "Cache-Control": "no-cache",
+        "Connection": "keep-alive",
+        "X-Accel-Buffering": "no"
+    }
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=headers)
@@ -277,6 +277,31 @@ class AuthService:
             logger.error(f"Token verification failed: {str(e)}", exc_info=True)
             return None
     
+    async def get_user_profile(self, user_id: str) -> Optional[UserProfile]:
+        """Load a user profile by ID (used by background workers that have no token)"""
+        if not self._is_available():
+            return None
+
+        try:
+            profile_response = self.supabase_admin.table("users").select("*").eq("id", user_id).execute()
+            if not profile_response.data:
+                logger.warning(f"User profile not found: {user_id}")
+                return None
+
+            profile_data = profile_response.data[0]
+
+            plan_response = self.supabase_admin.table("subscription_plans").select("journey_limit").eq("id", profile_data.get("plan_type", "free")).execute()
+            profile_data['journey_limit'] = plan_response.data[0]["journey_limit"] if plan_response.data else 2
+
+            user_profile = UserProfile(**profile_data)
+            if user_profile.openai_api_key:
+                user_profile.openai_api_key = self._decrypt_api_key(user_profile.openai_api_key)
+            return user_profile
+
+        except Exception as e:
+            logger.error(f"Failed to load user profile {user_id}: {str(e)}")
+            return None
+
     async def update_user_settings(self, user_id: str, openai_api_key: Optional[str]) -> UserProfile:
         """Update user settings including OpenAI API key"""
         try:
@@ -0,0 +1,199 @@
+import csv
+import os
+from collections import Counter
+from typing import Any, Dict, List, Optional
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+CHUNK_ROWS = int(os.getenv("CSV_PROFILE_CHUNK_ROWS", "50000"))
+MAX_COLUMNS = int(os.getenv("CSV_PROFILE_MAX_COLUMNS", "40"))
+TEXT_SAMPLES = int(os.getenv("CSV_PROFILE_TEXT_SAMPLES", "5"))
+NUMERIC_SAMPLE_SIZE = 10000  # Values kept per numeric column for quantiles
+MAX_TRACKED_VALUES = 1000  # Distinct values counted per column before the rarest are dropped
+TOP_VALUES = 5
+SAMPLE_CHARS = 300
+TYPE_THRESHOLD = 0.9  # Share of sampled values that must parse for a numeric or date type
+TYPE_SAMPLE_SIZE = 500  # First-chunk values used to decide a column's type
+SEED = 7  # Fixed so the same file always yields the same profile (and LLM cache key)
+
+
+def _format_number(value: float) -> str:
+    if float(value).is_integer() and abs(value) < 1e15:
+        return f"{int(value):,}"
+    return f"{value:,.4g}" if abs(value) < 1e6 else f"{value:,.0f}"
+
+
+def _parse_dates(values: pd.Series) -> pd.Series:
+    return pd.to_datetime(values, errors="coerce", format="mixed")
+
+
+class BottomKSample:
+    """Uniform sample of a stream without replacement: the k values with the smallest random keys"""
+
+    def __init__(self, size: int, rng: np.random.Generator):
+        self.size = size
+        self.rng = rng
+        self.keys = np.empty(0)
+        self.values = np.empty(0, dtype=object)
+
+    def add(self, values: np.ndarray):
+        if not len(values):
+            return
+        keys = np.concatenate([self.keys, self.rng.random(len(values))])
+        values = np.concatenate([self.values, values.astype(object)])
+        if len(keys) > self.size:
+            keep = np.argpartition(keys, self.size)[:self.size]
+            keys, values = keys[keep], values[keep]
+        self.keys, self.values = keys, values
+
+    def sorted_values(self) -> List[Any]:
+        """Sampled values in sample-key order, which is random but stable for a file"""
+        return list(self.values[np.argsort(self.keys)])
+
+
+class ColumnProfile:
+    """Running statistics for one column, updated one chunk at a time"""
+
+    def __init__(self, name: str, rng: np.random.Generator):
+        self.name = name
+        self.kind: Optional[str] = None  # numeric | date | category | text, decided from the first chunk
+        self.count = 0
+        self.missing = 0
+        self.total_chars = 0
+        self.counts: Counter = Counter()
+        self.counts_truncated = False
+        self.minimum: Any = None
+        self.maximum: Any = None
+        self.total = 0.0
+        self.numeric_count = 0
+        self.numbers = BottomKSample(NUMERIC_SAMPLE_SIZE, rng)
+        self.texts = BottomKSample(TEXT_SAMPLES, rng)
+
+    def _detect_kind(self, values: pd.Series) -> str:
+        values = values.head(TYPE_SAMPLE_SIZE)
+        if pd.to_numeric(values, errors="coerce").notna().mean() >= TYPE_THRESHOLD:
+            return "numeric"
+        if values.str.contains(r"\d", regex=True).mean() >= TYPE_THRESHOLD and \
+                _parse_dates(values).notna().mean() >= TYPE_THRESHOLD:
+            return "date"
+        lengths = values.str.len()
+        distinct_share = values.nunique() / len(values)
+        if lengths.mean() > 40 or (distinct_share > 0.5 and values.str.contains(" ").mean() > 0.5):
+            return "text"
+        return "category"
+
+    def _count_values(self, values: pd.Series):
+        self.counts.update(values.value_counts().head(MAX_TRACKED_VALUES).to_dict())
+        if len(self.counts) > MAX_TRACKED_VALUES:
+            # Keep the most frequent half; counts of common values stay close to exact
+            self.counts = Counter(dict(self.counts.most_common(MAX_TRACKED_VALUES // 2)))
+            self.counts_truncated = True
+
+    def _track_range(self, low: Any, high: Any):
+        self.minimum = low if self.minimum is None else min(self.minimum, low)
+        self.maximum = high if self.maximum is None else max(self.maximum, high)
+
+    def update(self, column: pd.Series):
+        values = column.dropna().str.strip()
+        values = values[values != ""]
+        self.missing += len(column) - len(values)
+        if values.empty:
+            return
+        if self.kind is None:
+            self.kind = self._detect_kind(values)
+        self.count += len(values)
+        self.total_chars += int(values.str.len().sum())
+
+        if self.kind == "numeric":
+            numbers = pd.to_numeric(values, errors="coerce").dropna()
+            if not numbers.empty:
+                self._track_range(float(numbers.min()), float(numbers.max()))
+                self.total += float(numbers.sum())
+                self.numeric_count += len(numbers)
+                self.numbers.add(numbers.to_numpy(dtype=float))
+            self._count_values(values)
+        elif self.kind == "date":
+            # Dates repeat a lot and parsing mixed formats is slow, so parse each distinct value once
+            dates = _parse_dates(pd.Series(values.unique())).dropna()
+            if not dates.empty:
+                self._track_range(dates.min(), dates.max())
+        elif self.kind == "text":
+            self.texts.add(values.to_numpy())
+        else:
+            self._count_values(values)
+
+    def _top_values(self) -> str:
+        top = ", ".join(f"{value} ({count / self.count:.0%})" for value, count in self.counts.most_common(TOP_VALUES))
+        return f"  Top values: {top}"
+
+    def describe(self) -> List[str]:
+        rows = self.count + self.missing
+        missing = f", {self.missing / rows:.0%} missing" if rows and self.missing else ""
+        if not self.count:
+            return [f'Column "{self.name}": empty']
+        if self.kind == "numeric":
+            lines = [f'Column "{self.name}": numeric, {self.count:,} values{missing}']
+            numbers = np.array(self.numbers.sorted_values(), dtype=float)
+            if len(numbers):
+                p25, median, p75 = np.percentile(numbers, [25, 50, 75])
+                lines.append(
+                    f"  min {_format_number(self.minimum)}, p25 {_format_number(p25)}, median {_format_number(median)}, "
+                    f"p75 {_format_number(p75)}, max {_format_number(self.maximum)}, "
+                    f"mean {_format_number(self.total / self.numeric_count)}"
+                )
+            if len(self.counts) <= 12 and not self.counts_truncated:
+                lines.append(self._top_values())  # Few distinct values, e.g. a 1-5 rating
+            return lines
+        if self.kind == "date":
+            return [f'Column "{self.name}": date, {self.count:,} values{missing}, '
+                    f'from {self.minimum.date()} to {self.maximum.date()}']
+        if self.kind == "text":
+            lines = [f'Column "{self.name}": free text, {self.count:,} answers{missing}, '
+                     f'average {self.total_chars // self.count} characters. Sampled answers:']
+            for text in self.texts.sorted_values():
+                text = " ".join(str(text).split())
+                lines.append(f'  - "{text[:SAMPLE_CHARS]}{"..." if len(text) > SAMPLE_CHARS else ""}"')
+            return lines
+        distinct = f"{len(self.counts):,}+" if self.counts_truncated else f"{len(self.counts):,}"
+        return [f'Column "{self.name}": categorical, {self.count:,} values{missing}, {distinct} distinct', self._top_values()]
+
+
+def _sniff_delimiter(file_path: str) -> str:
+    with open(file_path, "r", encoding="utf-8", errors="replace", newline="") as file:
+        head = file.read(64 * 1024)
+    try:
+        return csv.Sniffer().sniff(head, delimiters=",;\t|").delimiter
+    except csv.Error:
+        return ","
+
+
+def profile_csv(file_path: str, chunk_rows: Optional[int] = None) -> str:
+    """Compact statistical profile of a CSV, read in chunks so memory stays bounded for any file size"""
+    rng = np.random.default_rng(SEED)
+    profiles: Dict[str, ColumnProfile] = {}
+    rows = 0
+    reader = pd.read_csv(
+        file_path, sep=_sniff_delimiter(file_path), dtype=str, chunksize=chunk_rows or CHUNK_ROWS,
+        encoding="utf-8", encoding_errors="replace", on_bad_lines="skip", skipinitialspace=True
+    )
+    with reader:
+        for chunk in reader:
+            rows += len(chunk)
+            for name in chunk.columns[:MAX_COLUMNS]:
+                if name not in profiles:
+                    profiles[name] = ColumnProfile(str(name), rng)
+                profiles[name].update(chunk[name])
+            columns = list(chunk.columns)
+
+    if not rows:
+        return "[CSV file has no data rows]"
+    lines = [f"CSV PROFILE: {rows:,} rows, {len(columns)} columns"]
+    for profile in profiles.values():
+        lines.extend(profile.describe())
+    if len(columns) > MAX_COLUMNS:
+        lines.append(f"Other columns (not profiled): {', '.join(map(str, columns[MAX_COLUMNS:]))}")
+    logger.info(f"Profiled CSV {file_path}: {rows} rows, {len(columns)} columns")
+    return "\n".join(lines)
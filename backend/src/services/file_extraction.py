@@ -0,0 +1,221 @@
+import os
+import csv
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+import PyPDF2
+import docx
+import fitz
+import pdfplumber
+from .csv_profile import profile_csv
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = ('.pdf', '.docx', '.csv', '.txt')
+EXTRACTED_TEXT_SUFFIX = ".extracted.txt"
+
+
+# Characters of each research file indexed for the research step; extraction stops once it has this many
+CHAR_BUDGET = int(os.getenv("RESEARCH_FILE_CHAR_BUDGET", "60000"))
+PDF_BACKENDS = ("pymupdf", "pypdf2", "pdfplumber")  # Fastest first
+PDF_PROBE_PAGES = 3
+
+
+class PdfPages:
+    """Page-by-page text access to a PDF through one library"""
+
+    def __init__(self, backend: str, file_path: str):
+        self.backend = backend
+        self._file = None
+        if backend == "pymupdf":
+            self._doc = fitz.open(file_path)
+            self.page_count = self._doc.page_count
+        elif backend == "pypdf2":
+            self._file = open(file_path, 'rb')
+            self._doc = PyPDF2.PdfReader(self._file)
+            self.page_count = len(self._doc.pages)
+        else:
+            self._doc = pdfplumber.open(file_path)
+            self.page_count = len(self._doc.pages)
+
+    def text(self, index: int) -> str:
+        if self.backend == "pymupdf":
+            return self._doc[index].get_text() or ""
+        page = self._doc.pages[index]
+        text = page.extract_text() or ""
+        if self.backend == "pdfplumber":
+            page.close()  # Drop the page's parsed layout objects
+        return text
+
+    def close(self):
+        self._doc.close()
+        if self._file:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _read_pages(pdf: PdfPages, start: int, stop: int, char_budget: Optional[int], pages: List[str]) -> List[str]:
+    """Append page texts from start to stop, stopping once char_budget characters are collected"""
+    chars = sum(len(text) for text in pages)
+    for index in range(start, stop):
+        if char_budget is not None and chars >= char_budget:
+            break
+        try:
+            text = pdf.text(index)
+        except Exception as e:
+            logger.warning(f"{pdf.backend} could not read page {index + 1}: {e}")
+            text = ""
+        pages.append(text)
+        chars += len(text)
+    return pages
+
+
+def _probe_pdf(file_path: str) -> Tuple[PdfPages, List[str]]:
+    """Open a PDF with the fastest library that finds text on its first pages; returns those pages too"""
+    fallback = None
+    for backend in PDF_BACKENDS:
+        try:
+            pdf = PdfPages(backend, file_path)
+        except Exception as e:
+            logger.warning(f"{backend} could not open {file_path}: {e}")
+            continue
+        pages = _read_pages(pdf, 0, min(PDF_PROBE_PAGES, pdf.page_count), None, [])
+        if any(text.strip() for text in pages):
+            if fallback:
+                fallback[0].close()
+            return pdf, pages
+        if fallback is None:
+            fallback = (pdf, pages)  # Text may start after the probed pages
+        else:
+            pdf.close()
+    if fallback is None:
+        raise ValueError("no PDF library could open the file")
+    return fallback
+
+
+def extract_pdf_pages(file_path: str, start: int = 0, stop: Optional[int] = None, backend: Optional[str] = None,
+                      char_budget: Optional[int] = None) -> Dict[str, Any]:
+    """Text of pages start..stop, read lazily until char_budget characters are collected.
+
+    Without a backend the file is probed first (start must be 0) and the
+    chosen backend is returned with the page count, so later page ranges of
+    the same file can be read in other processes. Runs in the extraction
+    process pool, so it must stay a module-level function.
+    """
+    pdf, pages = (PdfPages(backend, file_path), []) if backend else _probe_pdf(file_path)
+    with pdf:
+        stop = pdf.page_count if stop is None else min(stop, pdf.page_count)
+        pages = _read_pages(pdf, start + len(pages[:stop]), stop, char_budget, pages[:stop])
+        return {"backend": pdf.backend, "page_count": pdf.page_count, "pages": pages}
+
+
+def join_pdf_pages(file_path: str, pages: List[str], backend: str, page_count: int) -> str:
+    text = "\n".join(page for page in pages if page).strip()
+    if not text:
+        return f"[Unable to extract text from PDF file: {file_path}. File may be image-based or corrupted.]"
+    logger.info(f"Extracted {len(text)} characters from {len(pages)} of {page_count} PDF pages using {backend}")
+    return text
+
+
+def _extract_pdf_text(file_path: str, char_budget: Optional[int] = CHAR_BUDGET) -> str:
+    """Extract PDF text page by page with the fastest working library, up to the character budget"""
+    try:
+        result = extract_pdf_pages(file_path, char_budget=char_budget)
+        return join_pdf_pages(file_path, result["pages"], result["backend"], result["page_count"])
+    except Exception as e:
+        logger.error(f"Error extracting PDF text from {file_path}: {e}")
+        return f"[Error reading PDF file: {str(e)}]"
+
+
+def _extract_docx_text(file_path: str) -> str:
+    """Extract text from DOCX file"""
+    try:
+        doc = docx.Document(file_path)
+        text = ""
+        for paragraph in doc.paragraphs:
+            text += paragraph.text + "\n"
+        return text.strip()
+    except Exception as e:
+        logger.error(f"Error extracting DOCX text from {file_path}: {e}")
+        return f"[Error reading DOCX file: {str(e)}]"
+
+
+def _extract_csv_text(file_path: str) -> str:
+    """Statistical profile of a CSV file, or its first rows if it cannot be profiled"""
+    try:
+        return profile_csv(file_path)
+    except Exception as e:
+        logger.warning(f"Could not profile CSV {file_path}, using its first rows: {e}")
+    try:
+        with open(file_path, 'r', encoding='utf-8', errors='ignore') as file:
+            csv_reader = csv.reader(file)
+            rows = []
+            for i, row in enumerate(csv_reader):
+                if i < 100:  # Limit to first 100 rows
+                    rows.append(", ".join(row))
+                else:
+                    break
+            return "\n".join(rows)
+    except Exception as e:
+        logger.error(f"Error extracting CSV text from {file_path}: {e}")
+        return f"[Error reading CSV file: {str(e)}]"
+
+
+def _extract_txt_text(file_path: str) -> str:
+    """Extract text from TXT file"""
+    try:
+        with open(file_path, 'r', encoding='utf-8', errors='ignore') as file:
+            return file.read()
+    except Exception as e:
+        logger.error(f"Error extracting TXT text from {file_path}: {e}")
+        return f"[Error reading TXT file: {str(e)}]"
+
+
+def extract_file_content(file_path: str) -> str:
+    """Extract content from various file types"""
+    if not os.path.exists(file_path):
+        return f"[File not found: {file_path}]"
+
+    file_extension = os.path.splitext(file_path)[1].lower()
+
+    if file_extension == '.pdf':
+        return _extract_pdf_text(file_path)
+    elif file_extension == '.docx':
+        return _extract_docx_text(file_path)
+    elif file_extension == '.csv':
+        return _extract_csv_text(file_path)
+    elif file_extension == '.txt':
+        return _extract_txt_text(file_path)
+    else:
+        return f"[Unsupported file type: {file_extension}]"
+
+
+def extracted_text_path(file_path: str) -> str:
+    """Where the extracted text of an upload is stored"""
+    return file_path + EXTRACTED_TEXT_SUFFIX
+
+
+def store_extracted_text(file_path: str, content: str):
+    """Store extracted text next to the upload so other processes can reuse it"""
+    if os.path.exists(file_path):
+        target = extracted_text_path(file_path)
+        try:
+            with open(target + ".tmp", 'w', encoding='utf-8') as file:
+                file.write(content)
+            os.replace(target + ".tmp", target)
+        except OSError as e:
+            logger.warning(f"Could not store extracted text for {file_path}: {e}")
+
+
+def extract_to_sidecar(file_path: str) -> str:
+    """Extract a file's text and store it next to the upload.
+
+    Runs in the extraction process pool, so it must stay a module-level function.
+    """
+    content = extract_file_content(file_path)
+    store_extracted_text(file_path, content)
+    return content
@@ -1,7 +1,10 @@
 import asyncio
+import heapq
+import os
 import uuid
+from collections import OrderedDict
 from datetime import datetime
-from typing import Dict, Callable, Optional, Any, List
+from typing import Dict, Callable, Optional, Any, List, Set
 import json
 import openai
 import traceback
@@ -9,73 +12,214 @@ from litellm import RateLimitError, AuthenticationError
 from fastapi import HTTPException
 from ..models.journey import Job, JobStatus, JobProgress, JourneyFormData, JourneyMap, Persona, JourneyPhase
 from ..models.auth import UserProfile
-from ..agents.crew_coordinator import CrewCoordinator
+from ..agents.crew_coordinator import CrewCoordinator, StepFailedError
+from ..agents.fast_pipeline import resolve_pipeline
 from ..services.usage_service import usage_service
+from ..services.auth_service import auth_service
+from ..services.progress_buffer import ProgressWriteBuffer
+from ..services.job_queue import JobQueue, create_job_queue
+from ..services.job_scheduler import FairJobScheduler, effective_key_id
+from ..services.token_ledger import TokenBudgetExceeded
+from ..services.upload_store import upload_store
 import logging
 import time
 
 logger = logging.getLogger(__name__)
 
+# Statuses that count as a running journey for a user
+ACTIVE_STATUSES = (JobStatus.QUEUED, JobStatus.PROCESSING)
+
 # Import safe_json from main module
 def safe_json(data):
     """Convert data to JSON-safe format, handling datetime objects"""
     return json.dumps(data, default=str)
 
 class JobManager:
-    def __init__(self):
+    def __init__(self, max_concurrent_workflows: Optional[int] = None, execution_mode: Optional[str] = None, job_queue: Optional[JobQueue] = None):
         self.jobs: Dict[str, Job] = {}
         self.progress_callbacks: Dict[str, List[Callable]] = {}
         self._cleanup_tasks: Dict[str, asyncio.Task] = {}
         self._workflow_tasks: Dict[str, asyncio.Task] = {}
-        self._last_progress_save: Dict[str, float] = {}  # Track last progress save time per job
+        self._progress_buffer = ProgressWriteBuffer()  # Write-behind buffer for progress ticks
+        self._progress_events: Dict[str, asyncio.Event] = {}  # job_id -> event set on the next progress update
+        self._active_jobs_by_user: Dict[str, Set[str]] = {}  # user_id -> IDs of queued/processing jobs
+        self.workflow_timeout_seconds = float(os.getenv("WORKFLOW_TIMEOUT_SECONDS", "900"))  # Backstop for a whole run
+
+        # Admission queue: a fixed pool of worker slots pulls jobs from the fair scheduler
+        # (plan-weighted fair share per API key and user, see FairJobScheduler)
+        self.max_concurrent_workflows = max(1, max_concurrent_workflows or int(os.getenv("MAX_CONCURRENT_WORKFLOWS", "2")))
+        self._scheduler = FairJobScheduler()
+        self.rate_limit_cooldown_seconds = float(os.getenv("SCHEDULER_RATE_LIMIT_COOLDOWN_SECONDS", "30"))
+        self._token_usage_totals: Dict[str, Dict[str, float]] = {}  # "plan/key" -> token and cost totals of finished runs
+        self._token_usage_by_user: "OrderedDict[str, Dict[str, float]]" = OrderedDict()  # user_id -> totals, most recent last
+        self.token_usage_max_users = max(1, int(os.getenv("TOKEN_USAGE_MAX_USERS", "1000")))
+        self._queue_condition = asyncio.Condition()
+        self._worker_tasks: List[asyncio.Task] = []
+        self._running_since: Dict[str, float] = {}  # job_id -> start time of jobs holding a slot
+        self._avg_workflow_seconds = float(os.getenv("ESTIMATED_WORKFLOW_SECONDS", "180"))
+
+        # Execution mode: "inline" runs workflows in this process, "queue" hands them to
+        # out-of-process workers (python -m src.worker) and mirrors their progress here
+        self.execution_mode = (execution_mode or os.getenv("JOB_EXECUTION_MODE", "inline")).lower()
+        self.job_queue: Optional[JobQueue] = None
+        if self.execution_mode == "queue":
+            self.job_queue = job_queue or create_job_queue()
+        self.remote_sync_interval = float(os.getenv("REMOTE_SYNC_INTERVAL_SECONDS", "1"))
+        self._remote_sync_task: Optional[asyncio.Task] = None
+        self._remote_queue_positions: Dict[str, int] = {}
+        self._shutting_down = False  # Set by close(); workflows it interrupts stay "processing" for recovery
+
+        # Finished-job cache: terminal jobs are kept in LRU order and evicted by size and TTL.
+        # Evicted jobs reload from the database through get_job_async/load_job_state.
+        self.finished_job_cache_size = max(1, int(os.getenv("JOB_CACHE_MAX_SIZE", "500")))
+        self.finished_job_ttl_seconds = float(os.getenv("JOB_CACHE_TTL_SECONDS", "3600"))
+        self._finished_jobs: "OrderedDict[str, float]" = OrderedDict()  # job_id -> last access time
+        self._cache_stats = {"hits": 0, "misses": 0, "reloads": 0, "evictions": 0, "expirations": 0}
     
     def safe_json(self, data):
         """Convert data to JSON-safe format, handling datetime objects"""
         import json
         return json.dumps(data, default=str)
 
+    def _index_job(self, job: Job):
+        """Keep the per-user active job index in sync with a job's current status"""
+        if job.status in ACTIVE_STATUSES:
+            self._active_jobs_by_user.setdefault(job.user_id, set()).add(job.id)
+            return
+
+        active_ids = self._active_jobs_by_user.get(job.user_id)
+        if active_ids is not None:
+            active_ids.discard(job.id)
+            if not active_ids:
+                del self._active_jobs_by_user[job.user_id]
+
+    def _set_job_status(self, job: Job, status: JobStatus):
+        """Change a job's status and update the per-user active job index"""
+        job.status = status
+        self._index_job(job)
+        if status not in ACTIVE_STATUSES:
+            self._touch_finished_job(job.id)
+
+    def _store_job(self, job: Job):
+        """Add a job to memory and index it"""
+        self.jobs[job.id] = job
+        self._index_job(job)
+        if job.status not in ACTIVE_STATUSES:
+            self._touch_finished_job(job.id)
+        elif self.job_queue:
+            # Jobs reloaded after a restart, or created by another API process, still need worker progress
+            self._ensure_remote_sync()
+
+    def _touch_finished_job(self, job_id: str):
+        """Mark a finished job as most recently used and enforce the cache limits"""
+        self._finished_jobs[job_id] = time.time()
+        self._finished_jobs.move_to_end(job_id)
+        self._evict_finished_jobs()
+
+    def _evict_finished_jobs(self):
+        """Drop finished jobs that are past the TTL or beyond the size limit"""
+        cutoff = time.time() - self.finished_job_ttl_seconds
+        while self._finished_jobs:
+            job_id, last_access = next(iter(self._finished_jobs.items()))
+            if last_access < cutoff:
+                self._cache_stats["expirations"] += 1
+            elif len(self._finished_jobs) > self.finished_job_cache_size:
+                self._cache_stats["evictions"] += 1
+            else:
+                break
+            self._finished_jobs.popitem(last=False)
+            self._release_job(job_id)
+
+    def _release_job(self, job_id: str):
+        """Free all in-memory state held for a finished job"""
+        self.jobs.pop(job_id, None)
+        self.progress_callbacks.pop(job_id, None)
+        self._progress_events.pop(job_id, None)
+        self._remote_queue_positions.pop(job_id, None)
+        cleanup_task = self._cleanup_tasks.pop(job_id, None)
+        if cleanup_task and not cleanup_task.done():
+            cleanup_task.cancel()
+        logger.debug(f"Evicted finished job {job_id} from memory")
+
+    def _lookup_job(self, job_id: str) -> Optional[Job]:
+        """Return a job from memory, recording cache hits and misses"""
+        self._evict_finished_jobs()
+        job = self.jobs.get(job_id)
+        if job:
+            self._cache_stats["hits"] += 1
+            if job_id in self._finished_jobs:
+                self._touch_finished_job(job_id)
+        else:
+            self._cache_stats["misses"] += 1
+        return job
+
+    def get_progress_write_stats(self) -> Dict[str, Any]:
+        """Return write-behind progress buffer counters"""
+        return self._progress_buffer.get_stats()
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Return job cache counters and current sizes"""
+        return {
+            **self._cache_stats,
+            "jobs_in_memory": len(self.jobs),
+            "finished_jobs_cached": len(self._finished_jobs),
+            "max_finished_jobs": self.finished_job_cache_size,
+            "ttl_seconds": self.finished_job_ttl_seconds
+        }
+
     async def save_job_state(self, job_id: str, force: bool = False) -> bool:
-        """Save job state to database with throttling"""
+        """Save job state to database.
+
+        Progress ticks go through the write-behind buffer and are flushed in
+        batches; terminal states (or force=True) are written immediately.
+        """
         if job_id not in self.jobs:
             logger.warning(f"Cannot save job {job_id}: not found in memory")
             return False
 
         job = self.jobs[job_id]
-        current_time = time.time()
 
-        # Throttle saves to avoid too frequent database updates (max every 10 seconds)
-        if not force and job_id in self._last_progress_save:
-            if current_time - self._last_progress_save[job_id] < 10:
-                logger.debug(f"Skipping save for job {job_id} - throttled (last save {current_time - self._last_progress_save[job_id]:.1f}s ago)")
-                return True  # Return True to avoid triggering error handling
+        # Prepare progress data
+        progress_data = None
+        if job.progress:
+            progress_data = {
+                "current_step": job.progress.current_step,
+                "total_steps": job.progress.total_steps,
+                "step_name": job.progress.step_name,
+                "message": job.progress.message,
+                "percentage": job.progress.percentage,
+                "progress_version": job.progress_version,
+                "updated_at": datetime.now().isoformat()
+            }
+
+        # Add progress history if available
+        if hasattr(job, 'progress_history') and job.progress_history:
+            if progress_data is None:
+                progress_data = {}
+            progress_data["progress_history"] = job.progress_history[-10:]  # Save last 10 progress updates
+
+        if job.usage:
+            progress_data = progress_data or {}
+            progress_data["usage"] = job.usage
+
+        if not force and job.status in ACTIVE_STATUSES:
+            self._progress_buffer.put(job_id, job.status.value, progress_data)
+            return True
 
         try:
-            # Prepare progress data
-            progress_data = None
-            if job.progress:
-                progress_data = {
-                    "current_step": job.progress.current_step,
-                    "total_steps": job.progress.total_steps,
-                    "step_name": job.progress.step_name,
-                    "message": job.progress.message,
-                    "percentage": job.progress.percentage,
-                    "updated_at": datetime.now().isoformat()
-                }
-
-            # Add progress history if available
-            if hasattr(job, 'progress_history') and job.progress_history:
-                if progress_data is None:
-                    progress_data = {}
-                progress_data["progress_history"] = job.progress_history[-10:]  # Save last 10 progress updates
+            # Keep the error with terminal progress so it survives the overwrite
+            if job.error_message and job.status == JobStatus.FAILED:
+                progress_data = progress_data or {}
+                progress_data["error"] = job.error_message
 
-            # Update database
+            # A buffered tick must not land after this write
+            await self._progress_buffer.discard(job_id)
             await usage_service.update_journey_status(
                 journey_id=job_id,
                 status=job.status.value,
                 progress_data=progress_data
             )
 
-            self._last_progress_save[job_id] = current_time
             logger.debug(f"Saved job state for {job_id} (status: {job.status.value})")
             return True
 
@@ -121,6 +265,8 @@ class JobManager:
                         message=progress_data.get("message", ""),
                         percentage=progress_data.get("percentage", 0)
                     )
+                job.progress_version = progress_data.get("progress_version", 0)
+                job.usage = progress_data.get("usage")
 
                 # Load progress history
                 if progress_data.get("progress_history"):
@@ -145,7 +291,12 @@ class JobManager:
             return None
 
     async def recover_in_progress_journeys(self) -> int:
-        """Recover journeys that were in progress when the backend restarted"""
+        """Resume journeys that were in progress when the backend restarted"""
+        if self.job_queue:
+            # Workers own running journeys; expired leases are reclaimed from the queue
+            logger.info("Job queue mode - in-progress journeys are recovered by workers")
+            return 0
+
         try:
             # Get all journeys that were in processing state
             in_progress_journeys = await usage_service.get_in_progress_journeys()
@@ -161,13 +312,15 @@ class JobManager:
 
                 # Load job state from database
                 job = await self.load_job_state(job_id)
-                if job:
-                    # Add to in-memory jobs
-                    self.jobs[job_id] = job
+                if not job:
+                    continue
 
-                    # Get user profile (we need this to resume workflow)
-                    # For now, we'll mark it as failed and let the user restart
-                    # This prevents orphaned workflows from running without proper user context
+                # The workflow needs the user's API key, so reload the full profile
+                user = await auth_service.get_user_profile(user_journey.user_id)
+                if not user:
+                    job.error_message = "Backend restarted during processing"
+                    self._set_job_status(job, JobStatus.FAILED)
+                    self._store_job(job)
                     await usage_service.update_journey_status(
                         journey_id=job_id,
                         status="failed",
@@ -177,9 +330,17 @@ class JobManager:
                             "recovered_at": datetime.now().isoformat()
                         }
                     )
+                    logger.warning(f"Could not load user {user_journey.user_id} - marked journey {job_id} as failed")
+                    continue
+
+                # Re-queue the job; the workflow skips steps that have checkpoints
+                self._set_job_status(job, JobStatus.QUEUED)
+                job.updated_at = datetime.now()
+                self._store_job(job)
+                await self._enqueue_job(job_id, user)
 
-                    recovered_count += 1
-                    logger.info(f"Marked journey {job_id} for recovery")
+                recovered_count += 1
+                logger.info(f"Resuming journey {job_id} from its last checkpoint")
 
             logger.info(f"Recovered {recovered_count} in-progress journeys")
             return recovered_count
@@ -211,7 +372,8 @@ class JobManager:
                 user_id=user.id,
                 form_data=journey_form_data
             )
-            self.jobs[job_id] = job
+            self._store_job(job)
+            await self._reference_uploads(job_id, journey_form_data.uploaded_files or [])
 
             # Record it in Supabase with job_id for tracking
             try:
@@ -225,8 +387,11 @@ class JobManager:
             except Exception as db_err:
                 logger.error(f"Failed to record journey in DB: {db_err}")
 
-            # Start workflow
-            asyncio.create_task(self._run_agent_workflow(job_id, user))
+            # Queue the workflow; it starts as soon as a worker slot is free
+            if self.job_queue:
+                await self._enqueue_remote_job(job, user)
+            else:
+                await self._enqueue_job(job_id, user)
             return job
         except HTTPException:
             raise
@@ -234,10 +399,256 @@ class JobManager:
             logger.error(f"Error creating journey: {str(e)}")
             raise e
 
-    
+    async def _reference_uploads(self, job_id: str, content_ids: List[str]):
+        """Keep a journey's research uploads out of upload garbage collection while it may run"""
+        if not content_ids:
+            return
+        try:
+            await asyncio.to_thread(upload_store.add_refs, job_id, content_ids)
+        except Exception as e:
+            logger.error(f"Failed to reference uploads for job {job_id}: {e}")
+
+    async def _release_uploads(self, job_id: str):
+        try:
+            await asyncio.to_thread(upload_store.release_refs, job_id)
+        except Exception as e:
+            logger.warning(f"Failed to release uploads for job {job_id}: {e}")
+
+    def _ensure_workers(self):
+        """Start the worker pool lazily so it binds to the running event loop"""
+        self._worker_tasks = [task for task in self._worker_tasks if not task.done()]
+        while len(self._worker_tasks) < self.max_concurrent_workflows:
+            slot = len(self._worker_tasks)
+            self._worker_tasks.append(asyncio.create_task(self._worker_loop(slot)))
+            logger.info(f"Started workflow worker slot {slot}")
+
+    async def _enqueue_job(self, job_id: str, user: UserProfile):
+        """Add a job to the admission queue"""
+        self._ensure_workers()
+        async with self._queue_condition:
+            self._scheduler.push(job_id, user)
+            self._queue_condition.notify()
+        logger.info(f"Queued job {job_id} for {user.plan_type} plan (position {self._scheduler.position(job_id)}, {len(self._running_since)}/{self.max_concurrent_workflows} slots busy)")
+
+    async def _enqueue_remote_job(self, job: Job, user: UserProfile):
+        """Hand a job to out-of-process workers through the job queue"""
+        payload = {
+            # The API key is not written to the queue; workers resolve it from the user profile
+            "user": user.dict(exclude={"openai_api_key"}),
+            "form_data": job.form_data.dict(by_alias=True)
+        }
+        await self.job_queue.enqueue(job.id, user.id, payload)
+        self._remote_queue_positions[job.id] = len(self._remote_queue_positions) + 1
+        self._ensure_remote_sync()
+        logger.info(f"Queued job {job.id} for out-of-process workers")
+
+    def _ensure_remote_sync(self):
+        """Start mirroring worker progress into memory"""
+        if self._remote_sync_task is None or self._remote_sync_task.done():
+            self._remote_sync_task = asyncio.create_task(self._remote_sync_loop())
+
+    async def _remote_sync_loop(self):
+        """Poll the job queue for progress of active jobs and publish it locally"""
+        while True:
+            try:
+                active_ids = [job_id for ids in self._active_jobs_by_user.values() for job_id in ids]
+                states = await self.job_queue.get_states(active_ids)
+                for job_id, state in states.items():
+                    job = self.jobs.get(job_id)
+                    if job:
+                        await self._apply_remote_state(job, state)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Failed to sync job progress from queue: {e}")
+            await asyncio.sleep(self.remote_sync_interval)
+
+    async def _apply_remote_state(self, job: Job, state: Dict[str, Any]):
+        """Apply the latest worker-published state of a job to its in-memory copy"""
+        if state.get("position"):
+            self._remote_queue_positions[job.id] = state["position"]
+        else:
+            self._remote_queue_positions.pop(job.id, None)
+
+        message = state.get("progress")
+        if message and state["progress_version"] > job.progress_version:
+            message = dict(message)
+            if message.get("progress"):
+                job.progress = JobProgress(**message["progress"])
+            if message.get("error"):
+                job.error_message = message["error"]
+            if message.get("usage"):
+                job.usage = message["usage"]
+            if message.get("result"):
+                # Workers publish the result by alias so it round-trips through JourneyMap
+                job.result = JourneyMap(**message["result"])
+                message["result"] = job.result.dict()
+            job.progress_version = state["progress_version"]
+            job.updated_at = datetime.now()
+            message["version"] = job.progress_version
+            self._set_job_status(job, JobStatus(message.get("status", job.status.value)))
+            await self._publish_progress(job, message)
+            return
+
+        # The queue gave up on the job (e.g. its workers kept dying) without a final message
+        if state["status"] in ("failed", "cancelled") and job.status in ACTIVE_STATUSES:
+            job.error_message = job.error_message or "Journey generation stopped unexpectedly. Please try again."
+            self._set_job_status(job, JobStatus(state["status"]))
+            await self._update_progress(job.id, -1, state["status"].capitalize(), job.error_message)
+
+    def _remove_pending_job(self, job_id: str) -> bool:
+        """Remove a job from the admission queue before it has started"""
+        if self._scheduler.remove(job_id):
+            logger.info(f"Removed job {job_id} from admission queue")
+            return True
+        return False
+
+    async def _worker_loop(self, slot: int):
+        """Run queued workflows one at a time for a single worker slot"""
+        while True:
+            async with self._queue_condition:
+                entry = self._scheduler.pop()
+                while entry is None:
+                    # Wake on new jobs, freed key capacity, or when a throttled key cools down
+                    try:
+                        await asyncio.wait_for(self._queue_condition.wait(), timeout=self._scheduler.next_eligible_in())
+                    except asyncio.TimeoutError:
+                        pass
+                    entry = self._scheduler.pop()
+            job_id, user = entry.job_id, entry.user
+
+            job = self.jobs.get(job_id)
+            if not job or job.status != JobStatus.QUEUED:
+                await self._release_scheduler_slot(job_id)
+                continue
+
+            started_at = time.time()
+            self._running_since[job_id] = started_at
+            try:
+                await self._run_agent_workflow(job_id, user)
+            except Exception as e:
+                logger.error(f"Worker slot {slot} failed to run job {job_id}: {e}")
+            finally:
+                self._running_since.pop(job_id, None)
+                await self._release_scheduler_slot(job_id)
+                if job.status == JobStatus.COMPLETED:
+                    # Exponential moving average of successful run times feeds the wait estimate
+                    elapsed = time.time() - started_at
+                    self._avg_workflow_seconds = 0.8 * self._avg_workflow_seconds + 0.2 * elapsed
+
+    async def _release_scheduler_slot(self, job_id: str):
+        """Return a finished job's key capacity and let waiting workers re-check the queue"""
+        async with self._queue_condition:
+            self._scheduler.finish(job_id)
+            self._queue_condition.notify_all()
+
+    def throttle_api_key(self, user: UserProfile, seconds: Optional[float] = None):
+        """Stop dispatching jobs on a user's effective API key for a while after a rate limit"""
+        self._scheduler.throttle_key(effective_key_id(user), seconds or self.rate_limit_cooldown_seconds)
+
+    def _record_token_usage(self, user: UserProfile, usage: Dict[str, Any]):
+        """Add a finished run's usage to the per-plan/key and per-user totals used for capacity planning"""
+        totals = usage.get("totals") or {}
+        empty = {"runs": 0, "prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "cost_usd": 0.0}
+        user_bucket = self._token_usage_by_user.pop(user.id, None)
+        if user_bucket is None:
+            if len(self._token_usage_by_user) >= self.token_usage_max_users:
+                self._token_usage_by_user.popitem(last=False)  # Forget the least recently active user
+            user_bucket = dict(empty)
+        user_bucket["plan"] = user.plan_type
+        self._token_usage_by_user[user.id] = user_bucket
+        key_bucket = self._token_usage_totals.setdefault(f"{user.plan_type}/{effective_key_id(user)}", dict(empty))
+        for bucket in (key_bucket, user_bucket):
+            bucket["runs"] += 1
+            for name in ("prompt_tokens", "completion_tokens", "total_tokens"):
+                bucket[name] += totals.get(name, 0)
+            bucket["cost_usd"] = round(bucket["cost_usd"] + totals.get("cost_usd", 0.0), 6)
+
+    def get_token_usage_stats(self) -> Dict[str, Any]:
+        """Token and cost totals of runs finished by this process, per plan and API key and per user"""
+        return {
+            "by_plan_key": {key: dict(bucket) for key, bucket in self._token_usage_totals.items()},
+            "by_user": {user_id: dict(bucket) for user_id, bucket in self._token_usage_by_user.items()}
+        }
+
+    def get_scheduler_stats(self) -> Dict[str, Any]:
+        """Admission queue state per plan class and API key"""
+        return {
+            **self._scheduler.get_stats(),
+            "active_workflows": len(self._running_since),
+            "max_concurrent_workflows": self.max_concurrent_workflows
+        }
+
+    def get_queue_position(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return queue position and expected wait for a queued job, or None if it is not waiting"""
+        position = self._scheduler.position(job_id)
+        if position is None and job_id in self._remote_queue_positions:
+            # Out-of-process workers: the queue reports the position, the wait is a rough estimate
+            position = self._remote_queue_positions[job_id]
+            return {
+                "position": position,
+                "queue_length": len(self._remote_queue_positions),
+                "estimated_wait_seconds": int(-(-position // self.max_concurrent_workflows) * self._avg_workflow_seconds)
+            }
+        if position is None:
+            return None
+
+        # Simulate slots freeing up: each running job frees its slot after the average run time
+        now = time.time()
+        slot_free_at = [max(0.0, self._avg_workflow_seconds - (now - started)) for started in self._running_since.values()]
+        slot_free_at += [0.0] * (self.max_concurrent_workflows - len(slot_free_at))
+        heapq.heapify(slot_free_at)
+        wait = 0.0
+        for _ in range(position):
+            wait = heapq.heappop(slot_free_at)
+            heapq.heappush(slot_free_at, wait + self._avg_workflow_seconds)
+
+        return {
+            "position": position,
+            "priority_class": self._scheduler.get_plan(job_id),
+            "queue_length": len(self._scheduler),
+            "active_workflows": len(self._running_since),
+            "max_concurrent_workflows": self.max_concurrent_workflows,
+            "estimated_wait_seconds": int(wait)
+        }
+
+    async def close(self):
+        """Stop the worker pool and background tasks and flush buffered progress.
+
+        Running workflows are interrupted, not cancelled: their journeys stay
+        "processing" so the next start (or another worker) resumes them from
+        their checkpoints.
+        """
+        self._shutting_down = True
+        for task in self._worker_tasks:
+            task.cancel()
+        for task in self._worker_tasks:
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._worker_tasks = []
+        cleanup_tasks = list(self._cleanup_tasks.values())
+        for task in cleanup_tasks:
+            task.cancel()
+        for task in cleanup_tasks:
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._cleanup_tasks.clear()
+        if self._remote_sync_task and not self._remote_sync_task.done():
+            self._remote_sync_task.cancel()
+            try:
+                await self._remote_sync_task
+            except asyncio.CancelledError:
+                pass
+        await self._progress_buffer.close()
+
+
     def get_job(self, job_id: str, user_id: Optional[str] = None) -> Optional[Job]:
         # First try to get from memory
-        job = self.jobs.get(job_id)
+        job = self._lookup_job(job_id)
         if job:
             if user_id and job.user_id != user_id:
                 return None
@@ -257,7 +668,7 @@ class JobManager:
 
     async def get_job_async(self, job_id: str, user_id: Optional[str] = None) -> Optional[Job]:
         # First try to get from memory
-        job = self.jobs.get(job_id)
+        job = self._lookup_job(job_id)
         if job:
             if user_id and job.user_id != user_id:
                 return None
@@ -269,7 +680,8 @@ class JobManager:
             loaded_job = await self.load_job_state(job_id)
             if loaded_job:
                 # Add to memory for future access
-                self.jobs[job_id] = loaded_job
+                self._store_job(loaded_job)
+                self._cache_stats["reloads"] += 1
                 logger.info(f"Loaded job {job_id} from database")
 
                 # Check user permissions
@@ -302,6 +714,13 @@ class JobManager:
             return False
             
         try:
+            # Drop the job from the admission queue if it has not started yet
+            self._remove_pending_job(job_id)
+            if self.job_queue:
+                # Cancels queued jobs outright and tells the worker to stop running ones
+                await self.job_queue.request_cancel(job_id)
+                self._remote_queue_positions.pop(job_id, None)
+
             # Cancel the workflow task if it exists
             if job_id in self._workflow_tasks:
                 workflow_task = self._workflow_tasks[job_id]
@@ -311,12 +730,14 @@ class JobManager:
                 self._workflow_tasks.pop(job_id, None)
             
             # Update job status
-            job.status = JobStatus.CANCELLED
+            self._set_job_status(job, JobStatus.CANCELLED)
+            await self._release_uploads(job_id)
             job.updated_at = datetime.now()
             job.error_message = "Job cancelled by user"
             
             # Update database
             try:
+                await self._progress_buffer.discard(job_id)
                 await usage_service.update_journey_status(
                     journey_id=job_id,
                     status="cancelled",
@@ -335,6 +756,21 @@ class JobManager:
             logger.error(f"Error cancelling job {job_id}: {str(e)}")
             return False
     
+    async def wait_for_progress(self, job_id: str, since_version: int, timeout: float) -> Optional[Job]:
+        """Wait until a job's progress version passes since_version, it finishes, or the timeout expires"""
+        job = self.jobs.get(job_id)
+        if not job or job.progress_version > since_version or job.status not in ACTIVE_STATUSES:
+            return job
+        if self.job_queue:
+            self._ensure_remote_sync()
+
+        event = self._progress_events.setdefault(job_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.jobs.get(job_id, job)
+
     def register_progress_callback(self, job_id: str, callback: Callable) -> bool:
         if job_id not in self.jobs:
             logger.warning(f"Cannot register callback: Job {job_id} not found")
@@ -363,8 +799,11 @@ class JobManager:
             if not self.progress_callbacks[job_id]:
                 del self.progress_callbacks[job_id]
     
-    async def _update_progress(self, job_id: str, step: int, step_name: str, message: str):
-        """Update job progress and send WebSocket-safe updates."""
+    async def _update_progress(self, job_id: str, step: int, step_name: str, message: str, details: Optional[Dict[str, Any]] = None):
+        """Update job progress and send WebSocket-safe updates.
+
+        details carries structured step data (retries, timings, streamed partial output) into progress_history.
+        """
         logger.info(f"Updating progress for job {job_id}: Step {step} - {step_name}: {message}")
 
         if job_id not in self.jobs:
@@ -381,9 +820,10 @@ class JobManager:
             percentage=percentage
         )
         job.progress = progress
+        job.progress_version += 1
         job.updated_at = datetime.now()
 
-        # Save progress to database (with throttling)
+        # Save progress to database (buffered unless terminal)
         try:
             await self.save_job_state(job_id)
         except Exception as e:
@@ -396,8 +836,13 @@ class JobManager:
             "status": job.status.value,
             "timestamp": datetime.utcnow().isoformat(),
             "step_name": step_name,
-            "message": message
+            "message": message,
+            "version": job.progress_version
         }
+        if details:
+            update_msg["details"] = details
+        if job.usage:
+            update_msg["usage"] = job.usage
         
         # 🔹 Include result in final completion message
         if job.status == JobStatus.COMPLETED and job.result:
@@ -416,6 +861,13 @@ class JobManager:
             update_msg["error"] = job.error_message
             update_msg["error_message"] = job.error_message
         
+        await self._publish_progress(job, update_msg)
+
+    async def _publish_progress(self, job: Job, update_msg: Dict[str, Any]):
+        """Deliver a progress message to callbacks, progress history and long-poll waiters"""
+        job_id = job.id
+        progress = update_msg.get("progress") or {}
+
         # 🔹 HTTP Polling-safe callback handling - store progress in job data
         callbacks_sent = False
         if job_id in self.progress_callbacks:
@@ -437,23 +889,38 @@ class JobManager:
         # Always store progress update in job data for HTTP polling
         try:
             job.progress_history = getattr(job, 'progress_history', [])
-            job.progress_history.append({
+            history_entry = {
                 "timestamp": datetime.utcnow().isoformat(),
-                "step": step,
-                "step_name": step_name,
-                "message": message,
-                "percentage": percentage,
+                "step": progress.get("current_step"),
+                "step_name": progress.get("step_name"),
+                "message": progress.get("message"),
+                "percentage": progress.get("percentage"),
                 "status": job.status.value
-            })
+            }
+            details = update_msg.get("details")
+            if details:
+                history_entry["details"] = details
+            last_entry = job.progress_history[-1] if job.progress_history else {}
+            if (details or {}).get("event") == "step_output" and (last_entry.get("details") or {}).get("event") == "step_output" \
+                    and last_entry.get("step") == history_entry["step"]:
+                # Streamed output replaces the step's previous partial output instead of filling the history
+                job.progress_history[-1] = history_entry
+            else:
+                job.progress_history.append(history_entry)
             # Keep only last 50 progress updates to prevent memory bloat
             if len(job.progress_history) > 50:
                 job.progress_history = job.progress_history[-50:]
-            logger.debug(f"Progress update stored in job data for HTTP polling: {step_name} - {message}")
+            logger.debug(f"Progress update stored in job data for HTTP polling: {progress.get('step_name')} - {progress.get('message')}")
         except Exception as e:
             logger.error(f"Failed to store progress in job data: {e}")
 
         if not callbacks_sent:
             logger.debug(f"No active progress callbacks for job {job_id} - using HTTP polling")
+
+        # Wake long-poll requests waiting on this job
+        progress_event = self._progress_events.pop(job_id, None)
+        if progress_event:
+            progress_event.set()
         
         if job.status in [JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED]:
             if job_id in self._cleanup_tasks and not self._cleanup_tasks[job_id].done():
@@ -466,7 +933,7 @@ class JobManager:
     async def _cleanup_callbacks_after_delay(self, job_id: str, delay_seconds: int = 300):
         try:
             await asyncio.sleep(delay_seconds)
-            if job_id in self.jobs and self.jobs[job_id].status in [JobStatus.COMPLETED, JobStatus.FAILED]:
+            if job_id in self.jobs and self.jobs[job_id].status not in ACTIVE_STATUSES:
                 self.progress_callbacks.pop(job_id, None)
         except asyncio.CancelledError:
             pass
@@ -483,9 +950,11 @@ class JobManager:
         workflow_result = None
         final_status = JobStatus.FAILED
         error_message = None
+        crew_coordinator = None
+        interrupted = False
 
         try:
-            job.status = JobStatus.PROCESSING
+            self._set_job_status(job, JobStatus.PROCESSING)
             job.updated_at = datetime.now()
             await self._update_progress(job_id, 0, "Starting", "Initializing journey mapping process...")
             
@@ -493,47 +962,70 @@ class JobManager:
             form_data_dict = job.form_data.dict()
             logger.info(f"Form data prepared for workflow: {form_data_dict}")
             
-            crew_coordinator = CrewCoordinator(user)
+            crew_coordinator = CrewCoordinator(user, deterministic=job.form_data.deterministic)
+            pipeline = resolve_pipeline(job.form_data.pipeline, user.plan_type)
+            execute = crew_coordinator.execute_fast_workflow if pipeline == "fast" else crew_coordinator.execute_workflow
+            logger.info(f"Running the {pipeline} pipeline for job {job_id}")
+            crew_coordinator.ledger.restore(job.usage)  # Keep usage of checkpointed steps when resuming
+
+            async def progress_callback(step: int, step_name: str, message: str, details: Optional[Dict[str, Any]] = None):
+                if details and "usage" in details:
+                    job.usage = crew_coordinator.ledger.summary()
+                if details and details.get("event") == "step_retry" and "rate limit" in details.get("error", "").lower():
+                    # Let other keys use free slots while this one cools down
+                    self.throttle_api_key(user, max(details.get("retry_delay_seconds", 0), self.rate_limit_cooldown_seconds))
+                await self._update_progress(job_id, step, step_name, message, details)
 
-            async def progress_callback(step: int, step_name: str, message: str):
-                await self._update_progress(job_id, step, step_name, message)
+            # Resume from completed steps if this journey ran before a restart
+            checkpoints = await usage_service.get_journey_checkpoints(job_id)
+
+            async def checkpoint_callback(step_key: str, output: str):
+                checkpoints[step_key] = output
+                await usage_service.save_journey_checkpoints(job_id, checkpoints)
 
             # Add timeout to prevent hanging
             workflow_task = asyncio.create_task(
-                crew_coordinator.execute_workflow(form_data_dict, progress_callback, job_id)
+                execute(form_data_dict, progress_callback, job_id, checkpoints=checkpoints, checkpoint_callback=checkpoint_callback)
             )
             
             # Store the task so it can be cancelled
             self._workflow_tasks[job_id] = workflow_task
             
-            # Wait for completion with timeout (15 minutes max)
-            workflow_result = await asyncio.wait_for(workflow_task, timeout=900)
+            # Backstop for the whole run; each step also has its own deadline
+            try:
+                workflow_result = await asyncio.wait_for(workflow_task, timeout=self.workflow_timeout_seconds)
+            except StepFailedError as e:
+                if isinstance(e.__cause__, openai.APIError):
+                    # Handle provider errors by type below (key throttling, quota and key messages)
+                    raise e.__cause__ from e
+                raise
             
             journey_map = self._convert_to_journey_map(workflow_result)
             job.result = journey_map
-            job.status = JobStatus.COMPLETED
+            self._set_job_status(job, JobStatus.COMPLETED)
             job.updated_at = datetime.now()
             final_status = JobStatus.COMPLETED
             
             logger.info(f"Workflow completed successfully for job {job_id}")
             
-        except RateLimitError as e:
+        except (RateLimitError, openai.RateLimitError) as e:
             logger.error(f"OpenAI quota/rate limit exceeded for job {job_id}: {str(e)}")
-            job.status = JobStatus.FAILED
+            self.throttle_api_key(user)
+            self._set_job_status(job, JobStatus.FAILED)
             final_status = JobStatus.FAILED
             error_message = "Your OpenAI API quota has been exceeded. Please check your plan and billing details, or upgrade your OpenAI account."
             job.updated_at = datetime.now()
             
-        except AuthenticationError as e:
+        except (AuthenticationError, openai.AuthenticationError) as e:
             logger.error(f"OpenAI authentication failed for job {job_id}: {str(e)}")
-            job.status = JobStatus.FAILED
+            self._set_job_status(job, JobStatus.FAILED)
             final_status = JobStatus.FAILED
             error_message = "OpenAI API key is invalid or expired. Please check your API key in settings."
             job.updated_at = datetime.now()
             
         except openai.APIError as e:
             logger.error(f"OpenAI API error for job {job_id}: {str(e)}")
-            job.status = JobStatus.FAILED
+            self._set_job_status(job, JobStatus.FAILED)
             final_status = JobStatus.FAILED
             if "quota" in str(e).lower():
                 error_message = "Your OpenAI API quota has been exceeded. Please check your plan and billing details."
@@ -544,8 +1036,12 @@ class JobManager:
             job.updated_at = datetime.now()
             
         except asyncio.CancelledError:
+            if self._shutting_down:
+                interrupted = True
+                logger.info(f"Workflow for job {job_id} interrupted by shutdown; it resumes from its checkpoints")
+                raise
             logger.info(f"Workflow cancelled for job {job_id}")
-            job.status = JobStatus.CANCELLED
+            self._set_job_status(job, JobStatus.CANCELLED)
             final_status = JobStatus.CANCELLED
             error_message = "Workflow cancelled by user"
             job.updated_at = datetime.now()
@@ -553,18 +1049,25 @@ class JobManager:
             
         except asyncio.TimeoutError:
             logger.error(f"Workflow timeout for job {job_id}")
-            job.status = JobStatus.FAILED
+            self._set_job_status(job, JobStatus.FAILED)
             final_status = JobStatus.FAILED
-            error_message = "Journey generation timed out after 15 minutes. This may be due to complex requirements or API delays. Please try again with simpler inputs."
+            error_message = f"Journey generation timed out after {self.workflow_timeout_seconds / 60:.0f} minutes. This may be due to complex requirements or API delays. Please try again with simpler inputs."
             job.updated_at = datetime.now()
             logger.error(f"Job {job_id} timed out")
             
+        except TokenBudgetExceeded as e:
+            logger.warning(f"Token budget exceeded for job {job_id}: {e}")
+            self._set_job_status(job, JobStatus.FAILED)
+            final_status = JobStatus.FAILED
+            error_message = "This journey used up the token budget of your plan. Try fewer or smaller research files, or upgrade your plan."
+            job.updated_at = datetime.now()
+
         except Exception as workflow_error:
             # Capture full traceback for debugging
             raw_trace = traceback.format_exc()
             logger.error(f"Workflow error for job {job_id}: {workflow_error}\n{raw_trace}")
             
-            job.status = JobStatus.FAILED
+            self._set_job_status(job, JobStatus.FAILED)
             final_status = JobStatus.FAILED
             
             # Provide user-friendly error messages for common issues
@@ -590,112 +1093,136 @@ class JobManager:
             logger.debug(f"Job {job_id} debug info: {workflow_error}")
 
         finally:
-            # CRITICAL: Always ensure job object has correct final state first
-            if error_message:
-                job.error_message = error_message
-            job.status = final_status
-            job.updated_at = datetime.now()
-            
-            # CRITICAL: Always update database - this must succeed regardless of other failures
-            db_update_success = False
-            for attempt in range(3):  # Try 3 times
-                try:
-                    # Set error message in job object
-                    if error_message:
-                        job.error_message = error_message
-                    
-                    # Update database with final status
-                    if final_status == JobStatus.COMPLETED and workflow_result:
-                        await usage_service.update_journey_completion(
-                            journey_id=job_id,
-                            status=final_status.value,
-                            result_data=workflow_result
-                        )
-                        logger.info(f"Database updated: Job {job_id} marked as completed")
-                    else:
-                        # Include error message in progress data for database storage
-                        progress_data = {"completed_at": datetime.now().isoformat()}
-                        if error_message:
-                            progress_data["error"] = error_message
-                            progress_data["user_friendly_error"] = error_message
-                        
-                        await usage_service.update_journey_status(
-                            journey_id=job_id,
-                            status=final_status.value,
-                            progress_data=progress_data
-                        )
-                        logger.info(f"Database updated: Job {job_id} marked as {final_status.value}")
-                    
-                    db_update_success = True
-                    break  # Success, exit retry loop
-                    
-                except Exception as db_error:
-                    logger.error(f"Database update attempt {attempt + 1} failed for job {job_id}: {str(db_error)}")
-                    if attempt == 2:  # Last attempt
-                        logger.critical(f"CRITICAL: All database update attempts failed for job {job_id}: {str(db_error)}")
-                        # Even if DB fails, ensure in-memory state is correct for API responses
-                        job.error_message = error_message or f"Database update failed: {str(db_error)}"
-                    else:
-                        await asyncio.sleep(1)  # Wait before retry
-            
-            # OPTIONAL: Try to send final progress update via WebSocket
-            try:
-                if final_status == JobStatus.COMPLETED:
-                    await self._update_progress(job_id, 8, "Completed", "Journey map generated successfully!")
-                elif final_status == JobStatus.CANCELLED:
-                    await self._update_progress(job_id, -1, "Cancelled", "Workflow cancelled by user")
-                else:
-                    # For failed jobs, make sure the error message is set before sending progress update
-                    if error_message and job_id in self.jobs:
-                        self.jobs[job_id].error_message = error_message
-                    await self._update_progress(job_id, -1, "Failed", error_message or "Journey generation failed")
-                logger.info(f"Final progress update sent for job {job_id}")
-            except Exception as progress_error:
-                logger.warning(f"Failed to send final progress update for job {job_id}: {str(progress_error)}")
-            
-            # OPTIONAL: Cleanup tasks - don't let this block critical updates
-            try:
-                # Clean up workflow task reference
+            if crew_coordinator:
+                crew_coordinator.close()
+            if interrupted:
+                # Leave the journey "processing" with its uploads referenced so it resumes after the restart
                 self._workflow_tasks.pop(job_id, None)
-                
-                # Schedule callback cleanup after delay
-                if job_id in self._cleanup_tasks and not self._cleanup_tasks[job_id].done():
-                    self._cleanup_tasks[job_id].cancel()
-                self._cleanup_tasks[job_id] = asyncio.create_task(
-                    self._cleanup_callbacks_after_delay(job_id)
-                )
-            except Exception as cleanup_error:
-                logger.warning(f"Cleanup failed for job {job_id}: {str(cleanup_error)}")
-            
-            logger.info(f"Workflow cleanup completed for job {job_id} with final status: {final_status.value}")
+                await self._progress_buffer.discard(job_id)
+            else:
+                await self._finish_workflow(job, user, final_status, error_message, workflow_result)
         
         # CRITICAL: Ensure job object always has error message set for API responses
         if error_message and job_id in self.jobs:
             self.jobs[job_id].error_message = error_message
 
+    async def _finish_workflow(self, job: Job, user: UserProfile, final_status: JobStatus,
+                               error_message: Optional[str], workflow_result: Optional[Dict[str, Any]]):
+        """Record a workflow's final state in memory and the database and notify listeners"""
+        job_id = job.id
+        await self._release_uploads(job_id)
+
+        # CRITICAL: Always ensure job object has correct final state first
+        if error_message:
+            job.error_message = error_message
+        self._set_job_status(job, final_status)
+        job.updated_at = datetime.now()
+        
+        # CRITICAL: Always update database - this must succeed regardless of other failures
+        try:
+            await self._progress_buffer.discard(job_id)
+        except Exception as buffer_error:
+            logger.warning(f"Failed to discard buffered progress for job {job_id}: {buffer_error}")
+        db_update_success = False
+        for attempt in range(3):  # Try 3 times
+            try:
+                # Set error message in job object
+                if error_message:
+                    job.error_message = error_message
+                
+                # Update database with final status
+                if final_status == JobStatus.COMPLETED and workflow_result:
+                    await usage_service.update_journey_completion(
+                        journey_id=job_id,
+                        status=final_status.value,
+                        result_data=workflow_result
+                    )
+                    logger.info(f"Database updated: Job {job_id} marked as completed")
+                else:
+                    # Include error message in progress data for database storage
+                    progress_data = {"completed_at": datetime.now().isoformat()}
+                    if error_message:
+                        progress_data["error"] = error_message
+                        progress_data["user_friendly_error"] = error_message
+                    
+                    await usage_service.update_journey_status(
+                        journey_id=job_id,
+                        status=final_status.value,
+                        progress_data=progress_data
+                    )
+                    logger.info(f"Database updated: Job {job_id} marked as {final_status.value}")
+                
+                db_update_success = True
+                break  # Success, exit retry loop
+                
+            except Exception as db_error:
+                logger.error(f"Database update attempt {attempt + 1} failed for job {job_id}: {str(db_error)}")
+                if attempt == 2:  # Last attempt
+                    logger.critical(f"CRITICAL: All database update attempts failed for job {job_id}: {str(db_error)}")
+                    # Even if DB fails, ensure in-memory state is correct for API responses
+                    job.error_message = error_message or f"Database update failed: {str(db_error)}"
+                else:
+                    await asyncio.sleep(1)  # Wait before retry
+        
+        # OPTIONAL: Try to send final progress update via WebSocket
+        try:
+            if final_status == JobStatus.COMPLETED:
+                await self._update_progress(job_id, 8, "Completed", "Journey map generated successfully!")
+            elif final_status == JobStatus.CANCELLED:
+                await self._update_progress(job_id, -1, "Cancelled", "Workflow cancelled by user")
+            else:
+                # For failed jobs, make sure the error message is set before sending progress update
+                if error_message and job_id in self.jobs:
+                    self.jobs[job_id].error_message = error_message
+                await self._update_progress(job_id, -1, "Failed", error_message or "Journey generation failed")
+            logger.info(f"Final progress update sent for job {job_id}")
+        except Exception as progress_error:
+            logger.warning(f"Failed to send final progress update for job {job_id}: {str(progress_error)}")
+        
+        # OPTIONAL: Cleanup tasks - don't let this block critical updates
+        try:
+            # Clean up workflow task reference
+            self._workflow_tasks.pop(job_id, None)
+            
+            # Schedule callback cleanup after delay
+            if job_id in self._cleanup_tasks and not self._cleanup_tasks[job_id].done():
+                self._cleanup_tasks[job_id].cancel()
+            self._cleanup_tasks[job_id] = asyncio.create_task(
+                self._cleanup_callbacks_after_delay(job_id)
+            )
+        except Exception as cleanup_error:
+            logger.warning(f"Cleanup failed for job {job_id}: {str(cleanup_error)}")
+        
+        if job.usage:
+            self._record_token_usage(user, job.usage)
+        logger.info(f"Workflow cleanup completed for job {job_id} with final status: {final_status.value}")
+
     async def _check_user_running_journey(self, user_id: str) -> Optional[Job]:
         """Check if user already has a running journey"""
-        # Check in-memory jobs first
-        for job_id, job in self.jobs.items():
-            if job.user_id == user_id and job.status in [JobStatus.QUEUED, JobStatus.PROCESSING]:
+        # Check the in-memory index first
+        for job_id in list(self._active_jobs_by_user.get(user_id, ())):
+            job = self.jobs.get(job_id)
+            if job and job.status in ACTIVE_STATUSES:
                 return job
 
-        # Check database for any running journeys
+        # Check database for a running journey started on another instance
         try:
-            in_progress_journeys = await usage_service.get_in_progress_journeys()
+            in_progress_journeys = await usage_service.get_user_in_progress_journeys(user_id)
             for journey in in_progress_journeys:
-                if journey.user_id == user_id:
-                    # Try to load this job into memory
-                    loaded_job = await self.load_job_state(journey.job_id)
-                    if loaded_job and loaded_job.status in [JobStatus.QUEUED, JobStatus.PROCESSING]:
-                        self.jobs[journey.job_id] = loaded_job
-                        return loaded_job
+                if not journey.job_id:
+                    continue
+                # Try to load this job into memory
+                loaded_job = await self.load_job_state(journey.job_id)
+                if loaded_job and loaded_job.status in ACTIVE_STATUSES:
+                    self._store_job(loaded_job)
+                    return loaded_job
         except Exception as e:
             logger.error(f"Failed to check database for running journeys: {e}")
 
         return None
 
-    def _convert_to_journey_map(self, journey_map_data: Dict[str, Any]) -> JourneyMap:
+    @staticmethod
+    def _convert_to_journey_map(journey_map_data: Dict[str, Any]) -> JourneyMap:
         personas = [Persona(**p) for p in journey_map_data.get('personas', [])]
         phases = [JourneyPhase(**ph) for ph in journey_map_data.get('phases', [])]
         return JourneyMap(
@@ -706,5 +1233,7 @@ class JobManager:
                 journey_map_data.get('created_at', datetime.now().isoformat())
             ),
             personas=personas,
-            phases=phases
+            phases=phases,
+            insights=journey_map_data.get('insights'),
+            recommendations=journey_map_data.get('recommendations')
         )
\ No newline at end of file
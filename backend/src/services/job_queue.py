@@ -0,0 +1,318 @@
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Any, Optional, List
+from pydantic import BaseModel
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class QueuedJob(BaseModel):
+    job_id: str
+    user_id: str
+    payload: Dict[str, Any]
+    attempts: int = 0
+
+
+class JobQueue(ABC):
+    """Interface for the queue that hands journey workflows from API nodes to workers.
+
+    API nodes enqueue jobs and read back progress; workers claim jobs under a
+    lease, publish progress messages and renew their leases while running.
+    A job whose lease expires (crashed worker) becomes claimable again.
+    """
+
+    @abstractmethod
+    async def enqueue(self, job_id: str, user_id: str, payload: Dict[str, Any]):
+        ...
+
+    @abstractmethod
+    async def claim(self, worker_id: str, lease_seconds: float) -> Optional[QueuedJob]:
+        """Claim the oldest runnable job, or return None if there is none"""
+        ...
+
+    @abstractmethod
+    async def renew_leases(self, job_ids: List[str], worker_id: str, lease_seconds: float):
+        ...
+
+    @abstractmethod
+    async def publish_progress(self, job_id: str, message: Dict[str, Any]):
+        """Store the latest progress message for a job; terminal messages finish it"""
+        ...
+
+    @abstractmethod
+    async def get_states(self, job_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Return {"status", "progress_version", "progress", "position"} per known job"""
+        ...
+
+    @abstractmethod
+    async def request_cancel(self, job_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def get_cancel_requests(self, job_ids: List[str]) -> List[str]:
+        ...
+
+    @abstractmethod
+    async def get_stats(self) -> Dict[str, Any]:
+        ...
+
+
+class SQLiteJobQueue(JobQueue):
+    """Job queue stored in a local SQLite file, shared by processes on one machine"""
+
+    TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+    PRUNE_INTERVAL_SECONDS = 60
+
+    def __init__(self, path: str, max_attempts: int = 3, retention_seconds: Optional[float] = None):
+        self.path = path
+        self.max_attempts = max_attempts
+        # Finished rows are only read back while the API mirrors their final progress
+        self.retention_seconds = retention_seconds if retention_seconds is not None else float(os.getenv("JOB_QUEUE_RETENTION_HOURS", "24")) * 3600
+        self._last_pruned_at = 0.0
+        self._pruned = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        return conn
+
+    def _init_schema(self):
+        conn = self._connect()
+        try:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS job_queue (
+                    job_id TEXT PRIMARY KEY,
+                    user_id TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    enqueued_at REAL NOT NULL,
+                    claimed_by TEXT,
+                    lease_expires_at REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    cancel_requested INTEGER NOT NULL DEFAULT 0,
+                    progress_version INTEGER NOT NULL DEFAULT 0,
+                    progress TEXT,
+                    updated_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_job_queue_status_enqueued
+                    ON job_queue (status, enqueued_at);
+            """)
+        finally:
+            conn.close()
+
+    async def _run(self, fn, *args):
+        return await asyncio.to_thread(fn, *args)
+
+    async def enqueue(self, job_id: str, user_id: str, payload: Dict[str, Any]):
+        await self._run(self._enqueue, job_id, user_id, payload)
+
+    def _enqueue(self, job_id: str, user_id: str, payload: Dict[str, Any]):
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO job_queue (job_id, user_id, payload, status, enqueued_at, updated_at) "
+                "VALUES (?, ?, ?, 'queued', ?, ?)",
+                (job_id, user_id, json.dumps(payload, default=str), now, now)
+            )
+        finally:
+            conn.close()
+
+    async def claim(self, worker_id: str, lease_seconds: float) -> Optional[QueuedJob]:
+        return await self._run(self._claim, worker_id, lease_seconds)
+
+    def _claim(self, worker_id: str, lease_seconds: float) -> Optional[QueuedJob]:
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            # Give up on jobs whose workers kept dying
+            conn.execute(
+                "UPDATE job_queue SET status = 'failed', updated_at = ? "
+                "WHERE status = 'running' AND lease_expires_at < ? AND attempts >= ?",
+                (now, now, self.max_attempts)
+            )
+            if now - self._last_pruned_at >= self.PRUNE_INTERVAL_SECONDS:
+                self._prune(conn, now)
+            row = conn.execute(
+                "SELECT * FROM job_queue "
+                "WHERE status = 'queued' OR (status = 'running' AND lease_expires_at < ?) "
+                "ORDER BY enqueued_at LIMIT 1",
+                (now,)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+
+            if row["status"] == "running":
+                logger.warning(f"Reclaiming job {row['job_id']} from expired worker {row['claimed_by']}")
+            conn.execute(
+                "UPDATE job_queue SET status = 'running', claimed_by = ?, lease_expires_at = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE job_id = ?",
+                (worker_id, now + lease_seconds, now, row["job_id"])
+            )
+            conn.execute("COMMIT")
+            return QueuedJob(
+                job_id=row["job_id"],
+                user_id=row["user_id"],
+                payload=json.loads(row["payload"]),
+                attempts=row["attempts"] + 1
+            )
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _prune(self, conn: sqlite3.Connection, now: float):
+        """Delete finished jobs older than the retention period"""
+        placeholders = ",".join("?" for _ in self.TERMINAL_STATUSES)
+        cursor = conn.execute(
+            f"DELETE FROM job_queue WHERE status IN ({placeholders}) AND updated_at < ?",
+            (*self.TERMINAL_STATUSES, now - self.retention_seconds)
+        )
+        self._last_pruned_at = now
+        if cursor.rowcount:
+            self._pruned += cursor.rowcount
+            logger.info(f"Pruned {cursor.rowcount} finished jobs from the queue")
+
+    async def renew_leases(self, job_ids: List[str], worker_id: str, lease_seconds: float):
+        if job_ids:
+            await self._run(self._renew_leases, job_ids, worker_id, lease_seconds)
+
+    def _renew_leases(self, job_ids: List[str], worker_id: str, lease_seconds: float):
+        now = time.time()
+        placeholders = ",".join("?" for _ in job_ids)
+        conn = self._connect()
+        try:
+            conn.execute(
+                f"UPDATE job_queue SET lease_expires_at = ?, updated_at = ? "
+                f"WHERE claimed_by = ? AND status = 'running' AND job_id IN ({placeholders})",
+                (now + lease_seconds, now, worker_id, *job_ids)
+            )
+        finally:
+            conn.close()
+
+    async def publish_progress(self, job_id: str, message: Dict[str, Any]):
+        await self._run(self._publish_progress, job_id, message)
+
+    def _publish_progress(self, job_id: str, message: Dict[str, Any]):
+        now = time.time()
+        status = message.get("status")
+        conn = self._connect()
+        try:
+            if status in self.TERMINAL_STATUSES:
+                conn.execute(
+                    "UPDATE job_queue SET status = ?, progress = ?, progress_version = progress_version + 1, "
+                    "lease_expires_at = NULL, updated_at = ? WHERE job_id = ?",
+                    (status, json.dumps(message, default=str), now, job_id)
+                )
+            else:
+                conn.execute(
+                    "UPDATE job_queue SET progress = ?, progress_version = progress_version + 1, "
+                    "updated_at = ? WHERE job_id = ?",
+                    (json.dumps(message, default=str), now, job_id)
+                )
+        finally:
+            conn.close()
+
+    async def get_states(self, job_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        if not job_ids:
+            return {}
+        return await self._run(self._get_states, job_ids)
+
+    def _get_states(self, job_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        placeholders = ",".join("?" for _ in job_ids)
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                f"SELECT job_id, status, enqueued_at, progress_version, progress FROM job_queue "
+                f"WHERE job_id IN ({placeholders})",
+                tuple(job_ids)
+            ).fetchall()
+            states = {}
+            for row in rows:
+                position = None
+                if row["status"] == "queued":
+                    position = conn.execute(
+                        "SELECT COUNT(*) FROM job_queue WHERE status = 'queued' AND enqueued_at <= ?",
+                        (row["enqueued_at"],)
+                    ).fetchone()[0]
+                states[row["job_id"]] = {
+                    "status": row["status"],
+                    "progress_version": row["progress_version"],
+                    "progress": json.loads(row["progress"]) if row["progress"] else None,
+                    "position": position
+                }
+            return states
+        finally:
+            conn.close()
+
+    async def request_cancel(self, job_id: str) -> bool:
+        return await self._run(self._request_cancel, job_id)
+
+    def _request_cancel(self, job_id: str) -> bool:
+        now = time.time()
+        conn = self._connect()
+        try:
+            # Queued jobs are cancelled outright; running jobs are flagged for their worker
+            cursor = conn.execute(
+                "UPDATE job_queue SET status = 'cancelled', updated_at = ? WHERE job_id = ? AND status = 'queued'",
+                (now, job_id)
+            )
+            if cursor.rowcount:
+                return True
+            cursor = conn.execute(
+                "UPDATE job_queue SET cancel_requested = 1, updated_at = ? WHERE job_id = ? AND status = 'running'",
+                (now, job_id)
+            )
+            return cursor.rowcount > 0
+        finally:
+            conn.close()
+
+    async def get_cancel_requests(self, job_ids: List[str]) -> List[str]:
+        if not job_ids:
+            return []
+        return await self._run(self._get_cancel_requests, job_ids)
+
+    def _get_cancel_requests(self, job_ids: List[str]) -> List[str]:
+        placeholders = ",".join("?" for _ in job_ids)
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                f"SELECT job_id FROM job_queue WHERE cancel_requested = 1 AND job_id IN ({placeholders})",
+                tuple(job_ids)
+            ).fetchall()
+            return [row["job_id"] for row in rows]
+        finally:
+            conn.close()
+
+    async def get_stats(self) -> Dict[str, Any]:
+        return await self._run(self._get_stats)
+
+    def _get_stats(self) -> Dict[str, Any]:
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT status, COUNT(*) AS count FROM job_queue GROUP BY status").fetchall()
+            return {"backend": "sqlite", "jobs_by_status": {row["status"]: row["count"] for row in rows}, "pruned": self._pruned}
+        finally:
+            conn.close()
+
+
+def create_job_queue() -> JobQueue:
+    """Create the job queue configured by JOB_QUEUE_BACKEND"""
+    backend = os.getenv("JOB_QUEUE_BACKEND", "sqlite").lower()
+    if backend == "sqlite":
+        return SQLiteJobQueue(os.getenv("JOB_QUEUE_PATH", "/tmp/journi/job_queue.db"))
+    raise ValueError(f"Unsupported job queue backend: {backend}")
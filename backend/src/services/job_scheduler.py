@@ -0,0 +1,218 @@
+import hashlib
+import os
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, Deque, Tuple
+import logging
+from ..models.auth import UserProfile
+
+logger = logging.getLogger(__name__)
+
+PLATFORM_KEY_ID = "platform"
+DEFAULT_PLAN_WEIGHTS = {"pro": 4.0, "starter": 2.0, "free": 1.0}
+
+
+def effective_key_id(user: UserProfile) -> str:
+    """Identify the OpenAI key a user's workflows run on, without exposing the key itself"""
+    if user.plan_type == 'pro' and user.openai_api_key:
+        return "byok:" + hashlib.sha256(user.openai_api_key.encode()).hexdigest()[:12]
+    return PLATFORM_KEY_ID
+
+
+def parse_plan_weights(value: Optional[str]) -> Dict[str, float]:
+    """Parse "pro=4,starter=2,free=1" into plan weights"""
+    weights = dict(DEFAULT_PLAN_WEIGHTS)
+    for item in (value or "").split(","):
+        if "=" in item:
+            plan, weight = item.split("=", 1)
+            try:
+                weights[plan.strip()] = max(0.1, float(weight))
+            except ValueError:
+                logger.warning(f"Ignoring invalid plan weight: {item}")
+    return weights
+
+
+@dataclass
+class ScheduledJob:
+    job_id: str
+    user: UserProfile
+    key_id: str
+    plan: str
+    finish_tag: float
+    enqueued_at: float
+
+
+class FairJobScheduler:
+    """Pending-job queue with plan priorities and fair sharing per API key.
+
+    Every (API key, user) pair is a flow with its own FIFO. Jobs are tagged
+    with weighted-fair-queuing finish times, where the weight comes from the
+    user's plan, and the job with the lowest tag is dispatched first. A user
+    flooding the shared platform key only delays their own jobs, and higher
+    plans get a proportionally larger share without starving free users.
+
+    Keys that are rate limited or at their concurrency cap are skipped, so
+    BYOK jobs are not held up behind throttled platform-key jobs.
+    """
+
+    def __init__(self, plan_weights: Optional[Dict[str, float]] = None, platform_key_max_concurrent: Optional[int] = None):
+        self.plan_weights = plan_weights or parse_plan_weights(os.getenv("SCHEDULER_PLAN_WEIGHTS"))
+        platform_limit = platform_key_max_concurrent or int(os.getenv("PLATFORM_KEY_MAX_CONCURRENT", "0"))
+        self.platform_key_max_concurrent = platform_limit if platform_limit > 0 else None
+        self._flows: Dict[Tuple[str, str], Deque[ScheduledJob]] = {}
+        self._flow_finish: Dict[Tuple[str, str], float] = {}  # flow -> finish tag of its last queued job
+        self._virtual_time = 0.0
+        self._running: Dict[str, str] = {}  # job_id -> key_id
+        self._throttled_until: Dict[str, float] = {}  # key_id -> time the key may be used again
+        self._class_stats: Dict[str, Dict[str, float]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(flow) for flow in self._flows.values())
+
+    def _weight(self, plan: str) -> float:
+        return self.plan_weights.get(plan, 1.0)
+
+    def _stats_for(self, plan: str) -> Dict[str, float]:
+        return self._class_stats.setdefault(plan, {"dispatched": 0, "avg_wait_seconds": 0.0, "max_wait_seconds": 0.0})
+
+    def push(self, job_id: str, user: UserProfile):
+        key_id = effective_key_id(user)
+        flow = (key_id, user.id)
+        start = max(self._virtual_time, self._flow_finish.get(flow, 0.0))
+        finish = start + 1.0 / self._weight(user.plan_type)
+        self._flow_finish[flow] = finish
+        self._flows.setdefault(flow, deque()).append(
+            ScheduledJob(job_id=job_id, user=user, key_id=key_id, plan=user.plan_type, finish_tag=finish, enqueued_at=time.time())
+        )
+
+    def remove(self, job_id: str) -> bool:
+        """Drop a pending job and give its share back, so the flow's later jobs are not charged for it"""
+        for flow, jobs in self._flows.items():
+            for index, entry in enumerate(jobs):
+                if entry.job_id == job_id:
+                    del jobs[index]
+                    # Later jobs that started when this one finished move up by its cost
+                    shift = 1.0 / self._weight(entry.plan)
+                    previous_finish = entry.finish_tag
+                    for later in list(jobs)[index:]:
+                        if later.finish_tag - 1.0 / self._weight(later.plan) > previous_finish:
+                            break  # Started at the virtual time, not after this job
+                        previous_finish = later.finish_tag
+                        later.finish_tag -= shift
+                    else:
+                        self._flow_finish[flow] -= shift
+                    if not jobs:
+                        del self._flows[flow]
+                        if self._flow_finish[flow] <= self._virtual_time:
+                            del self._flow_finish[flow]
+                    return True
+        return False
+
+    def _key_available(self, key_id: str, now: float) -> bool:
+        if self._throttled_until.get(key_id, 0.0) > now:
+            return False
+        if key_id == PLATFORM_KEY_ID and self.platform_key_max_concurrent is not None:
+            running = sum(1 for running_key in self._running.values() if running_key == key_id)
+            return running < self.platform_key_max_concurrent
+        return True
+
+    def pop(self) -> Optional[ScheduledJob]:
+        """Dispatch the eligible job with the lowest finish tag, or None if nothing can run now"""
+        now = time.time()
+        best_flow = None
+        for flow, jobs in self._flows.items():
+            head = jobs[0]
+            if not self._key_available(head.key_id, now):
+                continue
+            if best_flow is None or head.finish_tag < self._flows[best_flow][0].finish_tag:
+                best_flow = flow
+        if best_flow is None:
+            return None
+
+        entry = self._flows[best_flow].popleft()
+        if not self._flows[best_flow]:
+            del self._flows[best_flow]
+        self._virtual_time = max(self._virtual_time, entry.finish_tag - 1.0 / self._weight(entry.plan))
+        # Forget finish tags of idle flows that virtual time has caught up with
+        for flow in [f for f, finish in self._flow_finish.items() if f not in self._flows and finish <= self._virtual_time]:
+            del self._flow_finish[flow]
+
+        self._running[entry.job_id] = entry.key_id
+        wait = now - entry.enqueued_at
+        stats = self._stats_for(entry.plan)
+        stats["dispatched"] += 1
+        stats["avg_wait_seconds"] = wait if stats["dispatched"] == 1 else 0.8 * stats["avg_wait_seconds"] + 0.2 * wait
+        stats["max_wait_seconds"] = max(stats["max_wait_seconds"], wait)
+        return entry
+
+    def finish(self, job_id: str):
+        """Release the key capacity held by a dispatched job"""
+        self._running.pop(job_id, None)
+
+    def throttle_key(self, key_id: str, seconds: float):
+        """Hold back new jobs on a rate-limited key"""
+        until = time.time() + seconds
+        if until > self._throttled_until.get(key_id, 0.0):
+            self._throttled_until[key_id] = until
+            logger.warning(f"Pausing dispatch on key {key_id} for {seconds:.0f}s after a rate limit")
+
+    def next_eligible_in(self) -> Optional[float]:
+        """Seconds until a throttled key with waiting jobs frees up, or None if no job is waiting on a throttle"""
+        now = time.time()
+        waits = [self._throttled_until[jobs[0].key_id] - now for jobs in self._flows.values()
+                 if self._throttled_until.get(jobs[0].key_id, 0.0) > now]
+        return max(0.0, min(waits)) if waits else None
+
+    def ordered(self) -> list:
+        """Pending jobs in expected dispatch order"""
+        return sorted((entry for jobs in self._flows.values() for entry in jobs), key=lambda entry: entry.finish_tag)
+
+    def position(self, job_id: str) -> Optional[int]:
+        for index, entry in enumerate(self.ordered()):
+            if entry.job_id == job_id:
+                return index + 1
+        return None
+
+    def get_plan(self, job_id: str) -> Optional[str]:
+        for jobs in self._flows.values():
+            for entry in jobs:
+                if entry.job_id == job_id:
+                    return entry.plan
+        return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue state per priority class and per API key"""
+        now = time.time()
+        classes: Dict[str, Dict[str, Any]] = {}
+        keys: Dict[str, Dict[str, Any]] = {}
+        for jobs in self._flows.values():
+            for entry in jobs:
+                plan_state = classes.setdefault(entry.plan, {"queued": 0, "oldest_wait_seconds": 0.0})
+                plan_state["queued"] += 1
+                plan_state["oldest_wait_seconds"] = max(plan_state["oldest_wait_seconds"], round(now - entry.enqueued_at, 1))
+                keys.setdefault(entry.key_id, {"queued": 0, "running": 0})["queued"] += 1
+        for key_id in self._running.values():
+            keys.setdefault(key_id, {"queued": 0, "running": 0})["running"] += 1
+        for key_id, state in keys.items():
+            throttled_for = self._throttled_until.get(key_id, 0.0) - now
+            state["throttled_for_seconds"] = round(throttled_for, 1) if throttled_for > 0 else 0
+
+        for plan, stats in self._class_stats.items():
+            plan_state = classes.setdefault(plan, {"queued": 0, "oldest_wait_seconds": 0.0})
+            plan_state.update({
+                "weight": self._weight(plan),
+                "dispatched": int(stats["dispatched"]),
+                "avg_wait_seconds": round(stats["avg_wait_seconds"], 1),
+                "max_wait_seconds": round(stats["max_wait_seconds"], 1)
+            })
+        for plan, plan_state in classes.items():
+            plan_state.setdefault("weight", self._weight(plan))
+
+        return {
+            "queued": len(self),
+            "running": len(self._running),
+            "platform_key_max_concurrent": self.platform_key_max_concurrent,
+            "classes": classes,
+            "keys": keys
+        }
@@ -0,0 +1,144 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(model: str, temperature: float, role: str, prompt: str) -> str:
+    """Cache key for one agent call: model, temperature, agent role and a hash of the rendered prompt"""
+    prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    material = json.dumps({"model": model, "temperature": round(temperature, 3), "role": role, "prompt": prompt_hash}, sort_keys=True)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """LLM responses stored in a local SQLite file with least-recently-used eviction by size"""
+
+    def __init__(self, path: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.path = path or os.getenv("LLM_CACHE_PATH", "/tmp/journi/llm_cache.db")
+        self.max_bytes = max_bytes or int(float(os.getenv("LLM_CACHE_MAX_MB", "200")) * 1024 * 1024)
+        self._initialized = False
+        self._init_lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0, "errors": 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        return conn
+
+    def _ensure_schema(self):
+        # The file is created on first use so importing this module has no side effects
+        with self._init_lock:
+            if self._initialized:
+                return
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = self._connect()
+            try:
+                conn.executescript("""
+                    CREATE TABLE IF NOT EXISTS llm_cache (
+                        cache_key TEXT PRIMARY KEY,
+                        model TEXT NOT NULL,
+                        role TEXT NOT NULL,
+                        response TEXT NOT NULL,
+                        size_bytes INTEGER NOT NULL,
+                        created_at REAL NOT NULL,
+                        last_used_at REAL NOT NULL,
+                        hits INTEGER NOT NULL DEFAULT 0
+                    );
+                    CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache (last_used_at);
+                """)
+            finally:
+                conn.close()
+            self._initialized = True
+
+    async def get(self, cache_key: str) -> Optional[str]:
+        try:
+            response = await asyncio.to_thread(self._get, cache_key)
+        except Exception as e:
+            self._stats["errors"] += 1
+            logger.warning(f"LLM cache read failed: {e}")
+            return None
+        self._stats["hits" if response is not None else "misses"] += 1
+        return response
+
+    def _get(self, cache_key: str) -> Optional[str]:
+        self._ensure_schema()
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT response FROM llm_cache WHERE cache_key = ?", (cache_key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE llm_cache SET last_used_at = ?, hits = hits + 1 WHERE cache_key = ?",
+                (time.time(), cache_key)
+            )
+            return row[0]
+        finally:
+            conn.close()
+
+    async def put(self, cache_key: str, model: str, role: str, response: str):
+        try:
+            evicted = await asyncio.to_thread(self._put, cache_key, model, role, response)
+            self._stats["writes"] += 1
+            self._stats["evictions"] += evicted
+        except Exception as e:
+            self._stats["errors"] += 1
+            logger.warning(f"LLM cache write failed: {e}")
+
+    def _put(self, cache_key: str, model: str, role: str, response: str) -> int:
+        self._ensure_schema()
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (cache_key, model, role, response, size_bytes, created_at, last_used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (cache_key, model, role, response, size, now, now)
+            )
+            return self._evict(conn)
+        finally:
+            conn.close()
+
+    def _evict(self, conn: sqlite3.Connection) -> int:
+        """Delete least recently used entries until the cache fits in max_bytes"""
+        total = conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM llm_cache").fetchone()[0]
+        evicted = 0
+        while total > self.max_bytes:
+            row = conn.execute("SELECT cache_key, size_bytes FROM llm_cache ORDER BY last_used_at LIMIT 1").fetchone()
+            if row is None:
+                break
+            conn.execute("DELETE FROM llm_cache WHERE cache_key = ?", (row[0],))
+            total -= row[1]
+            evicted += 1
+        return evicted
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self._stats["hits"] + self._stats["misses"]
+        stats: Dict[str, Any] = {
+            **self._stats,
+            "hit_rate_pct": round(self._stats["hits"] / lookups * 100, 1) if lookups else 0.0,
+            "max_bytes": self.max_bytes
+        }
+        if self._initialized:
+            conn = self._connect()
+            try:
+                entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM llm_cache").fetchone()
+                stats.update({"entries": entries, "size_bytes": size})
+            finally:
+                conn.close()
+        return stats
+
+
+# Global instance
+llm_response_cache = LLMResponseCache()
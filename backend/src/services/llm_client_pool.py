@@ -0,0 +1,204 @@
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import httpx
+import openai
+from crewai import LLM
+from langchain_openai import ChatOpenAI
+from .rate_limiter import rate_limiter
+
+logger = logging.getLogger(__name__)
+
+
+def key_fingerprint(api_key: str) -> str:
+    """Identify an API key in pool keys and metrics without exposing it"""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+
+
+@dataclass
+class PooledClient:
+    llm: Any
+    pool_key: Tuple[str, str, float]
+    created_at: float = field(default_factory=time.monotonic)
+    last_used_at: float = field(default_factory=time.monotonic)
+    uses: int = 0
+    refs: int = 0  # Callers holding a shared client; it is never evicted while referenced
+
+
+class LLMClientPool:
+    """Process-wide LLM clients per API key and model, reused across jobs.
+
+    CrewAI LLMs are leased: a job holds one exclusively while it runs,
+    because CrewAI counts token usage per LLM instance, and returns it with
+    release(). LangChain chat models keep no per-call state and are shared;
+    callers hold a reference from get_chat_model() until release_chat_model().
+    Each client keeps its HTTP connections alive between calls, sends every
+    request through the per-key rate limiter, and is closed once it is
+    unreferenced and idle for longer than LLM_POOL_IDLE_SECONDS.
+    """
+
+    def __init__(self, idle_seconds: Optional[float] = None, max_idle_per_key: Optional[int] = None,
+                 keepalive_seconds: Optional[float] = None):
+        self.idle_seconds = idle_seconds if idle_seconds is not None else float(os.getenv("LLM_POOL_IDLE_SECONDS", "300"))
+        self.max_idle_per_key = max_idle_per_key if max_idle_per_key is not None else int(os.getenv("LLM_POOL_MAX_IDLE_PER_KEY", "8"))
+        self.keepalive_seconds = keepalive_seconds if keepalive_seconds is not None else float(os.getenv("LLM_POOL_KEEPALIVE_SECONDS", "60"))
+        self._lock = threading.Lock()
+        self._idle: Dict[Tuple[str, str, float], List[PooledClient]] = {}
+        self._leased: Dict[int, PooledClient] = {}  # id(llm) -> leased client
+        self._shared: Dict[Tuple[str, str, float], PooledClient] = {}
+        self._stats = {"created": 0, "reused": 0, "released": 0, "discarded": 0, "evicted": 0}
+        self._closing: set = set()  # Tasks closing evicted async HTTP clients
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=self.keepalive_seconds)
+
+    def _create_crew_llm(self, api_key: str, model: str, temperature: float) -> LLM:
+        llm = LLM(model=model, api_key=api_key, temperature=temperature)
+        try:
+            # Replace the default client, whose idle connections expire after 5s, with one that keeps them open
+            http_client = openai.DefaultHttpxClient(limits=self._limits(), event_hooks=rate_limiter.event_hooks(key_fingerprint(api_key)))
+            llm._client = openai.OpenAI(**llm._get_client_params(), http_client=http_client)
+        except AttributeError:
+            pass  # Not an OpenAI-backed LLM; keep the provider's own client
+        return llm
+
+    def acquire(self, api_key: str, model: str, temperature: float) -> LLM:
+        """Lease a CrewAI LLM for one job; reuses an idle client for the same key, model and temperature"""
+        pool_key = (key_fingerprint(api_key), model, round(temperature, 3))
+        with self._lock:
+            self._evict_idle()
+            idle = self._idle.get(pool_key)
+            client = idle.pop() if idle else None
+            if client:
+                self._stats["reused"] += 1
+        if client is None:
+            client = PooledClient(llm=self._create_crew_llm(api_key, model, temperature), pool_key=pool_key)
+            with self._lock:
+                self._stats["created"] += 1
+        client.uses += 1
+        client.last_used_at = time.monotonic()
+        with self._lock:
+            self._leased[id(client.llm)] = client
+        return client.llm
+
+    def release(self, llm: Any, reusable: bool = True):
+        """Return a leased LLM; reusable=False closes it, e.g. when a timed-out call may still be using it"""
+        with self._lock:
+            client = self._leased.pop(id(llm), None)
+            if client is None:
+                return
+            idle = self._idle.setdefault(client.pool_key, [])
+            if reusable and len(idle) < self.max_idle_per_key:
+                client.last_used_at = time.monotonic()
+                idle.append(client)
+                self._stats["released"] += 1
+                return
+            self._stats["discarded"] += 1
+        self._close(client)
+
+    def get_chat_model(self, api_key: str, model: str, temperature: float = 0.7) -> ChatOpenAI:
+        """Shared LangChain chat model for a key, model and temperature; hand it back with release_chat_model()"""
+        pool_key = (key_fingerprint(api_key), model, round(temperature, 3))
+        with self._lock:
+            self._evict_idle()
+            client = self._shared.get(pool_key)
+            if client is None:
+                limits = self._limits()
+                client = PooledClient(llm=ChatOpenAI(
+                    model=model,
+                    temperature=temperature,
+                    openai_api_key=api_key,
+                    http_client=httpx.Client(limits=limits, event_hooks=rate_limiter.event_hooks(pool_key[0])),
+                    http_async_client=httpx.AsyncClient(limits=limits, event_hooks=rate_limiter.async_event_hooks(pool_key[0]))
+                ), pool_key=pool_key)
+                self._shared[pool_key] = client
+                self._stats["created"] += 1
+            else:
+                self._stats["reused"] += 1
+            client.uses += 1
+            client.refs += 1
+            client.last_used_at = time.monotonic()
+            return client.llm
+
+    def release_chat_model(self, llm: Any):
+        """Drop a reference taken by get_chat_model(); the model stays shared until it is idle"""
+        with self._lock:
+            for client in self._shared.values():
+                if client.llm is llm:
+                    client.refs = max(0, client.refs - 1)
+                    client.last_used_at = time.monotonic()
+                    return
+
+    def _evict_idle(self):
+        """Close unreferenced clients unused for longer than idle_seconds; call with the lock held"""
+        cutoff = time.monotonic() - self.idle_seconds
+        expired: List[PooledClient] = []
+        for pool_key, idle in list(self._idle.items()):
+            expired.extend(client for client in idle if client.last_used_at < cutoff)
+            idle[:] = [client for client in idle if client.last_used_at >= cutoff]
+            if not idle:
+                del self._idle[pool_key]
+        for pool_key, client in list(self._shared.items()):
+            if client.refs == 0 and client.last_used_at < cutoff:
+                expired.append(self._shared.pop(pool_key))
+        self._stats["evicted"] += len(expired)
+        for client in expired:
+            self._close(client)
+
+    def _close(self, client: PooledClient):
+        """Close a client's sync HTTP clients now and its async one in the background"""
+        for name in ("_client", "root_client", "http_client"):
+            http = getattr(client.llm, name, None)
+            if http is not None and hasattr(http, "close"):
+                try:
+                    http.close()
+                except Exception as e:
+                    logger.debug(f"Error closing pooled LLM client: {e}")
+        async_http = getattr(client.llm, "http_async_client", None)
+        if async_http is not None:
+            try:
+                task = asyncio.get_running_loop().create_task(self._aclose(async_http))
+            except RuntimeError:
+                return  # No running loop to close it on; its connections close when it is collected
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+
+    async def _aclose(self, async_http: httpx.AsyncClient):
+        try:
+            await async_http.aclose()
+        except Exception as e:
+            logger.debug(f"Error closing pooled async LLM client: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._evict_idle()
+            requests = self._stats["created"] + self._stats["reused"]
+            return {
+                **self._stats,
+                "reuse_rate_pct": round(self._stats["reused"] / requests * 100, 1) if requests else 0.0,
+                "leased": len(self._leased),
+                "idle": sum(len(idle) for idle in self._idle.values()),
+                "shared": len(self._shared),
+                "keys": len({pool_key[0] for pool_key in [*self._idle, *self._shared]}
+                            | {client.pool_key[0] for client in self._leased.values()})
+            }
+
+    async def close_all(self):
+        """Close every pooled client, waiting for async HTTP clients to shut down"""
+        with self._lock:
+            clients = [client for idle in self._idle.values() for client in idle] + list(self._shared.values())
+            self._idle.clear()
+            self._shared.clear()
+        for client in clients:
+            self._close(client)
+        if self._closing:
+            await asyncio.gather(*list(self._closing), return_exceptions=True)
+
+
+# Global instance
+llm_client_pool = LLMClientPool()
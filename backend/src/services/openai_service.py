@@ -2,6 +2,7 @@ import os
 from typing import Optional, Dict, Any, Tuple
 from langchain_openai import ChatOpenAI
 from ..models.auth import UserProfile, OpenAIKeyValidation
+from .llm_client_pool import llm_client_pool
 import logging
 import openai
 
@@ -30,11 +31,12 @@ class OpenAIService:
         if not api_key:
             raise ValueError("No OpenAI API key available")
         
-        return ChatOpenAI(
-            model=model or self.default_model,
-            temperature=0.7,
-            openai_api_key=api_key
-        )
+        # Shared per key and model so calls reuse open connections
+        return llm_client_pool.get_chat_model(api_key, model or self.default_model, temperature=0.7)
+
+    def release_llm(self, llm: ChatOpenAI):
+        """Hand back an LLM from get_llm_for_user so the pool can close it once idle"""
+        llm_client_pool.release_chat_model(llm)
     
     async def validate_openai_key(self, api_key: str) -> OpenAIKeyValidation:
         """Validate an OpenAI API key by making a test request"""
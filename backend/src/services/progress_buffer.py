@@ -0,0 +1,109 @@
+import asyncio
+import os
+import time
+from typing import Dict, Any, Optional
+import logging
+from ..services.usage_service import usage_service
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressWriteBuffer:
+    """Write-behind buffer for job progress.
+
+    Keeps only the latest progress state per job and flushes all pending
+    jobs to the database as one batched write on a timer, so workflow
+    coroutines never wait on a database round trip for progress ticks.
+    """
+
+    def __init__(self, flush_interval: Optional[float] = None):
+        self.flush_interval = flush_interval or float(os.getenv("PROGRESS_FLUSH_INTERVAL_SECONDS", "5"))
+        self._pending: Dict[str, Dict[str, Any]] = {}  # job_id -> latest {"status", "progress_data"}
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._stats = {
+            "updates_received": 0,
+            "updates_coalesced": 0,
+            "rows_written": 0,
+            "batches_flushed": 0,
+            "failed_flushes": 0,
+            "last_flush_at": None
+        }
+
+    def put(self, job_id: str, status: str, progress_data: Optional[Dict[str, Any]]):
+        """Record the latest progress state for a job; never touches the database"""
+        self._stats["updates_received"] += 1
+        if job_id in self._pending:
+            self._stats["updates_coalesced"] += 1
+        self._pending[job_id] = {"status": status, "progress_data": progress_data}
+        self._ensure_flusher()
+
+    async def discard(self, job_id: str):
+        """Drop a job's pending update, waiting for any in-flight flush to finish first.
+
+        Called before a terminal state is written directly so a stale
+        buffered update cannot land after it.
+        """
+        async with self._flush_lock:
+            self._pending.pop(job_id, None)
+
+    async def flush(self) -> int:
+        """Write all pending progress updates as a single batch"""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+
+            batch = self._pending
+            self._pending = {}
+            try:
+                written = await usage_service.update_journey_progress_batch(batch)
+                self._stats["rows_written"] += written
+                self._stats["batches_flushed"] += 1
+                self._stats["last_flush_at"] = time.time()
+                logger.debug(f"Flushed progress for {len(batch)} jobs in one batch")
+                return written
+            except Exception as e:
+                self._stats["failed_flushes"] += 1
+                logger.error(f"Failed to flush progress batch of {len(batch)} jobs: {e}")
+                # Re-queue entries that have not been superseded by newer updates
+                for job_id, update in batch.items():
+                    self._pending.setdefault(job_id, update)
+                return 0
+
+    def _ensure_flusher(self):
+        """Start the periodic flush task lazily so it binds to the running event loop"""
+        if self._flush_task is None or self._flush_task.done():
+            try:
+                self._flush_task = asyncio.get_running_loop().create_task(self._flush_loop())
+            except RuntimeError:
+                logger.debug("No running event loop - progress will be flushed on the next update")
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Progress flush loop error: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return write traffic counters, including database round trips saved"""
+        received = self._stats["updates_received"]
+        round_trips = self._stats["batches_flushed"]
+        return {
+            **self._stats,
+            "pending_jobs": len(self._pending),
+            "round_trips_saved": max(0, received - round_trips),
+            "write_reduction_pct": round((1 - round_trips / received) * 100, 1) if received else 0.0
+        }
+
+    async def close(self):
+        """Stop the flush task and write anything still pending"""
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+        self._flush_task = None
+        await self.flush()
@@ -0,0 +1,50 @@
+import asyncio
+from collections import deque
+from typing import Dict, Any, Optional, Deque
+import logging
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+
+
+def is_terminal_message(message: Dict[str, Any]) -> bool:
+    """Check whether a progress message reports a finished job"""
+    return message.get("status") in TERMINAL_STATUSES
+
+
+class ProgressSubscription:
+    """Bounded per-subscriber buffer of progress messages for streaming clients.
+
+    Registered as a JobManager progress callback. When a slow consumer falls
+    behind, the oldest intermediate updates are dropped; terminal messages
+    are always kept.
+    """
+
+    def __init__(self, job_id: str, max_pending: int = 20):
+        self.job_id = job_id
+        self.max_pending = max(1, max_pending)
+        self.dropped = 0
+        self._pending: Deque[Dict[str, Any]] = deque()
+        self._available = asyncio.Event()
+
+    def push(self, message: Dict[str, Any]):
+        """Progress callback: queue a message without blocking the workflow"""
+        if len(self._pending) >= self.max_pending:
+            for queued in self._pending:
+                if not is_terminal_message(queued):
+                    self._pending.remove(queued)
+                    self.dropped += 1
+                    break
+        self._pending.append(message)
+        self._available.set()
+
+    async def next(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """Return the next message, or None if nothing arrived within the timeout"""
+        if not self._pending:
+            self._available.clear()
+            try:
+                await asyncio.wait_for(self._available.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                return None
+        return self._pending.popleft() if self._pending else None
@@ -0,0 +1,194 @@
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, Mapping, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+DURATION_SECONDS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def parse_reset_duration(value: Optional[str]) -> Optional[float]:
+    """Parse OpenAI reset durations such as "20ms", "1s" or "6m0s" into seconds"""
+    if not value:
+        return None
+    parts = DURATION_PART.findall(value)
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(amount) * DURATION_SECONDS[unit] for amount, unit in parts)
+
+
+def estimate_request_tokens(body: bytes) -> int:
+    """Rough token cost of a chat completion request: prompt characters / 4 plus the completion cap"""
+    try:
+        payload = json.loads(body or b"{}")
+    except (ValueError, UnicodeDecodeError):
+        return max(1, len(body or b"") // 4)
+    prompt_chars = len(json.dumps(payload.get("messages", payload.get("input", ""))))
+    completion_cap = payload.get("max_completion_tokens") or payload.get("max_tokens") or 0
+    return max(1, prompt_chars // 4 + int(completion_cap))
+
+
+class TokenBucket:
+    """Bucket refilled continuously up to capacity; reservations may overdraw it and wait for the refill.
+
+    Overdrawing keeps callers in arrival order: each one waits for the
+    debt in front of it to be paid back, without retry loops.
+    """
+
+    def __init__(self, capacity: float, per_seconds: float = 60.0):
+        self.capacity = capacity
+        self.rate = capacity / per_seconds
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + max(0.0, now - self.updated) * self.rate)
+        self.updated = max(self.updated, now)
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take amount from the bucket and return how long the caller must wait for it"""
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+        return max(0.0, -self.level / self.rate) if self.rate else 0.0
+
+    def sync(self, limit: Optional[float], remaining: Optional[float], reset_seconds: Optional[float], now: float):
+        """Align the bucket with the provider's view from rate limit headers"""
+        self._refill(now)
+        if limit and limit != self.capacity:
+            self.rate = limit / 60.0  # OpenAI limits are per minute
+            self.capacity = limit
+        if remaining is not None and remaining < self.level:
+            self.level = remaining
+            if reset_seconds and self.capacity > remaining:
+                self.rate = max(self.rate, (self.capacity - remaining) / reset_seconds)
+
+
+class KeyLimits:
+    """Request and token buckets for one API key"""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.blocked_until = 0.0  # Set from Retry-After on 429 responses
+        self.stats = {"requests": 0, "waited": 0, "wait_seconds": 0.0, "rate_limited": 0}
+
+
+class OpenAIRateLimiter:
+    """Process-wide request and token rate limits per API key.
+
+    Every call through a pooled LLM client reserves one request and its
+    estimated tokens before it is sent, waiting when the key is over its
+    limit. Responses correct the buckets from OpenAI's x-ratelimit-* headers,
+    and a 429 pauses the key for its Retry-After. Limits start from
+    RATE_LIMIT_RPM / RATE_LIMIT_TPM until headers report the real ones.
+    """
+
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None):
+        self.requests_per_minute = requests_per_minute or float(os.getenv("RATE_LIMIT_RPM", "500"))
+        self.tokens_per_minute = tokens_per_minute or float(os.getenv("RATE_LIMIT_TPM", "30000"))
+        self._keys: Dict[str, KeyLimits] = {}
+        self._lock = threading.Lock()
+
+    def _limits(self, key_id: str) -> KeyLimits:
+        limits = self._keys.get(key_id)
+        if limits is None:
+            limits = self._keys[key_id] = KeyLimits(self.requests_per_minute, self.tokens_per_minute)
+        return limits
+
+    def reserve(self, key_id: str, tokens: int) -> float:
+        """Reserve one request and tokens for a key; returns the seconds to wait before sending"""
+        with self._lock:
+            now = time.monotonic()
+            limits = self._limits(key_id)
+            wait = max(limits.requests.reserve(1, now), limits.tokens.reserve(tokens, now), limits.blocked_until - now)
+            limits.stats["requests"] += 1
+            if wait > 0:
+                limits.stats["waited"] += 1
+                limits.stats["wait_seconds"] = round(limits.stats["wait_seconds"] + wait, 2)
+            return wait
+
+    def acquire_blocking(self, key_id: str, tokens: int):
+        """Wait in the calling thread until the key has capacity (sync HTTP clients run in worker threads)"""
+        wait = self.reserve(key_id, tokens)
+        if wait > 0:
+            logger.info(f"Rate limiter delaying request on key {key_id} by {wait:.1f}s")
+            time.sleep(wait)
+
+    async def acquire(self, key_id: str, tokens: int):
+        wait = self.reserve(key_id, tokens)
+        if wait > 0:
+            logger.info(f"Rate limiter delaying request on key {key_id} by {wait:.1f}s")
+            await asyncio.sleep(wait)
+
+    def observe(self, key_id: str, status_code: int, headers: Mapping[str, str]):
+        """Update a key's limits from a response's rate limit headers"""
+        def number(name: str) -> Optional[float]:
+            try:
+                return float(headers[name]) if headers.get(name) is not None else None
+            except ValueError:
+                return None
+
+        with self._lock:
+            now = time.monotonic()
+            limits = self._limits(key_id)
+            limits.requests.sync(number("x-ratelimit-limit-requests"), number("x-ratelimit-remaining-requests"),
+                                 parse_reset_duration(headers.get("x-ratelimit-reset-requests")), now)
+            limits.tokens.sync(number("x-ratelimit-limit-tokens"), number("x-ratelimit-remaining-tokens"),
+                               parse_reset_duration(headers.get("x-ratelimit-reset-tokens")), now)
+            if status_code == 429:
+                limits.stats["rate_limited"] += 1
+                retry_after = number("retry-after-ms")
+                retry_after = retry_after / 1000 if retry_after is not None else number("retry-after")
+                pause = retry_after if retry_after is not None else parse_reset_duration(headers.get("x-ratelimit-reset-requests")) or 1.0
+                limits.blocked_until = max(limits.blocked_until, now + pause)
+                logger.warning(f"Rate limited on key {key_id}, pausing its requests for {pause:.1f}s")
+
+    def event_hooks(self, key_id: str) -> Dict[str, Any]:
+        """httpx event hooks that route a sync client's requests through the limiter"""
+        def on_request(request):
+            self.acquire_blocking(key_id, estimate_request_tokens(request.content))
+
+        def on_response(response):
+            self.observe(key_id, response.status_code, response.headers)
+
+        return {"request": [on_request], "response": [on_response]}
+
+    def async_event_hooks(self, key_id: str) -> Dict[str, Any]:
+        """httpx event hooks for async clients"""
+        async def on_request(request):
+            await self.acquire(key_id, estimate_request_tokens(request.content))
+
+        async def on_response(response):
+            self.observe(key_id, response.status_code, response.headers)
+
+        return {"request": [on_request], "response": [on_response]}
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            keys = {}
+            for key_id, limits in self._keys.items():
+                limits.requests._refill(now)
+                limits.tokens._refill(now)
+                keys[key_id] = {
+                    **limits.stats,
+                    "rpm_limit": limits.requests.capacity,
+                    "tpm_limit": limits.tokens.capacity,
+                    "requests_available": round(limits.requests.level, 1),
+                    "tokens_available": round(limits.tokens.level),
+                    "paused_seconds": round(max(0.0, limits.blocked_until - now), 1)
+                }
+            return {"default_rpm": self.requests_per_minute, "default_tpm": self.tokens_per_minute, "keys": keys}
+
+
+# Global instance
+rate_limiter = OpenAIRateLimiter()
@@ -0,0 +1,153 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+import logging
+from .file_extraction import (
+    CHAR_BUDGET, SUPPORTED_EXTENSIONS, extract_file_content, extract_pdf_pages, extract_to_sidecar,
+    extracted_text_path, join_pdf_pages, store_extracted_text
+)
+from .upload_store import upload_store
+
+logger = logging.getLogger(__name__)
+
+
+def _read_text(path: str) -> str:
+    with open(path, 'r', encoding='utf-8', errors='ignore') as file:
+        return file.read()
+
+
+class ResearchExtractionService:
+    """Extracts research upload text in a process pool as soon as files arrive.
+
+    Upload endpoints call submit(); the research workflow step awaits
+    get_contents(), which is usually ready by then. Extracted text is also
+    written next to each upload, so out-of-process workers and restarted
+    servers reuse it instead of parsing the file again.
+
+    PDFs are read in page ranges of PDF_PAGES_PER_TASK until the character
+    budget is filled: the first range also probes for the fastest working
+    library, and later ranges are spread across the pool's processes.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_pending: int = 500, pages_per_task: Optional[int] = None):
+        self.max_workers = max_workers or int(os.getenv("RESEARCH_EXTRACTION_WORKERS", "0")) or min(4, os.cpu_count() or 1)
+        self.pages_per_task = pages_per_task or int(os.getenv("PDF_PAGES_PER_TASK", "4"))
+        self.max_pending = max_pending
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending: Dict[str, asyncio.Future] = {}  # file path -> extraction result, in submit order
+        self._in_flight: Dict[str, asyncio.Future] = {}  # file path -> extraction still running, shared by all readers
+        self._stats = {"submitted": 0, "joined_in_flight": 0, "ready_when_needed": 0, "awaited": 0, "sidecar_hits": 0,
+                       "extracted_on_demand": 0, "pdf_pages_read": 0, "pdf_pages_skipped": 0}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: forking a process that runs an event loop and client threads is unsafe
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+            logger.info(f"Started research extraction pool with {self.max_workers} processes")
+        return self._executor
+
+    def submit(self, file_path: str) -> Optional[asyncio.Future]:
+        """Start extracting an uploaded file in the background"""
+        if os.path.splitext(file_path)[1].lower() not in SUPPORTED_EXTENSIONS:
+            return None
+        if file_path in self._in_flight:
+            # The same content is already being extracted into the same sidecar
+            self._stats["joined_in_flight"] += 1
+            return self._in_flight[file_path]
+        if file_path not in self._pending and os.path.exists(extracted_text_path(file_path)):
+            return None  # Same content was uploaded and extracted before
+        if file_path not in self._pending:
+            if file_path.lower().endswith(".pdf"):
+                self._pending[file_path] = asyncio.ensure_future(self._extract_pdf(file_path))
+            else:
+                loop = asyncio.get_running_loop()
+                self._pending[file_path] = loop.run_in_executor(self._get_executor(), extract_to_sidecar, file_path)
+            future = self._pending[file_path]
+            self._in_flight[file_path] = future
+            future.add_done_callback(lambda _, path=file_path: self._in_flight.pop(path, None))
+            self._stats["submitted"] += 1
+            self._prune()
+        return self._pending[file_path]
+
+    async def _extract_pdf(self, file_path: str) -> str:
+        """Read a PDF's pages in the pool until the character budget is filled, then store the text"""
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        first = await loop.run_in_executor(executor, extract_pdf_pages, file_path, 0, self.pages_per_task, None, CHAR_BUDGET)
+        backend, page_count, pages = first["backend"], first["page_count"], first["pages"]
+        next_page = self.pages_per_task
+        chars = sum(len(text) for text in pages)
+        while chars < CHAR_BUDGET and next_page < page_count:
+            # One range per process; ranges past the budget are never started
+            starts = range(next_page, min(page_count, next_page + self.max_workers * self.pages_per_task), self.pages_per_task)
+            ranges = await asyncio.gather(*(
+                loop.run_in_executor(executor, extract_pdf_pages, file_path, start, start + self.pages_per_task,
+                                     backend, CHAR_BUDGET - chars)
+                for start in starts
+            ))
+            for text in (text for result in ranges for text in result["pages"]):
+                if chars >= CHAR_BUDGET:
+                    break
+                pages.append(text)
+                chars += len(text)
+            next_page = starts[-1] + self.pages_per_task
+        self._stats["pdf_pages_read"] += len(pages)
+        self._stats["pdf_pages_skipped"] += page_count - len(pages)
+        content = join_pdf_pages(file_path, pages, backend, page_count)
+        await asyncio.to_thread(store_extracted_text, file_path, content)
+        return content
+
+    def _prune(self):
+        """Forget finished results for uploads that were never used in a journey"""
+        for file_path in list(self._pending):
+            if len(self._pending) <= self.max_pending:
+                break
+            if self._pending[file_path].done():
+                del self._pending[file_path]
+
+    async def _get_content(self, file_path: str) -> str:
+        future = self._pending.pop(file_path, None) or self._in_flight.get(file_path)
+        if future is None:
+            sidecar = extracted_text_path(file_path)
+            if os.path.exists(sidecar):
+                self._stats["sidecar_hits"] += 1
+                return await asyncio.to_thread(_read_text, sidecar)
+            self._stats["extracted_on_demand"] += 1
+            future = self.submit(file_path)
+            if future is None:
+                return extract_file_content(file_path)  # Unsupported type, returns a note
+            self._pending.pop(file_path, None)
+        else:
+            self._stats["ready_when_needed" if future.done() else "awaited"] += 1
+
+        try:
+            return await future
+        except Exception as e:
+            # A broken pool should not fail the journey; parse in a thread instead
+            logger.error(f"Extraction pool failed for {file_path}, extracting in a thread: {e}")
+            return await asyncio.to_thread(extract_file_content, file_path)
+
+    async def _get_stored_content(self, file_ref: str) -> str:
+        file_path = await asyncio.to_thread(upload_store.resolve, file_ref)
+        if file_path is None:
+            return f"[File no longer available: {file_ref}]"
+        return await self._get_content(file_path)
+
+    async def get_contents(self, file_refs: List[str]) -> Dict[str, str]:
+        """Return extracted text per uploaded content ID, waiting only for extractions still running"""
+        contents = await asyncio.gather(*(self._get_stored_content(file_ref) for file_ref in file_refs))
+        return dict(zip(file_refs, contents))
+
+    def get_stats(self) -> Dict[str, int]:
+        return {**self._stats, "pending": len(self._pending), "in_flight": len(self._in_flight), "max_workers": self.max_workers}
+
+    def shutdown(self):
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Global instance
+research_extraction_service = ResearchExtractionService()
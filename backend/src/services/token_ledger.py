@@ -0,0 +1,124 @@
+import os
+from typing import Dict, Any, Optional
+import logging
+from ..models.auth import UserProfile
+
+logger = logging.getLogger(__name__)
+
+# Default per-journey token budgets by plan; 0 means unlimited (BYOK users pay for their own tokens)
+DEFAULT_PLAN_TOKEN_BUDGETS = {"free": 200000, "starter": 400000, "pro": 0}
+
+
+class TokenBudgetExceeded(RuntimeError):
+    """Raised before a step that would take a journey over its token budget"""
+
+
+def parse_plan_budgets(value: Optional[str]) -> Dict[str, int]:
+    """Parse "free=200000,starter=400000,pro=0" into per-plan token budgets"""
+    budgets = dict(DEFAULT_PLAN_TOKEN_BUDGETS)
+    for item in (value or "").split(","):
+        if "=" in item:
+            plan, budget = item.split("=", 1)
+            try:
+                budgets[plan.strip()] = int(budget)
+            except ValueError:
+                logger.warning(f"Ignoring invalid plan token budget: {item}")
+    return budgets
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Price tokens with LiteLLM's model cost map; unknown models cost 0"""
+    try:
+        from litellm import cost_per_token
+        prompt_cost, completion_cost = cost_per_token(model=model, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        return prompt_cost + completion_cost
+    except Exception:
+        return 0.0
+
+
+class TokenLedger:
+    """Token, cost and latency accounting for one journey, per workflow step.
+
+    degrade_ratio is the share of the budget after which the workflow should
+    spend less (e.g. tighter context compaction); a step that would cross the
+    full budget raises TokenBudgetExceeded instead of running.
+    """
+
+    def __init__(self, model: str, budget: int = 0, degrade_ratio: float = 0.8, completion_estimate: int = 2000):
+        self.model = model
+        self.budget = budget
+        self.degrade_ratio = degrade_ratio
+        self.completion_estimate = completion_estimate  # Expected completion tokens of a step with no history yet
+        self.steps: Dict[str, Dict[str, Any]] = {}
+
+    @classmethod
+    def for_user(cls, user: UserProfile, model: str) -> "TokenLedger":
+        budgets = parse_plan_budgets(os.getenv("PLAN_TOKEN_BUDGETS"))
+        return cls(model=model, budget=budgets.get(user.plan_type, 0),
+                   degrade_ratio=float(os.getenv("TOKEN_BUDGET_DEGRADE_RATIO", "0.8")),
+                   completion_estimate=int(os.getenv("STEP_COMPLETION_TOKEN_ESTIMATE", "2000")))
+
+    def restore(self, usage: Optional[Dict[str, Any]]):
+        """Continue from a saved summary, e.g. when a journey resumes from checkpoints"""
+        for key, step in ((usage or {}).get("steps") or {}).items():
+            self.steps[key] = dict(step)
+
+    @property
+    def total_tokens(self) -> int:
+        return sum(step["total_tokens"] for step in self.steps.values())
+
+    @property
+    def degraded(self) -> bool:
+        return bool(self.budget) and self.total_tokens >= self.budget * self.degrade_ratio
+
+    def expected_completion_tokens(self) -> int:
+        """Completion tokens to reserve for a step: the largest completion seen in this journey, or the default"""
+        completions = [step["completion_tokens"] for step in self.steps.values() if step["completion_tokens"]]
+        return max(completions) if completions else self.completion_estimate
+
+    def check_budget(self, step_name: str, estimated_prompt_tokens: int = 0, max_completion_tokens: Optional[int] = None):
+        """Refuse to start a step whose prompt plus expected completion would exceed the remaining budget"""
+        if not self.budget:
+            return
+        completion_tokens = max_completion_tokens if max_completion_tokens is not None else self.expected_completion_tokens()
+        needed = estimated_prompt_tokens + completion_tokens
+        if self.total_tokens + needed > self.budget:
+            raise TokenBudgetExceeded(
+                f"Token budget of {self.budget} exceeded before {step_name} "
+                f"({self.total_tokens} used, ~{needed} needed)"
+            )
+
+    def record(self, step_key: str, usage: Any, latency_seconds: float, attempts: int = 1, cache_hit: bool = False) -> Dict[str, Any]:
+        """Add a step's usage (CrewAI UsageMetrics or a dict) to the ledger"""
+        def read(name: str) -> int:
+            value = usage.get(name) if isinstance(usage, dict) else getattr(usage, name, 0)
+            return int(value or 0)
+
+        prompt_tokens, completion_tokens = read("prompt_tokens"), read("completion_tokens")
+        entry = self.steps.setdefault(step_key, {
+            "prompt_tokens": 0, "completion_tokens": 0, "cached_prompt_tokens": 0, "total_tokens": 0,
+            "requests": 0, "latency_seconds": 0.0, "attempts": 0, "cost_usd": 0.0, "cache_hit": False
+        })
+        entry["prompt_tokens"] += prompt_tokens
+        entry["completion_tokens"] += completion_tokens
+        entry["cached_prompt_tokens"] += read("cached_prompt_tokens")
+        entry["total_tokens"] += read("total_tokens") or prompt_tokens + completion_tokens
+        entry["requests"] += read("successful_requests")
+        entry["latency_seconds"] = round(entry["latency_seconds"] + latency_seconds, 2)
+        entry["attempts"] += attempts
+        entry["cost_usd"] = round(entry["cost_usd"] + estimate_cost(self.model, prompt_tokens, completion_tokens), 6)
+        entry["cache_hit"] = cache_hit
+        return dict(entry)
+
+    def summary(self) -> Dict[str, Any]:
+        totals = {name: sum(step[name] for step in self.steps.values())
+                  for name in ("prompt_tokens", "completion_tokens", "cached_prompt_tokens", "total_tokens", "requests")}
+        totals["latency_seconds"] = round(sum(step["latency_seconds"] for step in self.steps.values()), 2)
+        totals["cost_usd"] = round(sum(step["cost_usd"] for step in self.steps.values()), 6)
+        return {
+            "model": self.model,
+            "budget_tokens": self.budget or None,
+            "degraded": self.degraded,
+            "totals": totals,
+            "steps": {key: dict(step) for key, step in self.steps.items()}
+        }
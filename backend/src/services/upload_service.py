@@ -0,0 +1,153 @@
+import asyncio
+import hashlib
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional
+import logging
+import aiofiles
+from fastapi import HTTPException
+from .upload_store import UploadStore, upload_store
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+SNIFF_BYTES = 512
+MULTIPART_OVERHEAD_BYTES = 64 * 1024  # Boundaries, part headers and form fields around the files
+
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+# Content type each research extension must sniff as; other extensions are stored as-is
+EXPECTED_MIME = {".pdf": "application/pdf", ".docx": DOCX_MIME, ".csv": "text/csv", ".txt": "text/plain"}
+SIGNATURES = (
+    (b"%PDF-", "application/pdf"),
+    (b"PK\x03\x04", "application/zip"),
+    (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "application/x-ole-storage"),  # Legacy .doc/.xls
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x1f\x8b", "application/gzip"),
+)
+
+
+def sniff_mime(head: bytes, filename: str = "") -> str:
+    """Content type from a file's leading bytes; the extension only picks between text and zip subtypes"""
+    extension = os.path.splitext(filename)[1].lower()
+    for signature, mime_type in SIGNATURES:
+        if head.startswith(signature):
+            if mime_type == "application/zip" and extension == ".docx":
+                return DOCX_MIME
+            return mime_type
+    if head.startswith((b"\xff\xfe", b"\xfe\xff")) or b"\x00" not in head:
+        return "text/csv" if extension == ".csv" else "text/plain"
+    return "application/octet-stream"
+
+
+@dataclass
+class StoredUpload:
+    content_id: str  # SHA-256 of the content; journeys reference uploads by it
+    path: str
+    filename: str
+    size: int
+    sha256: str
+    mime_type: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"content_id": self.content_id, "filename": self.filename, "size": self.size,
+                "sha256": self.sha256, "mime_type": self.mime_type}
+
+
+class UploadService:
+    """Streams research uploads into the upload store in fixed-size chunks.
+
+    Each file is hashed and its type sniffed while it is copied, so memory
+    per upload stays at one chunk whatever the file size. Files over
+    UPLOAD_MAX_FILE_MB, or requests over UPLOAD_MAX_REQUEST_MB in total, are
+    rejected with 413 as soon as the size is known and nothing is kept.
+    """
+
+    def __init__(self, store: Optional[UploadStore] = None, max_file_bytes: Optional[int] = None,
+                 max_request_bytes: Optional[int] = None, chunk_bytes: Optional[int] = None):
+        self.store = store or upload_store
+        self.max_file_bytes = max_file_bytes or int(float(os.getenv("UPLOAD_MAX_FILE_MB", "50")) * MB)
+        self.max_request_bytes = max_request_bytes or int(float(os.getenv("UPLOAD_MAX_REQUEST_MB", "200")) * MB)
+        self.chunk_bytes = chunk_bytes or int(os.getenv("UPLOAD_CHUNK_KB", "1024")) * 1024
+        self._stats = {"stored": 0, "bytes": 0, "rejected_size": 0, "rejected_type": 0}
+
+    @property
+    def max_body_bytes(self) -> int:
+        """Largest request body an upload request may have, multipart framing included"""
+        return self.max_request_bytes + MULTIPART_OVERHEAD_BYTES
+
+    def exceeds_request_limit(self, content_length: Optional[str]) -> bool:
+        """Whether a request's Content-Length alone rules it out, before its body is read"""
+        try:
+            return int(content_length or 0) > self.max_body_bytes
+        except ValueError:
+            return False
+
+    def _too_large(self, detail: str) -> HTTPException:
+        self._stats["rejected_size"] += 1
+        return HTTPException(status_code=413, detail=detail)
+
+    async def save(self, file: Any, request_bytes_left: Optional[int] = None) -> StoredUpload:
+        """Copy one upload into the store, hashing and sniffing it on the way"""
+        filename = file.filename or "upload"
+        limit = min(self.max_file_bytes, request_bytes_left if request_bytes_left is not None else self.max_file_bytes)
+        if file.size is not None and file.size > self.max_file_bytes:
+            raise self._too_large(f"{filename} is larger than {self.max_file_bytes // MB} MB")
+
+        extension = os.path.splitext(filename)[1]
+        partial = self.store.temp_path(extension)
+        digest = hashlib.sha256()
+        head = b""
+        size = 0
+        try:
+            async with aiofiles.open(partial, "wb") as out:
+                while chunk := await file.read(self.chunk_bytes):
+                    size += len(chunk)
+                    if size > limit:
+                        if limit < self.max_file_bytes:
+                            raise self._too_large(f"Upload is larger than {self.max_request_bytes // MB} MB in total")
+                        raise self._too_large(f"{filename} is larger than {self.max_file_bytes // MB} MB")
+                    if len(head) < SNIFF_BYTES:
+                        head += chunk[:SNIFF_BYTES - len(head)]
+                    digest.update(chunk)
+                    await out.write(chunk)
+
+            mime_type = sniff_mime(head, filename)
+            expected = EXPECTED_MIME.get(extension.lower())
+            if expected and mime_type != expected:
+                self._stats["rejected_type"] += 1
+                raise HTTPException(status_code=415, detail=f"{filename} is not a valid {extension.lower()} file")
+            content_id = digest.hexdigest()
+            path = await asyncio.to_thread(self.store.put, partial, content_id, size, mime_type, extension)
+        except BaseException:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+
+        self._stats["stored"] += 1
+        self._stats["bytes"] += size
+        logger.info(f"Uploaded file: {filename} -> {content_id[:12]} ({size} bytes, {mime_type})")
+        return StoredUpload(content_id=content_id, path=path, filename=filename, size=size, sha256=content_id, mime_type=mime_type)
+
+    async def save_all(self, files: Iterable[Any]) -> List[StoredUpload]:
+        """Store every named upload of one request within the per-request cap.
+
+        If a later file is rejected, files already stored stay unreferenced and
+        are garbage collected; they may be shared with other uploads.
+        """
+        files = [file for file in files if getattr(file, "filename", None)]
+        known = sum(file.size or 0 for file in files)
+        if known > self.max_request_bytes:
+            raise self._too_large(f"Upload is larger than {self.max_request_bytes // MB} MB in total")
+
+        stored: List[StoredUpload] = []
+        for file in files:
+            stored.append(await self.save(file, self.max_request_bytes - sum(s.size for s in stored)))
+        return stored
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self._stats, "max_file_mb": self.max_file_bytes / MB, "max_request_mb": self.max_request_bytes / MB}
+
+
+# Global instance
+upload_service = UploadService()
@@ -0,0 +1,255 @@
+import asyncio
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional
+import logging
+from .file_extraction import extracted_text_path
+
+logger = logging.getLogger(__name__)
+
+CONTENT_ID = re.compile(r"^[0-9a-f]{64}$")
+# References of jobs that never finished, e.g. lost in a crash, stop protecting their files after this
+ABANDONED_REF_SECONDS = 7 * 24 * 3600
+
+
+def is_content_id(value: str) -> bool:
+    return bool(CONTENT_ID.match(value or ""))
+
+
+class UploadStore:
+    """Research uploads stored once per content, keyed by their SHA-256 digest.
+
+    Files live at <root>/<id[:2]>/<id><ext>, so the same deck uploaded many
+    times is stored and extracted once. Journeys reference the content IDs
+    they use; a file is garbage collected when no active job references it
+    and none released it within UPLOAD_RETENTION_HOURS. Uploads not yet
+    attached to a journey are kept for UPLOAD_ORPHAN_GRACE_MINUTES. The index
+    is a SQLite file, so API and worker processes share reference counts.
+    """
+
+    def __init__(self, root: Optional[str] = None, upload_dir: Optional[str] = None, retention_seconds: Optional[float] = None,
+                 orphan_grace_seconds: Optional[float] = None, gc_interval_seconds: Optional[float] = None):
+        self.upload_dir = upload_dir or os.getenv("UPLOAD_DIR", "/tmp/uploads")
+        self.root = root or os.getenv("UPLOAD_STORE_DIR") or os.path.join(self.upload_dir, "store")
+        self.retention_seconds = retention_seconds if retention_seconds is not None else float(os.getenv("UPLOAD_RETENTION_HOURS", "24")) * 3600
+        self.orphan_grace_seconds = orphan_grace_seconds if orphan_grace_seconds is not None else float(os.getenv("UPLOAD_ORPHAN_GRACE_MINUTES", "60")) * 60
+        self.gc_interval_seconds = gc_interval_seconds if gc_interval_seconds is not None else float(os.getenv("UPLOAD_GC_INTERVAL_MINUTES", "30")) * 60
+        self._initialized = False
+        self._init_lock = threading.Lock()
+        self._gc_task: Optional[asyncio.Task] = None
+        self._stats = {"stored": 0, "deduplicated": 0, "bytes_saved": 0, "collected": 0, "bytes_collected": 0, "legacy_collected": 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(os.path.join(self.root, "index.db"), timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        return conn
+
+    def _ensure_schema(self):
+        # The index is created on first use so importing this module has no side effects
+        with self._init_lock:
+            if self._initialized:
+                return
+            os.makedirs(self.root, exist_ok=True)
+            conn = self._connect()
+            try:
+                conn.executescript("""
+                    CREATE TABLE IF NOT EXISTS uploads (
+                        content_id TEXT PRIMARY KEY,
+                        extension TEXT NOT NULL,
+                        mime_type TEXT NOT NULL,
+                        size_bytes INTEGER NOT NULL,
+                        created_at REAL NOT NULL,
+                        last_used_at REAL NOT NULL
+                    );
+                    CREATE TABLE IF NOT EXISTS upload_refs (
+                        content_id TEXT NOT NULL,
+                        job_id TEXT NOT NULL,
+                        created_at REAL NOT NULL,
+                        released_at REAL,
+                        PRIMARY KEY (content_id, job_id)
+                    );
+                    CREATE INDEX IF NOT EXISTS idx_upload_refs_job ON upload_refs (job_id);
+                """)
+            finally:
+                conn.close()
+            self._initialized = True
+
+    def _blob_path(self, content_id: str, extension: str) -> str:
+        return os.path.join(self.root, content_id[:2], f"{content_id}{extension}")
+
+    def put(self, temp_path: str, content_id: str, size: int, mime_type: str, extension: str) -> str:
+        """Move a fully written upload into the store, or drop it if the content is already there; returns the stored path"""
+        self._ensure_schema()
+        now = time.time()
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT extension FROM uploads WHERE content_id = ?", (content_id,)).fetchone()
+            path = self._blob_path(content_id, row[0] if row else extension.lower())
+            if row and os.path.exists(path):
+                os.remove(temp_path)
+                conn.execute("UPDATE uploads SET last_used_at = ? WHERE content_id = ?", (now, content_id))
+                self._stats["deduplicated"] += 1
+                self._stats["bytes_saved"] += size
+                return path
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(temp_path, path)
+            conn.execute(
+                "INSERT OR REPLACE INTO uploads (content_id, extension, mime_type, size_bytes, created_at, last_used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (content_id, os.path.splitext(path)[1], mime_type, size, now, now)
+            )
+            self._stats["stored"] += 1
+            return path
+        finally:
+            conn.close()
+
+    def resolve(self, file_ref: str) -> Optional[str]:
+        """Local path of a content ID; paths from journeys created before the store are returned as-is"""
+        if not is_content_id(file_ref):
+            return file_ref
+        self._ensure_schema()
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT extension FROM uploads WHERE content_id = ?", (file_ref,)).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        path = self._blob_path(file_ref, row[0])
+        return path if os.path.exists(path) else None
+
+    def describe(self, file_ref: str) -> Dict[str, Any]:
+        """Short display name and extension of an upload for prompts"""
+        if not is_content_id(file_ref):
+            return {"name": os.path.basename(file_ref), "extension": os.path.splitext(file_ref)[1].lower()}
+        path = self.resolve(file_ref)
+        extension = os.path.splitext(path)[1].lower() if path else ""
+        return {"name": f"{file_ref[:12]}{extension}", "extension": extension}
+
+    def missing(self, content_ids: Iterable[str]) -> List[str]:
+        """Content IDs that are malformed or not in the store"""
+        return [content_id for content_id in content_ids if not is_content_id(content_id) or self.resolve(content_id) is None]
+
+    def add_refs(self, job_id: str, file_refs: Iterable[str]):
+        """Record that a journey uses these uploads so they survive garbage collection"""
+        content_ids = [ref for ref in file_refs if is_content_id(ref)]
+        if not content_ids:
+            return
+        self._ensure_schema()
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.executemany(
+                "INSERT INTO upload_refs (content_id, job_id, created_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (content_id, job_id) DO UPDATE SET released_at = NULL",
+                [(content_id, job_id, now) for content_id in content_ids]
+            )
+        finally:
+            conn.close()
+
+    def release_refs(self, job_id: str):
+        """Mark a finished journey's uploads as no longer in use; they are kept for the retention period"""
+        self._ensure_schema()
+        conn = self._connect()
+        try:
+            conn.execute("UPDATE upload_refs SET released_at = ? WHERE job_id = ? AND released_at IS NULL", (time.time(), job_id))
+        finally:
+            conn.close()
+
+    def collect_garbage(self) -> int:
+        """Delete uploads no active or recent journey references; returns the number of files removed"""
+        self._ensure_schema()
+        now = time.time()
+        conn = self._connect()
+        try:
+            rows = conn.execute("""
+                SELECT content_id, extension, size_bytes FROM uploads u
+                WHERE last_used_at < ? AND NOT EXISTS (
+                    SELECT 1 FROM upload_refs r WHERE r.content_id = u.content_id AND (
+                        (r.released_at IS NULL AND r.created_at >= ?) OR r.released_at >= ?
+                    )
+                )
+            """, (now - self.orphan_grace_seconds, now - ABANDONED_REF_SECONDS, now - self.retention_seconds)).fetchall()
+            for content_id, extension, size in rows:
+                path = self._blob_path(content_id, extension)
+                self._remove_file(path)
+                conn.execute("DELETE FROM uploads WHERE content_id = ?", (content_id,))
+                conn.execute("DELETE FROM upload_refs WHERE content_id = ?", (content_id,))
+                self._stats["bytes_collected"] += size
+            self._stats["collected"] += len(rows)
+        finally:
+            conn.close()
+        self._collect_legacy_uploads(now)
+        if rows:
+            logger.info(f"Upload GC removed {len(rows)} unreferenced files")
+        return len(rows)
+
+    def _collect_legacy_uploads(self, now: float):
+        """Remove files left in the upload directory by the old per-upload naming, and abandoned partial uploads"""
+        cutoff = now - self.retention_seconds
+        directories = [(self.root, True)]
+        if os.path.abspath(self.upload_dir) != os.path.abspath(self.root):
+            directories.append((self.upload_dir, False))
+        for directory, partial_only in directories:
+            if not os.path.isdir(directory):
+                continue
+            for entry in os.scandir(directory):
+                if partial_only and not entry.name.endswith(".part"):
+                    continue  # The store root also holds the index
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    self._remove_file(entry.path)
+                    self._stats["legacy_collected"] += 1
+
+    def temp_path(self, extension: str = "") -> str:
+        """Where an upload is written before put(), on the store's filesystem so the move is atomic"""
+        os.makedirs(self.root, exist_ok=True)
+        return os.path.join(self.root, f"{uuid.uuid4()}{extension}.part")
+
+    def _remove_file(self, path: str):
+        for target in (path, extracted_text_path(path)):
+            try:
+                os.remove(target)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Could not remove upload {target}: {e}")
+
+    async def _gc_loop(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.collect_garbage)
+            except Exception as e:
+                logger.error(f"Upload GC failed: {e}")
+            await asyncio.sleep(self.gc_interval_seconds)
+
+    def start_gc(self):
+        """Run garbage collection in the background every UPLOAD_GC_INTERVAL_MINUTES"""
+        if self.gc_interval_seconds > 0 and (self._gc_task is None or self._gc_task.done()):
+            self._gc_task = asyncio.create_task(self._gc_loop())
+
+    def stop_gc(self):
+        if self._gc_task:
+            self._gc_task.cancel()
+            self._gc_task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = dict(self._stats)
+        if self._initialized:
+            conn = self._connect()
+            try:
+                stats["files"], stats["bytes"] = conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM uploads").fetchone()
+                stats["referenced"] = conn.execute(
+                    "SELECT COUNT(DISTINCT content_id) FROM upload_refs WHERE released_at IS NULL").fetchone()[0]
+            finally:
+                conn.close()
+        return stats
+
+
+# Global instance
+upload_store = UploadStore()
@@ -204,6 +204,68 @@ class UsageService:
             logger.error(f"Update data was: {update_data}")
             return False
 
+    async def update_journey_progress_batch(self, updates: Dict[str, Dict[str, Any]]) -> int:
+        """
+        Write the latest status and progress of many journeys in one round trip.
+        updates maps job_id -> {"status": ..., "progress_data": ...}.
+        Returns the number of journeys updated.
+        """
+        if not updates:
+            return 0
+
+        if not self._is_available():
+            logger.debug(f"Mock: Batched progress update for {len(updates)} journeys")
+            return len(updates)
+
+        rows = [
+            {"job_id": job_id, "status": update["status"], "progress_data": update.get("progress_data")}
+            for job_id, update in updates.items()
+        ]
+
+        try:
+            response = self.supabase.rpc("update_journey_progress_batch", {"updates": rows}).execute()
+            return response.data if isinstance(response.data, int) else len(rows)
+        except Exception as e:
+            # Fall back to per-journey updates if the batch function is not deployed yet
+            logger.warning(f"Batched progress update failed, falling back to single updates: {e}")
+            updated = 0
+            for row in rows:
+                if await self.update_journey_status(row["job_id"], row["status"], row["progress_data"]):
+                    updated += 1
+            return updated
+
+    async def save_journey_checkpoints(self, job_id: str, checkpoints: Dict[str, str]) -> bool:
+        """Persist completed workflow step outputs so a restarted backend can resume the journey"""
+        if not self._is_available():
+            logger.debug(f"Mock: Saved {len(checkpoints)} checkpoints for journey {job_id}")
+            return True
+
+        try:
+            response = self.supabase.table("user_journeys") \
+                .update({"checkpoint_data": checkpoints, "updated_at": datetime.now().isoformat()}) \
+                .eq("job_id", job_id) \
+                .execute()
+            return bool(response.data)
+
+        except Exception as e:
+            logger.error(f"Failed to save checkpoints for journey {job_id}: {str(e)}")
+            return False
+
+    async def get_journey_checkpoints(self, job_id: str) -> Dict[str, str]:
+        """Get the completed workflow step outputs stored for a journey"""
+        if not self._is_available():
+            return {}
+
+        try:
+            response = self.supabase.table("user_journeys").select("checkpoint_data").eq("job_id", job_id).limit(1).execute()
+            if response.data and response.data[0].get("checkpoint_data"):
+                return response.data[0]["checkpoint_data"]
+            return {}
+
+        except Exception as e:
+            logger.error(f"Failed to get checkpoints for journey {job_id}: {str(e)}")
+            return {}
+
     async def update_journey_completion(self, journey_id: str, status: str, result_data: Optional[Dict[str, Any]] = None):
         """
         Update journey completion status in the database.
@@ -298,6 +360,28 @@ class UsageService:
             logger.error(f"Failed to get in-progress journeys: {str(e)}")
             return []
 
+    async def get_user_in_progress_journeys(self, user_id: str, limit: int = 1) -> List[UserJourney]:
+        """Get a user's in-progress journeys using the (user_id, status, created_at) index"""
+        if not self._is_available():
+            return []
+
+        try:
+            cutoff_time = datetime.now().timestamp() - 86400  # 24 hours ago
+
+            response = self.supabase.table("user_journeys") \
+                .select("*") \
+                .eq("user_id", user_id) \
+                .eq("status", "processing") \
+                .gte("created_at", datetime.fromtimestamp(cutoff_time).isoformat()) \
+                .order("created_at", desc=True) \
+                .limit(limit) \
+                .execute()
+            return [UserJourney(**journey) for journey in response.data] if response.data else []
+
+        except Exception as e:
+            logger.error(f"Failed to get in-progress journeys for user {user_id}: {str(e)}")
+            return []
+
     async def get_usage_stats(self, user_id: str) -> Dict[str, Any]:
         """Get user's usage statistics"""
         if not self._is_available():
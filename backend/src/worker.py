@@ -0,0 +1,162 @@
+"""
+Journey workflow worker.
+
+Pulls queued journeys from the job queue and runs the CrewAI workflow outside
+the API process, so generation and HTTP serving scale independently.
+
+Run from the backend directory (with JOB_EXECUTION_MODE=queue on the API):
+    python -m src.worker --concurrency 2
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+import time
+from typing import Dict, Any, Optional
+from dotenv import load_dotenv
+
+# Load .env before importing services; their global instances read the environment on import
+load_dotenv()
+
+from .models.journey import Job, JobStatus, JourneyFormData
+from .models.auth import UserProfile
+from .services.auth_service import auth_service
+from .services.job_manager import JobManager
+from .services.job_queue import JobQueue, QueuedJob, create_job_queue
+
+logger = logging.getLogger(__name__)
+
+
+class WorkflowWorker:
+    def __init__(self, job_queue: JobQueue, concurrency: int = 2, worker_id: Optional[str] = None,
+                 poll_interval: float = 1.0, lease_seconds: float = 60.0, shutdown_grace_seconds: float = 600.0):
+        self.job_queue = job_queue
+        self.concurrency = max(1, concurrency)
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.shutdown_grace_seconds = shutdown_grace_seconds
+        self.job_manager = JobManager(max_concurrent_workflows=self.concurrency, execution_mode="inline")
+        self._publishers: Dict[str, Any] = {}
+        self._stopping = asyncio.Event()
+
+    def _active_job_ids(self):
+        return [job_id for ids in self.job_manager._active_jobs_by_user.values() for job_id in ids]
+
+    async def _resolve_user(self, queued: QueuedJob) -> UserProfile:
+        """Load the current user profile (with API key) or fall back to the queued snapshot"""
+        user = await auth_service.get_user_profile(queued.user_id)
+        if user:
+            return user
+        logger.warning(f"Using queued profile snapshot for user {queued.user_id}")
+        return UserProfile(**queued.payload["user"])
+
+    async def _start_job(self, queued: QueuedJob):
+        user = await self._resolve_user(queued)
+        job = Job(
+            id=queued.job_id,
+            status=JobStatus.QUEUED,
+            user_id=queued.user_id,
+            form_data=JourneyFormData(**queued.payload["form_data"])
+        )
+        self.job_manager._store_job(job)
+
+        async def publish(update_msg: Dict[str, Any]):
+            message = dict(update_msg)
+            if job.result:
+                # Publish by alias so the API can rebuild the JourneyMap
+                message["result"] = job.result.dict(by_alias=True)
+            try:
+                await self.job_queue.publish_progress(job.id, message)
+            except Exception as e:
+                logger.error(f"Failed to publish progress for job {job.id}: {e}")
+
+        self._publishers[job.id] = publish
+        self.job_manager.register_progress_callback(job.id, publish)
+        await self.job_manager._enqueue_job(job.id, user)
+        logger.info(f"Worker {self.worker_id} started job {job.id} (attempt {queued.attempts})")
+
+    async def _heartbeat(self):
+        """Renew leases of running jobs and act on cancel requests"""
+        active_ids = self._active_job_ids()
+        await self.job_queue.renew_leases(active_ids, self.worker_id, self.lease_seconds)
+        for job_id in await self.job_queue.get_cancel_requests(active_ids):
+            logger.info(f"Cancel requested for job {job_id}")
+            await self.job_manager.cancel_job(job_id)
+
+    async def run(self):
+        logger.info(f"Worker {self.worker_id} started with {self.concurrency} slots")
+        last_heartbeat = 0.0
+        while not self._stopping.is_set():
+            if time.time() - last_heartbeat >= self.lease_seconds / 3:
+                try:
+                    await self._heartbeat()
+                except Exception as e:
+                    logger.error(f"Worker heartbeat failed: {e}")
+                last_heartbeat = time.time()
+
+            claimed = None
+            if len(self._active_job_ids()) < self.concurrency:
+                try:
+                    claimed = await self.job_queue.claim(self.worker_id, self.lease_seconds)
+                    if claimed:
+                        await self._start_job(claimed)
+                except Exception as e:
+                    logger.error(f"Failed to claim or start job: {e}")
+
+            if not claimed:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+        await self._drain()
+
+    async def _drain(self):
+        """Let running jobs finish; unfinished ones are reclaimed after their lease expires"""
+        deadline = time.time() + self.shutdown_grace_seconds
+        while self._active_job_ids() and time.time() < deadline:
+            await self._heartbeat()
+            await asyncio.sleep(min(self.lease_seconds / 3, 5))
+
+        for job_id in self._active_job_ids():
+            # Don't publish a cancellation for jobs another worker will pick up
+            self.job_manager.unregister_progress_callback(job_id, self._publishers.get(job_id))
+            logger.warning(f"Leaving job {job_id} for another worker")
+        await self.job_manager.close()
+        logger.info(f"Worker {self.worker_id} stopped")
+
+    def stop(self):
+        self._stopping.set()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Run journey workflows from the job queue")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("WORKER_CONCURRENCY", "2")))
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    args = parser.parse_args()
+
+    worker = WorkflowWorker(
+        create_job_queue(),
+        concurrency=args.concurrency,
+        poll_interval=args.poll_interval,
+        lease_seconds=float(os.getenv("WORKER_LEASE_SECONDS", "60")),
+        shutdown_grace_seconds=float(os.getenv("WORKER_SHUTDOWN_GRACE_SECONDS", "600"))
+    )
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, worker.stop)
+        except NotImplementedError:
+            pass
+
+    await worker.run()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
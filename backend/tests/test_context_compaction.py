@@ -0,0 +1,65 @@
+"""
+Tests for token-budgeted context compaction between agent steps.
+"""
+import json
+
+import pytest
+
+from src.agents import context_compaction
+from src.agents.context_compaction import ContextCompactor, allocate_budget, compact_text, count_tokens
+
+
+@pytest.fixture(autouse=True)
+def estimated_token_counts(monkeypatch):
+    # Keep tests offline: tiktoken downloads its encoding on first use
+    monkeypatch.setattr(context_compaction, "_encoder", None)
+    monkeypatch.setattr(context_compaction, "_encoder_failed", True)
+
+
+@pytest.mark.unit
+def test_compact_text_drops_markdown_filler_and_duplicates():
+    text = "Certainly! Here is the analysis.\n\n## **Goals**\n- Grow revenue 20%\n- Grow revenue 20%\n---\nI hope this helps!"
+
+    assert compact_text(text) == "Goals\n- Grow revenue 20%"
+
+
+@pytest.mark.unit
+def test_budget_goes_to_large_inputs_first():
+    assert allocate_budget({"small": 10, "large": 500}, 100) == {"small": 10, "large": 90}
+
+
+@pytest.mark.unit
+def test_step_inputs_are_trimmed_to_budget():
+    """Oversized inputs are trimmed extractively while small ones stay whole."""
+    research = "\n".join(f"- Finding {i}: customers mention checkout friction" for i in range(200))
+    inputs = {"context_analysis": "Industry: fintech", "research_content": research}
+
+    compacted = ContextCompactor(step_budget=200).compact_inputs("Quote Generation", inputs)
+
+    assert compacted["context_analysis"] == "Industry: fintech"
+    assert sum(count_tokens(text) for text in compacted.values()) <= 200
+    assert compacted["research_content"].startswith("- Finding 0:")
+    assert compacted["research_content"].endswith("[...trimmed]")
+
+
+@pytest.mark.unit
+def test_zero_budget_disables_compaction():
+    inputs = {"personas": "**Persona**"}
+
+    assert ContextCompactor(step_budget=0).compact_inputs("Journey Mapping", inputs) is inputs
+
+
+@pytest.mark.unit
+def test_compact_text_keeps_json_output_valid():
+    """Persona and phase JSON is minified, not deduplicated line by line."""
+    personas = [
+        {"name": "A", "goals": ["x", "y"], "painPoints": ["p"]},
+        {"name": "B", "goals": ["z"], "painPoints": ["q"]}
+    ]
+    text = "Here are the personas:\n```json\n" + json.dumps(personas, indent=2) + "\n```\n**Notes**\n- Notes\n- B is new"
+
+    lines = compact_text(text).splitlines()
+
+    assert lines[0] == "Here are the personas:"
+    assert json.loads(lines[1]) == personas
+    assert lines[2:] == ["Notes", "- Notes", "- B is new"]
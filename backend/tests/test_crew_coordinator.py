@@ -0,0 +1,204 @@
+"""
+Tests for CrewCoordinator step execution.
+"""
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src.agents import crew_coordinator as crew_coordinator_module
+from src.agents.crew_coordinator import CrewCoordinator, StepFailedError, StepRetryPolicy, WORKFLOW_STEPS
+from src.services.token_ledger import TokenBudgetExceeded, TokenLedger
+
+
+def make_coordinator(policy: StepRetryPolicy) -> CrewCoordinator:
+    coordinator = CrewCoordinator.__new__(CrewCoordinator)
+    coordinator.retry_policy = policy
+    coordinator.response_cache = None
+    coordinator.model, coordinator.temperature = "gpt-4o", 0.7
+    coordinator.ledger = TokenLedger(model="gpt-4o")
+    coordinator.stream_interval, coordinator.stream_max_chars = 0, 1500
+    return coordinator
+
+
+def fake_crew_class(kickoffs):
+    """Crew stand-in whose successive kickoff() calls run the given functions"""
+    class FakeCrew:
+        def __init__(self, agents, tasks, verbose, stream=False):
+            pass
+
+        def kickoff(self):
+            return kickoffs.pop(0)()
+
+    return FakeCrew
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_checkpointed_step_is_not_rerun():
+    """A step with a stored checkpoint returns it without building a crew."""
+    coordinator = CrewCoordinator.__new__(CrewCoordinator)
+    messages = []
+    saved = []
+
+    async def progress_callback(step, step_name, message):
+        messages.append((step, message))
+
+    async def checkpoint_callback(key, output):
+        saved.append(key)
+
+    def task_factory():
+        raise AssertionError("checkpointed step should not create a task")
+
+    outputs = {"context_analysis": "stored analysis"}
+    result = await coordinator._run_step(WORKFLOW_STEPS[0], None, task_factory, outputs,
+                                         progress_callback, checkpoint_callback)
+
+    assert result == "stored analysis"
+    assert messages == [(1, "Context Analysis restored from checkpoint")]
+    assert saved == []
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_step_retries_after_timeout(monkeypatch):
+    """A hung attempt is abandoned at the step deadline and retried."""
+    monkeypatch.setattr(crew_coordinator_module, "Crew", fake_crew_class([
+        lambda: time.sleep(0.5),
+        lambda: "persona output"
+    ]))
+    coordinator = make_coordinator(StepRetryPolicy(timeout_seconds=0.05, max_attempts=2, base_delay_seconds=0))
+    details = []
+
+    async def progress_callback(step, step_name, message, detail=None):
+        if detail:
+            details.append(detail)
+
+    outputs = {}
+    result = await coordinator._run_step(WORKFLOW_STEPS[1], SimpleNamespace(agent=None), lambda: None,
+                                         outputs, progress_callback)
+
+    assert result == "persona output"
+    assert outputs["personas"] == "persona output"
+    assert [d["event"] for d in details] == ["step_retry", "step_completed"]
+    assert details[1]["attempts"] == 2
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_non_retryable_error_fails_step(monkeypatch):
+    """Errors that retrying cannot fix fail the step on the first attempt."""
+    def bad_request():
+        raise ValueError("invalid prompt")
+
+    kickoffs = [bad_request, lambda: "unused"]
+    monkeypatch.setattr(crew_coordinator_module, "Crew", fake_crew_class(kickoffs))
+    coordinator = make_coordinator(StepRetryPolicy(max_attempts=3, base_delay_seconds=0))
+
+    with pytest.raises(StepFailedError, match="Persona Creation failed: invalid prompt") as failure:
+        await coordinator._run_step(WORKFLOW_STEPS[1], SimpleNamespace(agent=None), lambda: None, {})
+    assert isinstance(failure.value.__cause__, ValueError)
+    assert len(kickoffs) == 1
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_progress_never_moves_backwards():
+    """Plain messages from an earlier concurrent step are not reported."""
+    reported = []
+
+    async def progress_callback(step, step_name, message, details=None):
+        reported.append((step, message))
+
+    callback = CrewCoordinator._ordered_progress(progress_callback)
+    await callback(4, "Research Integration", "reading")
+    await callback(1, "Context Analysis", "behind")
+    await callback(1, "Context Analysis", "retrying", {"event": "step_retry"})
+    await callback(5, "Quote Generation", "ahead")
+
+    assert reported == [(4, "reading"), (1, "retrying"), (5, "ahead")]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_cached_step_skips_kickoff(monkeypatch, tmp_path):
+    """An identical prompt is answered from the response cache on the next run."""
+    from src.services.llm_cache import LLMResponseCache
+
+    kickoffs = [lambda: "fresh output"]
+    monkeypatch.setattr(crew_coordinator_module, "Crew", fake_crew_class(kickoffs))
+    coordinator = make_coordinator(StepRetryPolicy())
+    coordinator.response_cache = LLMResponseCache(path=str(tmp_path / "cache.db"))
+    coordinator.model, coordinator.temperature = "gpt-4o", 0.0
+    agent = SimpleNamespace(agent=SimpleNamespace(role="Persona Developer"))
+
+    def task_factory():
+        return SimpleNamespace(description="Create personas for fintech", expected_output="Personas")
+
+    first = await coordinator._run_step(WORKFLOW_STEPS[1], agent, task_factory, {})
+    second = await coordinator._run_step(WORKFLOW_STEPS[1], agent, task_factory, {})
+
+    assert first == second == "fresh output"
+    assert kickoffs == []
+    stats = coordinator.response_cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_step_usage_is_recorded_and_budget_enforced(monkeypatch):
+    """Kickoff token usage lands in the ledger; a step over budget never starts."""
+    usage = SimpleNamespace(prompt_tokens=900, completion_tokens=300, total_tokens=1200, successful_requests=2)
+    kickoffs = [lambda: SimpleNamespace(token_usage=usage)]
+    monkeypatch.setattr(crew_coordinator_module, "Crew", fake_crew_class(kickoffs))
+    coordinator = make_coordinator(StepRetryPolicy())
+    coordinator.ledger = TokenLedger(model="gpt-4o", budget=1500, completion_estimate=200)
+    agent = SimpleNamespace(agent=SimpleNamespace(role="Analyst"))
+
+    await coordinator._run_step(WORKFLOW_STEPS[0], agent, lambda: "analyze " * 50, {})
+
+    summary = coordinator.ledger.summary()
+    assert summary["steps"]["context_analysis"]["total_tokens"] == 1200
+    assert summary["totals"]["requests"] == 2
+    assert summary["totals"]["cost_usd"] > 0
+
+    with pytest.raises(TokenBudgetExceeded):
+        await coordinator._run_step(WORKFLOW_STEPS[1], agent, lambda: "personas " * 500, {})
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_streamed_output_is_reported_while_step_runs(monkeypatch):
+    """Partial output reaches progress during the kickoff, throttled to the stream interval."""
+    class StreamingCrew:
+        def __init__(self, agents, tasks, verbose, stream=False):
+            assert stream
+
+        def kickoff(self):
+            def chunks():
+                for word in ("Persona ", "one: ", "Maya"):
+                    time.sleep(0.05)
+                    yield SimpleNamespace(content=word)
+
+            class Streaming:
+                result = "Persona one: Maya"
+
+                def __iter__(self):
+                    return chunks()
+
+            return Streaming()
+
+    monkeypatch.setattr(crew_coordinator_module, "Crew", StreamingCrew)
+    coordinator = make_coordinator(StepRetryPolicy())
+    coordinator.stream_interval = 0.02
+    partial = []
+
+    async def progress_callback(step, step_name, message, details=None):
+        if details and details["event"] == "step_output":
+            partial.append(details["partial_output"])
+
+    result = await coordinator._run_step(WORKFLOW_STEPS[1], SimpleNamespace(agent=None), lambda: None, {}, progress_callback)
+
+    assert result == "Persona one: Maya"
+    assert partial and partial[0].startswith("Persona")
+    assert partial == sorted(set(partial), key=len)  # Only new text is published
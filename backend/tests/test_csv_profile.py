@@ -0,0 +1,51 @@
+"""
+Tests for chunked CSV profiling of research uploads.
+"""
+import csv
+
+import pytest
+
+from src.services.csv_profile import profile_csv
+from src.services.file_extraction import extract_file_content
+
+
+def write_survey(path, rows: int):
+    plans = ["Free", "Free", "Starter", "Pro"]
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["age", "plan", "signup_date", "feedback", "notes"])
+        for i in range(rows):
+            writer.writerow([20 + i % 50, plans[i % 4], f"2024-{i % 12 + 1:02d}-15",
+                             f"Respondent {i} says the onboarding checklist was confusing and slow", ""])
+
+
+@pytest.mark.unit
+def test_csv_is_profiled_across_chunks(tmp_path):
+    """Types, distributions and sampled answers cover every chunk, not just the first rows."""
+    write_survey(tmp_path / "survey.csv", rows=2500)
+
+    profile = profile_csv(str(tmp_path / "survey.csv"), chunk_rows=400)
+
+    assert profile.startswith("CSV PROFILE: 2,500 rows, 5 columns")
+    assert 'Column "age": numeric, 2,500 values' in profile
+    assert "min 20," in profile and "max 69," in profile
+    assert 'Column "plan": categorical, 2,500 values, 3 distinct' in profile
+    assert "Free (50%)" in profile
+    assert 'Column "signup_date": date, 2,500 values, from 2024-01-15 to 2024-12-15' in profile
+    assert 'Column "feedback": free text' in profile
+    assert profile.count('  - "Respondent') == 5
+    assert 'Column "notes": empty' in profile
+    # Same file, same profile, so cached LLM responses stay valid
+    assert profile_csv(str(tmp_path / "survey.csv"), chunk_rows=400) == profile
+
+
+@pytest.mark.unit
+def test_csv_extraction_sends_profile_instead_of_raw_rows(tmp_path):
+    """The research step gets the compact profile, with raw rows as a fallback."""
+    write_survey(tmp_path / "survey.csv", rows=1000)
+    content = extract_file_content(str(tmp_path / "survey.csv"))
+    assert content.startswith("CSV PROFILE")
+    assert len(content) < 2000
+
+    (tmp_path / "empty.csv").write_text("")
+    assert extract_file_content(str(tmp_path / "empty.csv")) == ""
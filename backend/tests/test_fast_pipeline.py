@@ -0,0 +1,67 @@
+"""
+Tests for the fast journey pipeline.
+"""
+import pytest
+
+from src.agents.crew_coordinator import StepRetryPolicy
+from src.agents.fast_pipeline import JourneyDraft, JourneyProfile, PhaseDraft, PersonaDraft, resolve_pipeline
+from src.models.journey import JourneyMap
+from src.services.job_manager import JobManager
+from tests.test_crew_coordinator import make_coordinator
+
+
+class FakeStructuredLLM:
+    def __init__(self):
+        self.calls = []
+
+    def call(self, messages, response_model=None):
+        self.calls.append(response_model)
+        if response_model is JourneyProfile:
+            return JourneyProfile(context_summary="Banking app onboarding", key_findings=["KYC drop-off"], personas=[
+                PersonaDraft(name="Maya", age="28", occupation="Designer", goals=["Open an account fast"],
+                             pain_points=["Document upload fails"], motivations=["Convenience"], quote="Why so many steps?")
+            ])
+        return JourneyDraft(phases=[
+            PhaseDraft(name=name, actions=["Compare apps"], touchpoints=["App store"], emotions="curious",
+                       pain_points=["Unclear fees"], opportunities=["Fee calculator"], customer_quote="What does it cost?")
+            for name in ("Awareness", "Purchase")
+        ], recommendations=["Shorten KYC"]).model_dump_json()
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_fast_pipeline_builds_journey_map_in_two_calls():
+    """Without research files the fast pipeline makes two structured calls and returns a valid JourneyMap."""
+    coordinator = make_coordinator(StepRetryPolicy())
+    coordinator.llm = FakeStructuredLLM()
+    saved = []
+
+    async def checkpoint_callback(key, output):
+        saved.append(key)
+
+    form_data = {"industry": "Fintech", "business_goals": "Grow signups", "target_personas": ["Young professionals"],
+                 "journey_phases": ["Awareness", "Purchase"]}
+    result = await coordinator.execute_fast_workflow(form_data, checkpoint_callback=checkpoint_callback)
+
+    assert coordinator.llm.calls == [JourneyProfile, JourneyDraft]
+    assert saved == ["fast_profile", "fast_journey"]
+    journey_map = JobManager._convert_to_journey_map(result)
+    assert isinstance(journey_map, JourneyMap)
+    assert [phase.name for phase in journey_map.phases] == ["Awareness", "Purchase"]
+    assert journey_map.personas[0].pain_points == ["Document upload fails"]
+    assert journey_map.recommendations == ["Shorten KYC"]
+
+
+@pytest.mark.unit
+def test_pipeline_defaults_per_plan(monkeypatch):
+    """The plan's default applies; any plan may opt down to fast but not up to full."""
+    monkeypatch.delenv("PLAN_PIPELINE_MODES", raising=False)
+    assert resolve_pipeline(None, "free") == "fast"
+    assert resolve_pipeline(None, "pro") == "full"
+    assert resolve_pipeline("fast", "pro") == "fast"
+    assert resolve_pipeline("full", "pro") == "full"
+    assert resolve_pipeline("full", "free") == "fast"
+
+    monkeypatch.setenv("PLAN_PIPELINE_MODES", "free=full,starter=fast")
+    assert resolve_pipeline(None, "free") == "full"
+    assert resolve_pipeline("bogus", "starter") == "fast"
@@ -0,0 +1,396 @@
+"""
+Tests for JobManager scheduling and job lifecycle.
+"""
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from src.models.journey import JobStatus
+from src.services.job_manager import JobManager
+
+
+@pytest.fixture
+def job_manager(event_loop):
+    manager = JobManager(max_concurrent_workflows=1)
+    yield manager
+    event_loop.run_until_complete(manager.close())
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_jobs_wait_for_free_slot(job_manager, make_user, make_form_data):
+    """Jobs beyond the slot limit stay queued in FIFO order."""
+    release = asyncio.Event()
+    started = []
+
+    async def fake_workflow(job_id, user):
+        started.append(job_id)
+        job_manager.jobs[job_id].status = JobStatus.PROCESSING
+        await release.wait()
+        job_manager.jobs[job_id].status = JobStatus.COMPLETED
+
+    job_manager._run_agent_workflow = fake_workflow
+
+    first = await job_manager.create_job(make_form_data(), make_user("user-a"))
+    second = await job_manager.create_job(make_form_data(), make_user("user-b"))
+    await asyncio.sleep(0)
+
+    assert started == [first.id]
+    assert second.status == JobStatus.QUEUED
+    queue_info = job_manager.get_queue_position(second.id)
+    assert queue_info["position"] == 1
+    assert queue_info["active_workflows"] == 1
+
+    release.set()
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+    assert started == [first.id, second.id]
+    assert job_manager.get_queue_position(second.id) is None
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_cancel_removes_queued_job(job_manager, make_user, make_form_data):
+    """Cancelling a queued job takes it out of the admission queue."""
+    release = asyncio.Event()
+
+    async def fake_workflow(job_id, user):
+        job_manager.jobs[job_id].status = JobStatus.PROCESSING
+        await release.wait()
+
+    job_manager._run_agent_workflow = fake_workflow
+
+    await job_manager.create_job(make_form_data(), make_user("user-a"))
+    queued = await job_manager.create_job(make_form_data(), make_user("user-b"))
+    await asyncio.sleep(0)
+
+    assert await job_manager.cancel_job(queued.id, "user-b")
+    assert queued.status == JobStatus.CANCELLED
+    assert job_manager.get_queue_position(queued.id) is None
+
+    release.set()
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_active_job_index_tracks_status(job_manager, make_user, make_form_data):
+    """The per-user index blocks a second journey and clears on completion."""
+    release = asyncio.Event()
+
+    async def fake_workflow(job_id, user):
+        job = job_manager.jobs[job_id]
+        job_manager._set_job_status(job, JobStatus.PROCESSING)
+        await release.wait()
+        job_manager._set_job_status(job, JobStatus.COMPLETED)
+
+    job_manager._run_agent_workflow = fake_workflow
+    user = make_user("user-a")
+
+    job = await job_manager.create_job(make_form_data(), user)
+    assert job_manager._active_jobs_by_user == {"user-a": {job.id}}
+    assert await job_manager._check_user_running_journey("user-a") is job
+
+    release.set()
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+    assert "user-a" not in job_manager._active_jobs_by_user
+    assert await job_manager._check_user_running_journey("user-a") is None
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_finished_jobs_evicted_and_reloaded(monkeypatch, job_manager, make_user, make_form_data):
+    """Finished jobs beyond the cache size are evicted and reload on access."""
+    job_manager.finished_job_cache_size = 1
+    user = make_user("user-a")
+
+    async def fake_workflow(job_id, user):
+        job_manager._set_job_status(job_manager.jobs[job_id], JobStatus.COMPLETED)
+
+    job_manager._run_agent_workflow = fake_workflow
+
+    first = await job_manager.create_job(make_form_data(), user)
+    for _ in range(3):
+        await asyncio.sleep(0)
+    second = await job_manager.create_job(make_form_data(), user)
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+    assert first.id not in job_manager.jobs
+    assert second.id in job_manager.jobs
+    assert job_manager.get_cache_stats()["evictions"] == 1
+
+    async def fake_load(job_id):
+        return first if job_id == first.id else None
+
+    monkeypatch.setattr(job_manager, "load_job_state", fake_load)
+    reloaded = await job_manager.get_job_async(first.id, "user-a")
+
+    assert reloaded is first
+    stats = job_manager.get_cache_stats()
+    assert stats["reloads"] == 1
+    assert stats["misses"] == 1
+    assert stats["finished_jobs_cached"] == 1
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_wait_for_progress_wakes_on_update(job_manager, make_user, make_form_data):
+    """Long-poll waiters return as soon as the progress version moves."""
+    release = asyncio.Event()
+
+    async def fake_workflow(job_id, user):
+        job_manager._set_job_status(job_manager.jobs[job_id], JobStatus.PROCESSING)
+        await release.wait()
+
+    job_manager._run_agent_workflow = fake_workflow
+    job = await job_manager.create_job(make_form_data(), make_user("user-a"))
+    await asyncio.sleep(0)
+    version = job.progress_version
+
+    timed_out = await job_manager.wait_for_progress(job.id, version, timeout=0.01)
+    assert timed_out.progress_version == version
+
+    waiter = asyncio.create_task(job_manager.wait_for_progress(job.id, version, timeout=5))
+    await asyncio.sleep(0)
+    await job_manager._update_progress(job.id, 1, "Context Analysis", "Working...")
+    updated = await asyncio.wait_for(waiter, timeout=1)
+
+    assert updated.progress_version == version + 1
+    release.set()
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_recovery_requeues_in_progress_journeys(monkeypatch, job_manager, make_user, make_form_data):
+    """Journeys interrupted by a restart are re-queued instead of failed."""
+    from src.models.auth import UserJourney
+    from src.models.journey import Job, JourneyFormData
+    from src.services import job_manager as job_manager_module
+
+    user = make_user("user-recover")
+    journey = UserJourney(id="row-1", user_id=user.id, title="Test Journey", status="processing",
+                          created_at=datetime.now(), job_id="job-recover")
+    resumed = []
+
+    async def fake_in_progress():
+        return [journey]
+
+    async def fake_load(job_id):
+        return Job(id=job_id, status=JobStatus.PROCESSING, user_id=user.id,
+                   form_data=JourneyFormData(**make_form_data()))
+
+    async def fake_profile(user_id):
+        return user
+
+    async def fake_workflow(job_id, run_user):
+        resumed.append((job_id, run_user.id))
+
+    monkeypatch.setattr(job_manager_module.usage_service, "get_in_progress_journeys", fake_in_progress)
+    monkeypatch.setattr(job_manager_module.auth_service, "get_user_profile", fake_profile)
+    job_manager.load_job_state = fake_load
+    job_manager._run_agent_workflow = fake_workflow
+
+    assert await job_manager.recover_in_progress_journeys() == 1
+    await asyncio.sleep(0.01)
+
+    assert resumed == [("job-recover", user.id)]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_shutdown_leaves_journey_processing_for_recovery(monkeypatch, make_user, make_form_data):
+    """A workflow interrupted by close() is not cancelled and resumes from its checkpoints."""
+    from src.models.auth import UserJourney
+    from src.models.journey import Job, JourneyFormData
+    from src.services import job_manager as job_manager_module
+
+    user = make_user("user-shutdown")
+    saved_checkpoints = {}
+    status_writes = []
+    runs = []
+    step_saved = asyncio.Event()
+
+    class FakeLedger:
+        def restore(self, usage):
+            pass
+
+        def summary(self):
+            return {}
+
+    class FakeCoordinator:
+        def __init__(self, run_user, deterministic=False):
+            self.ledger = FakeLedger()
+
+        async def execute_workflow(self, form_data, progress_callback, job_id, checkpoints=None, checkpoint_callback=None):
+            runs.append(dict(checkpoints))
+            if "personas" not in checkpoints:
+                await checkpoint_callback("personas", "[]")
+                step_saved.set()
+                await asyncio.Event().wait()  # Interrupted here by the shutdown
+            return {"title": "Test Journey", "personas": [], "phases": []}
+
+        execute_fast_workflow = execute_workflow
+
+        def close(self):
+            pass
+
+    async def fake_get_checkpoints(job_id):
+        return dict(saved_checkpoints)
+
+    async def fake_save_checkpoints(job_id, checkpoints):
+        saved_checkpoints.update(checkpoints)
+        return True
+
+    async def fake_status(journey_id, status, progress_data=None):
+        status_writes.append(status)
+
+    async def fake_completion(journey_id, status, result_data=None):
+        status_writes.append(status)
+
+    async def fake_creation(**kwargs):
+        return None
+
+    monkeypatch.setattr(job_manager_module, "CrewCoordinator", FakeCoordinator)
+    monkeypatch.setattr(job_manager_module.usage_service, "get_journey_checkpoints", fake_get_checkpoints)
+    monkeypatch.setattr(job_manager_module.usage_service, "save_journey_checkpoints", fake_save_checkpoints)
+    monkeypatch.setattr(job_manager_module.usage_service, "update_journey_status", fake_status)
+    monkeypatch.setattr(job_manager_module.usage_service, "update_journey_completion", fake_completion)
+    monkeypatch.setattr(job_manager_module.usage_service, "record_journey_creation", fake_creation)
+
+    first = JobManager(max_concurrent_workflows=1)
+    try:
+        job = await first.create_job(make_form_data(), user)
+        await asyncio.wait_for(step_saved.wait(), timeout=1)
+    finally:
+        await first.close()
+
+    assert first.jobs[job.id].status == JobStatus.PROCESSING
+    assert "cancelled" not in status_writes
+
+    # The next start finds the journey still "processing" and resumes it
+    journey = UserJourney(id="row-1", user_id=user.id, title="Test Journey", status="processing",
+                          created_at=datetime.now(), job_id=job.id)
+
+    async def fake_in_progress():
+        return [journey]
+
+    async def fake_load(job_id):
+        return Job(id=job_id, status=JobStatus.PROCESSING, user_id=user.id,
+                   form_data=JourneyFormData(**make_form_data()))
+
+    async def fake_profile(user_id):
+        return user
+
+    monkeypatch.setattr(job_manager_module.usage_service, "get_in_progress_journeys", fake_in_progress)
+    monkeypatch.setattr(job_manager_module.auth_service, "get_user_profile", fake_profile)
+
+    second = JobManager(max_concurrent_workflows=1)
+    second.load_job_state = fake_load
+    try:
+        assert await second.recover_in_progress_journeys() == 1
+        for _ in range(50):
+            if second.jobs[job.id].status == JobStatus.COMPLETED:
+                break
+            await asyncio.sleep(0.01)
+
+        assert second.jobs[job.id].status == JobStatus.COMPLETED
+        assert runs == [{}, {"personas": "[]"}]
+        assert status_writes[-1] == "completed"
+    finally:
+        await second.close()
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_rate_limited_step_throttles_api_key(monkeypatch, job_manager, make_user, make_form_data):
+    """A 429 that fails a step is still handled as a rate limit and throttles the user's key."""
+    import litellm
+    from src.agents.crew_coordinator import StepFailedError, WORKFLOW_STEPS
+    from src.services import job_manager as job_manager_module
+
+    throttled = []
+
+    class FakeLedger:
+        def restore(self, usage):
+            pass
+
+        def summary(self):
+            return {}
+
+    class FakeCoordinator:
+        def __init__(self, run_user, deterministic=False):
+            self.ledger = FakeLedger()
+
+        async def execute_workflow(self, form_data, progress_callback, job_id, checkpoints=None, checkpoint_callback=None):
+            error = litellm.RateLimitError(message="Rate limit reached", llm_provider="openai", model="gpt-4o")
+            raise StepFailedError(WORKFLOW_STEPS[1], str(error)) from error
+
+        execute_fast_workflow = execute_workflow
+
+        def close(self):
+            pass
+
+    async def fake_write(*args, **kwargs):
+        return None
+
+    async def fake_get_checkpoints(job_id):
+        return {}
+
+    monkeypatch.setattr(job_manager_module, "CrewCoordinator", FakeCoordinator)
+    monkeypatch.setattr(job_manager_module.usage_service, "get_journey_checkpoints", fake_get_checkpoints)
+    monkeypatch.setattr(job_manager_module.usage_service, "update_journey_status", fake_write)
+    monkeypatch.setattr(job_manager_module.usage_service, "record_journey_creation", fake_write)
+    monkeypatch.setattr(job_manager, "throttle_api_key", lambda user, seconds=None: throttled.append(user.id))
+
+    job = await job_manager.create_job(make_form_data(), make_user("user-limited"))
+    for _ in range(50):
+        if job_manager.jobs[job.id].status == JobStatus.FAILED:
+            break
+        await asyncio.sleep(0.01)
+
+    assert job_manager.jobs[job.id].status == JobStatus.FAILED
+    assert "quota" in job_manager.jobs[job.id].error_message
+    assert throttled == ["user-limited"]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_streamed_output_replaces_previous_partial_entry(job_manager, make_user, make_form_data):
+    """Partial output updates for a step occupy one progress history entry."""
+    release = asyncio.Event()
+
+    async def fake_workflow(job_id, user):
+        job_manager._set_job_status(job_manager.jobs[job_id], JobStatus.PROCESSING)
+        await release.wait()
+
+    job_manager._run_agent_workflow = fake_workflow
+    job = await job_manager.create_job(make_form_data(), make_user("user-a"))
+    await asyncio.sleep(0)
+
+    await job_manager._update_progress(job.id, 2, "Persona Creation", "Creating...")
+    for text in ("Persona", "Persona one"):
+        await job_manager._update_progress(job.id, 2, "Persona Creation", "Creating...",
+                                           {"event": "step_output", "partial_output": text})
+
+    history = job_manager.jobs[job.id].progress_history
+    assert [entry.get("details", {}).get("partial_output") for entry in history[-2:]] == [None, "Persona one"]
+    release.set()
+
+
+@pytest.mark.unit
+def test_token_usage_is_totalled_per_user(job_manager, make_user):
+    """Finished runs add up per plan/key and per user for /health/jobs."""
+    usage = {"totals": {"prompt_tokens": 100, "completion_tokens": 50, "total_tokens": 150, "cost_usd": 0.01}}
+    job_manager._record_token_usage(make_user("user-a"), usage)
+    job_manager._record_token_usage(make_user("user-a"), usage)
+    job_manager._record_token_usage(make_user("user-b"), usage)
+
+    stats = job_manager.get_token_usage_stats()
+    assert stats["by_plan_key"]["free/platform"]["runs"] == 3
+    assert stats["by_user"]["user-a"]["total_tokens"] == 300
+    assert stats["by_user"]["user-b"] == {"runs": 1, "prompt_tokens": 100, "completion_tokens": 50,
+                                          "total_tokens": 150, "cost_usd": 0.01, "plan": "free"}
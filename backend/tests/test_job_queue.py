@@ -0,0 +1,147 @@
+"""
+Tests for the job queue and out-of-process workers.
+"""
+import asyncio
+
+import pytest
+
+from src.models.journey import JobStatus
+from src.services.job_manager import JobManager
+from src.services.job_queue import JobQueue, SQLiteJobQueue
+from src.worker import WorkflowWorker
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_claim_is_fifo_and_reclaims_expired_leases(tmp_path):
+    """Jobs are claimed oldest first; an expired lease makes a job claimable again."""
+    queue = SQLiteJobQueue(str(tmp_path / "queue.db"))
+    await queue.enqueue("job-1", "user-a", {"n": 1})
+    await queue.enqueue("job-2", "user-b", {"n": 2})
+
+    states = await queue.get_states(["job-1", "job-2"])
+    assert states["job-2"]["position"] == 2
+
+    first = await queue.claim("worker-a", lease_seconds=60)
+    assert first.job_id == "job-1"
+    second = await queue.claim("worker-a", lease_seconds=0)
+    assert second.job_id == "job-2"
+
+    reclaimed = await queue.claim("worker-b", lease_seconds=60)
+    assert reclaimed.job_id == "job-2"
+    assert reclaimed.attempts == 2
+    assert await queue.claim("worker-b", lease_seconds=60) is None
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_claim_prunes_old_finished_jobs(tmp_path):
+    """Finished jobs past the retention period are deleted; running and recent ones stay."""
+    queue = SQLiteJobQueue(str(tmp_path / "queue.db"), retention_seconds=60)
+    queue.PRUNE_INTERVAL_SECONDS = 0  # Prune on every claim
+    for job_id in ("old-done", "recent-done", "running"):
+        await queue.enqueue(job_id, "user-a", {})
+    for _ in range(3):
+        await queue.claim("worker-1", lease_seconds=30)
+    await queue.publish_progress("old-done", {"status": "completed"})
+    await queue.publish_progress("recent-done", {"status": "failed"})
+
+    conn = queue._connect()
+    try:
+        conn.execute("UPDATE job_queue SET updated_at = updated_at - 3600 WHERE job_id IN ('old-done', 'running')")
+    finally:
+        conn.close()
+
+    assert await queue.claim("worker-1", lease_seconds=30) is None
+    assert set(await queue.get_states(["old-done", "recent-done", "running"])) == {"recent-done", "running"}
+    assert (await queue.get_stats())["pruned"] == 1
+
+
+@pytest.mark.unit
+def test_job_queue_is_abstract():
+    """Backends must implement the whole queue interface."""
+    with pytest.raises(TypeError):
+        JobQueue()
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_cancel_queued_and_running_jobs(tmp_path):
+    """Queued jobs cancel outright; running jobs are flagged for their worker."""
+    queue = SQLiteJobQueue(str(tmp_path / "queue.db"))
+    await queue.enqueue("job-1", "user-a", {})
+    await queue.enqueue("job-2", "user-b", {})
+    await queue.claim("worker-a", lease_seconds=60)
+
+    assert await queue.request_cancel("job-2")
+    assert await queue.request_cancel("job-1")
+    assert await queue.get_cancel_requests(["job-1", "job-2"]) == ["job-1"]
+    assert (await queue.get_states(["job-2"]))["job-2"]["status"] == "cancelled"
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+async def test_worker_runs_job_enqueued_by_api(tmp_path, make_user, make_form_data):
+    """The API node only enqueues; a worker runs the job and progress flows back."""
+    queue = SQLiteJobQueue(str(tmp_path / "queue.db"))
+    api = JobManager(execution_mode="queue", job_queue=queue)
+    api.remote_sync_interval = 0.05
+
+    worker = WorkflowWorker(queue, concurrency=1, poll_interval=0.05)
+
+    async def fake_workflow(job_id, user):
+        manager = worker.job_manager
+        job = manager.jobs[job_id]
+        manager._set_job_status(job, JobStatus.PROCESSING)
+        await manager._update_progress(job_id, 1, "Context Analysis", "Working...")
+        manager._set_job_status(job, JobStatus.COMPLETED)
+        await manager._update_progress(job_id, 8, "Completed", "Done")
+
+    worker.job_manager._run_agent_workflow = fake_workflow
+
+    job = await api.create_job(make_form_data(), make_user("user-a"))
+    assert api._worker_tasks == []
+
+    worker_task = asyncio.create_task(worker.run())
+    for _ in range(100):
+        if job.status == JobStatus.COMPLETED:
+            break
+        await asyncio.sleep(0.05)
+
+    assert job.status == JobStatus.COMPLETED
+    assert job.progress.step_name == "Completed"
+    assert "user-a" not in api._active_jobs_by_user
+
+    worker.stop()
+    await worker_task
+    await api.close()
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_reloaded_job_follows_worker_progress(tmp_path, monkeypatch, make_form_data):
+    """An API process that never enqueued a job still mirrors its progress once it loads it."""
+    from src.models.journey import Job, JourneyFormData
+
+    queue = SQLiteJobQueue(str(tmp_path / "queue.db"))
+    await queue.enqueue("job-1", "user-a", {})
+    api = JobManager(execution_mode="queue", job_queue=queue)
+    api.remote_sync_interval = 0.01
+
+    async def fake_load(job_id):
+        return Job(id=job_id, status=JobStatus.PROCESSING, user_id="user-a", form_data=JourneyFormData(**make_form_data()))
+
+    monkeypatch.setattr(api, "load_job_state", fake_load)
+    job = await api.get_job_async("job-1", "user-a")
+    await queue.publish_progress("job-1", {"status": "completed", "progress": {
+        "current_step": 8, "total_steps": 8, "step_name": "Completed", "message": "Done", "percentage": 100
+    }})
+
+    for _ in range(100):
+        if job.status == JobStatus.COMPLETED:
+            break
+        await asyncio.sleep(0.01)
+
+    assert job.status == JobStatus.COMPLETED
+    assert job.progress.step_name == "Completed"
+    await api.close()
@@ -0,0 +1,90 @@
+"""
+Tests for the plan-aware fair job scheduler.
+"""
+
+import pytest
+
+from src.services.job_scheduler import FairJobScheduler, PLATFORM_KEY_ID, effective_key_id
+
+
+def drain(scheduler: FairJobScheduler) -> list:
+    order = []
+    while True:
+        entry = scheduler.pop()
+        if entry is None:
+            return order
+        order.append(entry.job_id)
+        scheduler.finish(entry.job_id)
+
+
+@pytest.mark.unit
+def test_flooding_tenant_does_not_starve_others(make_user):
+    """A user with a backlog on the shared key is interleaved with other users."""
+    scheduler = FairJobScheduler(plan_weights={"free": 1.0})
+    flooder = make_user("flooder")
+    for index in range(4):
+        scheduler.push(f"flood-{index}", flooder)
+    scheduler.push("other-0", make_user("other"))
+
+    assert drain(scheduler)[:2] == ["flood-0", "other-0"]
+
+
+@pytest.mark.unit
+def test_higher_plans_get_larger_share(make_user):
+    """Plan weights give pro users proportionally more dispatches."""
+    scheduler = FairJobScheduler(plan_weights={"pro": 2.0, "free": 1.0})
+    pro, free = make_user("pro-user", "pro"), make_user("free-user")
+    for index in range(4):
+        scheduler.push(f"free-{index}", free)
+        scheduler.push(f"pro-{index}", pro)
+
+    first_six = drain(scheduler)[:6]
+    assert sum(job_id.startswith("pro") for job_id in first_six) == 4
+
+
+@pytest.mark.unit
+def test_throttled_platform_key_does_not_block_byok(make_user):
+    """BYOK jobs run while the shared key is cooling down from a rate limit."""
+    scheduler = FairJobScheduler()
+    scheduler.push("platform-job", make_user("free-user"))
+    byok_user = make_user("byok-user", "pro", api_key="sk-test")
+    scheduler.push("byok-job", byok_user)
+
+    scheduler.throttle_key(PLATFORM_KEY_ID, 60)
+
+    assert scheduler.pop().job_id == "byok-job"
+    assert scheduler.pop() is None
+    assert scheduler.next_eligible_in() > 0
+
+    stats = scheduler.get_stats()
+    assert stats["keys"][PLATFORM_KEY_ID]["throttled_for_seconds"] > 0
+    assert stats["classes"]["pro"]["dispatched"] == 1
+    assert "sk-test" not in effective_key_id(byok_user)
+
+
+@pytest.mark.unit
+def test_platform_key_concurrency_cap(make_user):
+    """The shared key never holds more slots than its cap."""
+    scheduler = FairJobScheduler(platform_key_max_concurrent=1)
+    scheduler.push("a", make_user("user-a"))
+    scheduler.push("b", make_user("user-b"))
+
+    assert scheduler.pop().job_id == "a"
+    assert scheduler.pop() is None
+    scheduler.finish("a")
+    assert scheduler.pop().job_id == "b"
+
+
+@pytest.mark.unit
+def test_removed_job_does_not_delay_its_flow(make_user):
+    """A cancelled pending job gives its share back to the rest of its flow."""
+    scheduler = FairJobScheduler(plan_weights={"free": 1.0})
+    user, other = make_user("user"), make_user("other")
+    scheduler.push("user-0", user)
+    scheduler.push("other-0", other)
+    scheduler.push("other-1", other)
+
+    assert scheduler.remove("user-0")
+    scheduler.push("user-1", user)
+
+    assert drain(scheduler) == ["other-0", "user-1", "other-1"]
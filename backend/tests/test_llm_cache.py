@@ -0,0 +1,34 @@
+"""
+Tests for the SQLite LLM response cache.
+"""
+import pytest
+
+from src.services.llm_cache import LLMResponseCache, make_cache_key
+
+
+@pytest.mark.unit
+def test_cache_key_covers_model_temperature_role_and_prompt():
+    base = make_cache_key("gpt-4o", 0.7, "Analyst", "prompt")
+
+    assert base == make_cache_key("gpt-4o", 0.7, "Analyst", "prompt")
+    assert base != make_cache_key("gpt-4o-mini", 0.7, "Analyst", "prompt")
+    assert base != make_cache_key("gpt-4o", 0.0, "Analyst", "prompt")
+    assert base != make_cache_key("gpt-4o", 0.7, "Writer", "prompt")
+    assert base != make_cache_key("gpt-4o", 0.7, "Analyst", "prompt 2")
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_least_recently_used_entries_are_evicted_by_size(tmp_path):
+    cache = LLMResponseCache(path=str(tmp_path / "cache.db"), max_bytes=25)
+
+    await cache.put("a", "gpt-4o", "role", "x" * 10)
+    await cache.put("b", "gpt-4o", "role", "y" * 10)
+    assert await cache.get("a") == "x" * 10  # a is now the most recently used
+    await cache.put("c", "gpt-4o", "role", "z" * 10)
+
+    assert await cache.get("b") is None
+    assert await cache.get("a") is not None
+    stats = cache.get_stats()
+    assert stats["evictions"] == 1
+    assert stats["size_bytes"] <= 25
@@ -0,0 +1,75 @@
+"""
+Tests for the pooled LLM clients.
+"""
+import time
+
+import pytest
+
+from src.services.llm_client_pool import LLMClientPool
+
+
+@pytest.mark.unit
+def test_leased_clients_are_reused_per_key_and_model():
+    """A released client is handed to the next job with the same key and model only."""
+    pool = LLMClientPool(idle_seconds=300, max_idle_per_key=2)
+
+    first = pool.acquire("sk-test-a", "gpt-4o", 0.7)
+    concurrent = pool.acquire("sk-test-a", "gpt-4o", 0.7)
+    assert concurrent is not first  # Leases are exclusive
+
+    pool.release(first)
+    assert pool.acquire("sk-test-a", "gpt-4o", 0.7) is first
+    assert pool.acquire("sk-test-b", "gpt-4o", 0.7) is not first
+
+    stats = pool.get_stats()
+    assert stats["created"] == 3
+    assert stats["reused"] == 1
+    assert stats["leased"] == 3
+    assert stats["keys"] == 2
+
+
+@pytest.mark.unit
+def test_idle_and_unreusable_clients_are_closed():
+    """Clients idle past the limit are evicted; clients released as unreusable are discarded."""
+    pool = LLMClientPool(idle_seconds=300)
+
+    stale = pool.acquire("sk-test-a", "gpt-4o", 0.7)
+    pool.release(stale)
+    pool._idle[next(iter(pool._idle))][0].last_used_at = time.monotonic() - 301
+    assert pool.acquire("sk-test-a", "gpt-4o", 0.7) is not stale
+    assert pool.get_stats()["evicted"] == 1
+
+    tainted = pool.acquire("sk-test-a", "gpt-4o", 0.0)
+    pool.release(tainted, reusable=False)
+    assert pool.acquire("sk-test-a", "gpt-4o", 0.0) is not tainted
+    assert pool.get_stats()["discarded"] == 1
+
+
+@pytest.mark.unit
+def test_chat_models_are_shared():
+    """LangChain chat models are shared per key and model."""
+    pool = LLMClientPool()
+    assert pool.get_chat_model("sk-test-a", "gpt-4o") is pool.get_chat_model("sk-test-a", "gpt-4o")
+    assert pool.get_chat_model("sk-test-a", "gpt-4o") is not pool.get_chat_model("sk-test-a", "gpt-4o-mini")
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_shared_chat_models_are_kept_while_referenced():
+    """A shared model is only evicted once released and idle, and shutdown closes its async client."""
+    pool = LLMClientPool(idle_seconds=300)
+    model = pool.get_chat_model("sk-test-a", "gpt-4o")
+    shared = pool._shared[next(iter(pool._shared))]
+
+    shared.last_used_at = time.monotonic() - 301
+    assert pool.get_stats()["shared"] == 1
+
+    pool.release_chat_model(model)
+    shared.last_used_at = time.monotonic() - 301
+    assert pool.get_stats()["shared"] == 0
+    assert pool.get_stats()["evicted"] == 1
+
+    other = pool.get_chat_model("sk-test-b", "gpt-4o")
+    await pool.close_all()
+    assert other.http_async_client.is_closed
+    assert model.http_async_client.is_closed
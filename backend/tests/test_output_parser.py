@@ -0,0 +1,113 @@
+"""
+Tests for journey output parsing and the QA short-circuit.
+"""
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from src.agents import crew_coordinator as crew_coordinator_module
+from src.agents.crew_coordinator import StepRetryPolicy
+from src.agents.output_parser import iter_json_values, parse_journey_output
+from tests.test_crew_coordinator import fake_crew_class, make_coordinator
+
+FORM_DATA = {"industry": "Fintech", "target_personas": ["Young professionals"], "journey_phases": ["Awareness", "Purchase"]}
+
+PERSONA = {"name": "Maya", "age": 28, "occupation": "Designer", "goals": ["Open an account fast"],
+           "pain_points": "Document upload fails", "quote": "Why so many steps?"}
+
+
+def phase(name):
+    return {"phase": name, "actions": ["Compare apps"], "touchpoints": ["App store"], "emotions": {"state": "curious"},
+            "painPoints": ["Unclear fees"], "opportunities": ["Fee calculator"], "customerQuote": "What does it cost?"}
+
+
+def formatting_output(phases):
+    return (
+        "## Executive summary\nOnboarding loses users at KYC [1].\n\n```json\n"
+        + json.dumps({"personas": [PERSONA], "phases": phases, "recommendations": ["Shorten KYC"]})[:-1]
+        + ",}\n```\nNext steps follow."
+    )
+
+
+@pytest.mark.unit
+def test_iter_json_values_skips_prose_and_repairs_trailing_commas():
+    """Embedded JSON is found between prose brackets; trailing commas do not stop it."""
+    values = list(iter_json_values('See [note] then {"a": [1, 2,],} and [3]'))
+    assert values == [{"a": [1, 2]}, [3]]
+
+
+@pytest.mark.unit
+def test_formatting_output_is_normalized_and_validated():
+    """Snake or camel case keys and loose types are mapped onto the journey models."""
+    parsed = parse_journey_output(formatting_output([phase("Awareness"), phase("Purchase")]), FORM_DATA)
+
+    assert parsed.valid, parsed.issues
+    assert parsed.personas[0]["painPoints"] == ["Document upload fails"]
+    assert parsed.personas[0]["age"] == "28"
+    assert [p["name"] for p in parsed.phases] == ["Awareness", "Purchase"]
+    assert parsed.phases[0]["emotions"] == "curious"
+    assert parsed.recommendations == ["Shorten KYC"]
+
+
+@pytest.mark.unit
+def test_validation_issues_are_specific():
+    """Missing fields and requested phases are reported one by one."""
+    broken = phase("Awareness")
+    del broken["touchpoints"]
+    parsed = parse_journey_output(formatting_output([broken]), FORM_DATA)
+
+    assert not parsed.valid
+    assert parsed.issues == ["phase 1 (Awareness): missing or invalid touchpoints",
+                             "requested phase 'Purchase' is missing"]
+
+
+def make_qa_coordinator(monkeypatch, kickoffs):
+    monkeypatch.setattr(crew_coordinator_module, "Crew", fake_crew_class(kickoffs))
+    coordinator = make_coordinator(StepRetryPolicy())
+    for name in ("context_agent", "persona_agent", "journey_agent", "research_agent", "quote_agent", "emotion_agent", "formatting_agent"):
+        setattr(coordinator, name, None)
+    tasks = []
+    coordinator.qa_agent = SimpleNamespace(
+        agent=SimpleNamespace(role="QA"),
+        create_task=lambda *args: tasks.append("rewrite") or "rewrite task",
+        create_repair_task=lambda form_data, journey_json, issues: tasks.append(("repair", issues)) or "repair task"
+    )
+    return coordinator, tasks
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_valid_formatting_output_skips_qa(monkeypatch):
+    """QA makes no LLM call when the formatting output validates."""
+    kickoffs = []
+    coordinator, tasks = make_qa_coordinator(monkeypatch, kickoffs)
+    formatted = formatting_output([phase("Awareness"), phase("Purchase")])
+    outputs = {}
+    graph = coordinator._build_graph(outputs)
+
+    result = await graph.nodes["final_output"].run({"form_data": FORM_DATA, "formatted_output": formatted})
+
+    assert result == formatted
+    assert tasks == []
+    journey = coordinator._parse_final_output(result, FORM_DATA, formatted)
+    assert journey["personas"][0]["name"] == "Maya"
+    assert journey["recommendations"] == ["Shorten KYC"]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_invalid_formatting_output_gets_targeted_repair(monkeypatch):
+    """Validation issues are sent to QA as a repair request, and the repaired JSON is used."""
+    repaired = json.dumps({"personas": [PERSONA], "phases": [phase("Awareness"), phase("Purchase")]})
+    kickoffs = [lambda: repaired]
+    coordinator, tasks = make_qa_coordinator(monkeypatch, kickoffs)
+    formatted = formatting_output([phase("Awareness")])
+    graph = coordinator._build_graph({})
+
+    result = await graph.nodes["final_output"].run({"form_data": FORM_DATA, "formatted_output": formatted})
+
+    assert tasks == [("repair", ["requested phase 'Purchase' is missing"])]
+    journey = coordinator._parse_final_output(result, FORM_DATA, formatted)
+    assert [p["name"] for p in journey["phases"]] == ["Awareness", "Purchase"]
+    assert journey["recommendations"] == ["Shorten KYC"]  # Kept from the formatting output
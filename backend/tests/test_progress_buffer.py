@@ -0,0 +1,64 @@
+"""
+Tests for the write-behind progress buffer.
+"""
+import pytest
+
+from src.services.progress_buffer import ProgressWriteBuffer
+from src.services.usage_service import usage_service
+
+
+@pytest.fixture
+def buffer(event_loop):
+    write_buffer = ProgressWriteBuffer(flush_interval=3600)
+    yield write_buffer
+    event_loop.run_until_complete(write_buffer.close())
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_progress_updates_coalesce_into_one_batch(monkeypatch, buffer):
+    """Many ticks across jobs become one batched write with the latest state."""
+    batches = []
+
+    async def fake_batch(updates):
+        batches.append(dict(updates))
+        return len(updates)
+
+    monkeypatch.setattr(usage_service, "update_journey_progress_batch", fake_batch)
+
+    for step in range(5):
+        buffer.put("job-a", "processing", {"current_step": step})
+        buffer.put("job-b", "processing", {"current_step": step})
+
+    assert await buffer.flush() == 2
+    assert batches == [{
+        "job-a": {"status": "processing", "progress_data": {"current_step": 4}},
+        "job-b": {"status": "processing", "progress_data": {"current_step": 4}}
+    }]
+
+    stats = buffer.get_stats()
+    assert stats["updates_received"] == 10
+    assert stats["batches_flushed"] == 1
+    assert stats["round_trips_saved"] == 9
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_discard_and_failed_flush_requeue(monkeypatch, buffer):
+    """Discarded jobs are never written; failed batches are retried."""
+    calls = []
+
+    async def failing_batch(updates):
+        calls.append(dict(updates))
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(usage_service, "update_journey_progress_batch", failing_batch)
+
+    buffer.put("job-a", "processing", {"current_step": 1})
+    buffer.put("job-b", "processing", {"current_step": 1})
+    await buffer.discard("job-b")
+
+    assert await buffer.flush() == 0
+    assert list(calls[0]) == ["job-a"]
+    assert buffer.get_stats()["pending_jobs"] == 1
+    assert buffer.get_stats()["failed_flushes"] == 1
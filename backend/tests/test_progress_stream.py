@@ -0,0 +1,31 @@
+"""
+Tests for streaming progress subscriptions.
+"""
+import pytest
+
+from src.services.progress_stream import ProgressSubscription
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_slow_subscriber_drops_intermediate_but_keeps_terminal():
+    """A full buffer drops the oldest intermediate update, never the terminal one."""
+    subscription = ProgressSubscription("job-a", max_pending=2)
+
+    subscription.push({"status": "processing", "version": 1})
+    subscription.push({"status": "processing", "version": 2})
+    subscription.push({"status": "completed", "version": 3})
+    subscription.push({"status": "cancelled", "version": 4})
+
+    received = [await subscription.next(timeout=0.01) for _ in range(3)]
+
+    assert [m["version"] if m else None for m in received] == [3, 4, None]
+    assert subscription.dropped == 2
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_next_times_out_without_messages():
+    """next() returns None when nothing arrives so callers can heartbeat."""
+    subscription = ProgressSubscription("job-a")
+    assert await subscription.next(timeout=0.01) is None
@@ -0,0 +1,70 @@
+"""
+Tests for the per-key OpenAI rate limiter.
+"""
+import httpx
+import pytest
+
+from src.services.rate_limiter import OpenAIRateLimiter, estimate_request_tokens, parse_reset_duration
+
+
+@pytest.mark.unit
+def test_requests_over_the_limit_wait_in_arrival_order():
+    """Once a key's bucket is empty, each further request waits one refill interval longer than the last."""
+    limiter = OpenAIRateLimiter(requests_per_minute=2, tokens_per_minute=100000)
+
+    waits = [limiter.reserve("key-a", 10) for _ in range(4)]
+
+    assert waits[:2] == [0.0, 0.0]
+    assert waits[2] == pytest.approx(30, abs=0.5)
+    assert waits[3] == pytest.approx(60, abs=0.5)
+    assert limiter.reserve("key-b", 10) == 0.0  # Keys are limited independently
+
+
+@pytest.mark.unit
+def test_token_bucket_limits_large_prompts():
+    """Token usage limits a key even when it has requests to spare."""
+    limiter = OpenAIRateLimiter(requests_per_minute=1000, tokens_per_minute=6000)
+
+    assert limiter.reserve("key-a", 6000) == 0.0
+    assert limiter.reserve("key-a", 3000) == pytest.approx(30, abs=0.5)
+
+
+@pytest.mark.unit
+def test_headers_and_retry_after_update_limits():
+    """Rate limit headers replace the configured limits and a 429 pauses the key."""
+    limiter = OpenAIRateLimiter(requests_per_minute=500, tokens_per_minute=30000)
+    limiter.observe("key-a", 200, {
+        "x-ratelimit-limit-requests": "5000", "x-ratelimit-remaining-requests": "4999",
+        "x-ratelimit-limit-tokens": "800000", "x-ratelimit-remaining-tokens": "799000",
+        "x-ratelimit-reset-tokens": "75ms"
+    })
+    stats = limiter.get_stats()["keys"]["key-a"]
+    assert (stats["rpm_limit"], stats["tpm_limit"]) == (5000, 800000)
+
+    limiter.observe("key-a", 429, {"retry-after": "2"})
+    assert limiter.reserve("key-a", 10) == pytest.approx(2, abs=0.1)
+    assert limiter.get_stats()["keys"]["key-a"]["rate_limited"] == 1
+
+
+@pytest.mark.unit
+def test_event_hooks_route_http_requests_through_limiter():
+    """A client built with the limiter's hooks reserves capacity and reads the response headers."""
+    limiter = OpenAIRateLimiter(requests_per_minute=500, tokens_per_minute=30000)
+
+    def handler(request):
+        return httpx.Response(200, headers={"x-ratelimit-limit-tokens": "90000"}, json={})
+
+    with httpx.Client(transport=httpx.MockTransport(handler), event_hooks=limiter.event_hooks("key-a")) as client:
+        client.post("https://api.openai.com/v1/chat/completions", json={"messages": [{"role": "user", "content": "x" * 400}]})
+
+    stats = limiter.get_stats()["keys"]["key-a"]
+    assert stats["requests"] == 1
+    assert stats["tpm_limit"] == 90000
+
+
+@pytest.mark.unit
+def test_parsing_helpers():
+    assert parse_reset_duration("6m0s") == 360
+    assert parse_reset_duration("20ms") == pytest.approx(0.02)
+    assert parse_reset_duration("1.5") == 1.5
+    assert estimate_request_tokens(b'{"messages": [], "max_tokens": 100}') == 100
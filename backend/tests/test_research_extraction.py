@@ -0,0 +1,110 @@
+"""
+Tests for background extraction of research uploads.
+"""
+import asyncio
+
+import fitz
+import pytest
+
+from src.models.journey import JourneyFormData
+from src.services.file_extraction import extract_pdf_pages, extracted_text_path
+from src.services.research_extraction import ResearchExtractionService
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_uploads_are_extracted_in_process_pool(tmp_path):
+    """Text extracted at upload time is reused by later readers."""
+    upload = tmp_path / "interviews.txt"
+    upload.write_text("Customers struggle with onboarding")
+    service = ResearchExtractionService(max_workers=1)
+    try:
+        service.submit(str(upload))
+        contents = await service.get_contents([str(upload)])
+    finally:
+        service.shutdown()
+
+    assert contents == {str(upload): "Customers struggle with onboarding"}
+    assert (tmp_path / "interviews.txt.extracted.txt").exists()
+
+    # Another process (e.g. a worker) picks up the stored text without parsing again
+    other = ResearchExtractionService(max_workers=1)
+    assert await other.get_contents([str(upload)]) == contents
+    assert other.get_stats()["sidecar_hits"] == 1
+    assert extracted_text_path(str(upload)).endswith(".extracted.txt")
+
+
+@pytest.mark.unit
+def test_form_data_keeps_uploaded_files():
+    """Uploaded file paths survive the form model so the research step can see them."""
+    form_data = JourneyFormData(
+        industry="Technology",
+        businessGoals="Improve onboarding",
+        targetPersonas=["Developers"],
+        journeyPhases=["Awareness"],
+        uploaded_files=["/tmp/uploads/a.pdf"]
+    )
+
+    assert form_data.dict()["uploaded_files"] == ["/tmp/uploads/a.pdf"]
+
+
+def make_pdf(path, pages: int, lines_per_page: int = 10):
+    doc = fitz.open()
+    for number in range(1, pages + 1):
+        page = doc.new_page()
+        for line in range(lines_per_page):
+            page.insert_text((72, 72 + line * 15), f"Page {number} line {line}: customers wait too long for support")
+    doc.save(str(path))
+
+
+@pytest.mark.unit
+def test_pdf_pages_are_read_only_up_to_the_budget(tmp_path):
+    """A long PDF stops parsing once the character budget is filled."""
+    make_pdf(tmp_path / "report.pdf", pages=300)
+
+    result = extract_pdf_pages(str(tmp_path / "report.pdf"), char_budget=2000)
+
+    assert result["backend"] == "pymupdf"
+    assert result["page_count"] == 300
+    assert len(result["pages"]) < 5
+    assert result["pages"][0].startswith("Page 1 line 0")
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_pdf_page_ranges_are_spread_across_the_pool(tmp_path, monkeypatch):
+    """Page ranges read in parallel are joined in page order and stop at the budget."""
+    make_pdf(tmp_path / "report.pdf", pages=40)
+    page_chars = len(extract_pdf_pages(str(tmp_path / "report.pdf"), 0, 1)["pages"][0])
+    monkeypatch.setattr("src.services.research_extraction.CHAR_BUDGET", page_chars * 4 + 1)
+    service = ResearchExtractionService(max_workers=2, pages_per_task=2)
+    try:
+        service.submit(str(tmp_path / "report.pdf"))
+        contents = await service.get_contents([str(tmp_path / "report.pdf")])
+    finally:
+        service.shutdown()
+
+    text = contents[str(tmp_path / "report.pdf")]
+    assert [f"Page {n} line 0" in text for n in range(1, 7)] == [True] * 5 + [False]
+    assert text.index("Page 4 line 0") < text.index("Page 5 line 0")
+    assert service.get_stats()["pdf_pages_read"] == 5
+    assert (tmp_path / "report.pdf.extracted.txt").read_text() == text
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_concurrent_reads_share_one_extraction(tmp_path):
+    """Journeys reading the same upload at once wait on a single extraction."""
+    upload = tmp_path / "survey.txt"
+    upload.write_text("Support response times are too slow")
+    service = ResearchExtractionService(max_workers=1)
+    try:
+        first, second = await asyncio.gather(service.get_contents([str(upload)]), service.get_contents([str(upload)]))
+        assert service.submit(str(upload)) is None  # Extracted already; the sidecar is reused
+    finally:
+        service.shutdown()
+
+    assert first == second == {str(upload): "Support response times are too slow"}
+    stats = service.get_stats()
+    assert stats["submitted"] == 1
+    assert stats["in_flight"] == 0
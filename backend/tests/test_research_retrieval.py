@@ -0,0 +1,63 @@
+"""
+Tests for selecting relevant research passages within a token budget.
+"""
+import pytest
+
+from src.agents.context_compaction import count_tokens
+from src.agents.research_agent import ResearchAgent
+from src.agents.research_retrieval import ResearchIndex, research_query, split_passages
+
+FORM_DATA = {
+    "industry": "Fintech",
+    "business_goals": "Reduce drop-off during identity verification",
+    "target_personas": ["Freelancers"],
+    "journey_phases": ["Onboarding", "First deposit"],
+}
+BOILERPLATE = "This report was prepared by the research team. All rights reserved. Confidential draft. " * 12
+
+
+@pytest.mark.unit
+def test_passages_keep_lines_together():
+    text = "\n".join(f"Line {i} with a handful of words in it" for i in range(40))
+    passages = split_passages("notes.txt", text, passage_words=30)
+
+    assert all(len(passage.text.split()) <= 30 for passage in passages)
+    assert [passage.position for passage in passages] == list(range(len(passages)))
+    assert "\n".join(passage.text for passage in passages) == text
+
+
+@pytest.mark.unit
+def test_relevant_passages_are_selected_within_budget():
+    """Passages about the journey win over boilerplate and the budget holds across files."""
+    report = "\n".join([BOILERPLATE] * 10 + [
+        "Freelancers abandon onboarding at identity verification when the selfie check fails twice.",
+    ] + [BOILERPLATE] * 10)
+    survey = "\n".join([BOILERPLATE] * 5 + ["First deposit is delayed because freelancers wait for invoices to clear."])
+    index = ResearchIndex({"report.pdf": report, "survey.txt": survey})
+
+    passages = index.select(research_query(FORM_DATA), token_budget=300)
+
+    assert sum(passage.tokens for passage in passages) <= 300
+    assert any("selfie check" in passage.text for passage in passages)
+    assert any("invoices to clear" in passage.text for passage in passages)
+    assert len(passages) < len(index.passages)
+    # Document order is kept for the prompt
+    assert passages == sorted(passages, key=lambda passage: index.passages.index(passage))
+
+
+@pytest.mark.unit
+def test_research_prompt_uses_selected_passages():
+    """The research step gets only the budgeted passages, marking the gaps between them."""
+    agent = ResearchAgent.__new__(ResearchAgent)
+    report = "\n".join([BOILERPLATE] * 30 + ["Freelancers drop off at identity verification during onboarding."])
+    form_data = {**FORM_DATA, "uploaded_files": ["/legacy/uploads/report.txt"]}
+
+    content = agent.extract_research_content(form_data, {"/legacy/uploads/report.txt": report}, token_budget=250)
+
+    assert "File: report.txt (.txt)" in content
+    assert "identity verification during onboarding" in content
+    assert "[...]" in content
+    assert count_tokens(content) < 400
+
+    short = agent.extract_research_content(form_data, {"/legacy/uploads/report.txt": "Freelancers love instant payouts."})
+    assert "Freelancers love instant payouts." in short and "passages" not in short
@@ -0,0 +1,40 @@
+"""
+Tests for the per-journey token ledger.
+"""
+import pytest
+
+from src.services.token_ledger import TokenBudgetExceeded, TokenLedger, parse_plan_budgets
+
+
+@pytest.mark.unit
+def test_plan_budgets_override_defaults():
+    budgets = parse_plan_budgets("free=1000,pro=0,bad=x")
+
+    assert budgets["free"] == 1000
+    assert budgets["pro"] == 0
+    assert "bad" not in budgets
+
+
+@pytest.mark.unit
+def test_ledger_degrades_before_budget_and_restores():
+    ledger = TokenLedger(model="gpt-4o", budget=1000, degrade_ratio=0.5)
+    ledger.record("personas", {"prompt_tokens": 400, "completion_tokens": 200}, latency_seconds=1.5)
+
+    assert ledger.total_tokens == 600
+    assert ledger.degraded
+
+    resumed = TokenLedger(model="gpt-4o", budget=1000)
+    resumed.restore(ledger.summary())
+    assert resumed.summary()["totals"]["total_tokens"] == 600
+
+
+@pytest.mark.unit
+def test_budget_check_reserves_expected_completion():
+    """A step is refused when its prompt fits but its expected completion would not."""
+    ledger = TokenLedger(model="gpt-4o", budget=1000, completion_estimate=300)
+    ledger.check_budget("context", estimated_prompt_tokens=600)
+
+    ledger.record("context", {"prompt_tokens": 500, "completion_tokens": 200}, latency_seconds=1.0)
+    with pytest.raises(TokenBudgetExceeded):
+        ledger.check_budget("personas", estimated_prompt_tokens=150)  # 700 used + 150 + 200 expected
+    ledger.check_budget("personas", estimated_prompt_tokens=150, max_completion_tokens=100)
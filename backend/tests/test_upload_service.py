@@ -0,0 +1,142 @@
+"""
+Tests for streaming research uploads to disk.
+"""
+import hashlib
+import io
+
+import pytest
+from fastapi import HTTPException
+from starlette.datastructures import UploadFile
+
+from src.services.upload_service import DOCX_MIME, UploadService, sniff_mime
+from src.services.upload_store import UploadStore
+
+
+class CountingFile(io.BytesIO):
+    """In-memory upload that records the largest single read"""
+    largest_read = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.largest_read = max(self.largest_read, len(data))
+        return data
+
+
+def make_upload(content: bytes, filename: str, size=None) -> UploadFile:
+    return UploadFile(CountingFile(content), filename=filename, size=size)
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_upload_is_streamed_hashed_and_sniffed(tmp_path):
+    """Uploads are copied chunk by chunk with their digest and type taken on the way."""
+    content = b"%PDF-1.7\n" + b"x" * 10_000
+    upload = make_upload(content, "interviews.pdf")
+    service = UploadService(store=UploadStore(root=str(tmp_path), upload_dir=str(tmp_path)), chunk_bytes=1024)
+
+    stored = await service.save(upload)
+
+    assert open(stored.path, "rb").read() == content
+    assert stored.content_id == stored.sha256 == hashlib.sha256(content).hexdigest()
+    assert stored.mime_type == "application/pdf"
+    assert stored.size == len(content)
+    assert upload.file.largest_read <= 1024
+    assert not list(tmp_path.glob("*.part"))
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_oversized_uploads_are_rejected_without_leftovers(tmp_path):
+    """Per-file and per-request caps reject uploads and remove anything already written."""
+    service = UploadService(store=UploadStore(root=str(tmp_path), upload_dir=str(tmp_path)), max_file_bytes=4096, max_request_bytes=6000, chunk_bytes=1024)
+
+    # Size unknown up front: rejected mid-stream
+    with pytest.raises(HTTPException) as error:
+        await service.save(make_upload(b"a" * 5000, "big.txt"))
+    assert error.value.status_code == 413
+
+    # Size known from the multipart parser: rejected before reading
+    known = make_upload(b"a" * 5000, "big.txt", size=5000)
+    with pytest.raises(HTTPException):
+        await service.save(known)
+    assert known.file.tell() == 0
+
+    # Each file fits, together they do not
+    with pytest.raises(HTTPException) as error:
+        await service.save_all([make_upload(b"a" * 4000, "one.txt"), make_upload(b"b" * 4000, "two.txt")])
+    assert error.value.status_code == 413
+    assert not list(tmp_path.glob("*.part"))
+
+    assert service.exceeds_request_limit(str(10 * 1024 * 1024))
+    assert not service.exceeds_request_limit("5000")
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_upload_content_must_match_extension(tmp_path):
+    """A research file whose bytes do not match its extension is refused."""
+    service = UploadService(store=UploadStore(root=str(tmp_path), upload_dir=str(tmp_path)))
+    with pytest.raises(HTTPException) as error:
+        await service.save(make_upload(b"\x00\x01 not a pdf", "report.pdf"))
+    assert error.value.status_code == 415
+    assert list(tmp_path.iterdir()) == []
+
+    assert sniff_mime(b"PK\x03\x04rest", "notes.docx") == DOCX_MIME
+    assert sniff_mime(b"name,age\nAna,31\n", "people.csv") == "text/csv"
+
+
+def make_limited_app(service: UploadService):
+    """App with one upload route behind the upload limit middleware"""
+    from fastapi import FastAPI, Request
+    from src.middleware.upload_limit_middleware import UploadLimitMiddleware
+
+    app = FastAPI()
+    app.state.parsed = []
+
+    @app.post("/upload")
+    async def upload(request: Request):
+        try:
+            form = await request.form()
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        app.state.parsed.append(len(form))
+        return {"ok": True}
+
+    app.add_middleware(UploadLimitMiddleware, paths=("/upload",), service=service)
+    return app
+
+
+@pytest.mark.unit
+def test_chunked_uploads_over_the_cap_are_refused_while_streaming(tmp_path):
+    """Bodies without a Content-Length are counted as they arrive and cut off at the cap."""
+    from fastapi.testclient import TestClient
+
+    service = UploadService(store=UploadStore(root=str(tmp_path), upload_dir=str(tmp_path)), max_request_bytes=4096)
+    app = make_limited_app(service)
+    boundary = "limit-test"
+    sent = []
+
+    def chunked_body(size: int):
+        yield f"--{boundary}\r\nContent-Disposition: form-data; name=\"files\"; filename=\"big.txt\"\r\n\r\n".encode()
+        for _ in range(size // 8192):
+            sent.append(8192)
+            yield b"a" * 8192
+        yield f"\r\n--{boundary}--\r\n".encode()
+
+    headers = {"Content-Type": f"multipart/form-data; boundary={boundary}"}
+    client = TestClient(app)
+
+    response = client.post("/upload", content=chunked_body(service.max_body_bytes + 8 * 8192), headers=headers)
+    assert response.status_code == 413
+    assert "larger than" in response.json()["detail"]
+    assert app.state.parsed == []
+
+    # Declared lengths over the cap are refused before the body is read
+    response = client.post("/upload", content=b"x", headers={**headers, "Content-Length": str(service.max_body_bytes + 1)})
+    assert response.status_code == 413
+
+    response = client.post("/upload", content=chunked_body(8192), headers=headers)
+    assert response.status_code == 200
+    assert app.state.parsed == [1]
@@ -0,0 +1,113 @@
+"""
+Tests for the content-addressed research upload store.
+"""
+import io
+import os
+import time
+
+import pytest
+from starlette.datastructures import UploadFile
+
+from src.agents.research_agent import ResearchAgent
+from src.services.research_extraction import ResearchExtractionService
+from src.services.upload_service import UploadService
+from src.services.upload_store import UploadStore
+
+
+def make_upload(content: bytes, filename: str) -> UploadFile:
+    return UploadFile(io.BytesIO(content), filename=filename)
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_identical_uploads_are_stored_once(tmp_path):
+    """Uploading the same content twice yields one file and one content ID."""
+    store = UploadStore(root=str(tmp_path / "store"), upload_dir=str(tmp_path))
+    service = UploadService(store=store)
+
+    first = await service.save(make_upload(b"Customers churn after onboarding", "interviews.txt"))
+    second = await service.save(make_upload(b"Customers churn after onboarding", "copy.txt"))
+
+    assert first.content_id == second.content_id
+    assert first.path == second.path == store.resolve(first.content_id)
+    stats = store.get_stats()
+    assert (stats["files"], stats["stored"], stats["deduplicated"]) == (1, 1, 1)
+    assert store.missing([first.content_id, "0" * 64, "../etc/passwd"]) == ["0" * 64, "../etc/passwd"]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_garbage_collection_keeps_referenced_uploads(tmp_path):
+    """Only uploads no active or recent journey references are removed."""
+    store = UploadStore(root=str(tmp_path / "store"), upload_dir=str(tmp_path), retention_seconds=3600, orphan_grace_seconds=0)
+    service = UploadService(store=store)
+    used = await service.save(make_upload(b"used by a journey", "used.txt"))
+    orphan = await service.save(make_upload(b"never attached", "orphan.txt"))
+    finished = await service.save(make_upload(b"journey finished long ago", "old.txt"))
+    open(used.path + ".extracted.txt", "w").close()
+    legacy = tmp_path / "3f2a.pdf"  # Named per upload before the store existed
+    legacy.write_bytes(b"%PDF-1.4")
+    os.utime(legacy, (time.time() - 7200, time.time() - 7200))
+
+    store.add_refs("job-1", [used.content_id])
+    store.add_refs("job-2", [finished.content_id])
+    store.release_refs("job-2")
+    conn = store._connect()
+    conn.execute("UPDATE upload_refs SET released_at = ? WHERE job_id = 'job-2'", (time.time() - 7200,))
+    conn.close()
+
+    assert store.collect_garbage() == 2
+    assert store.resolve(used.content_id) == used.path
+    assert store.resolve(orphan.content_id) is None and not os.path.exists(orphan.path)
+    assert store.resolve(finished.content_id) is None
+    assert not legacy.exists() and (tmp_path / "store" / "index.db").exists()
+
+    # Released within the retention period: kept for retries and re-runs
+    store.release_refs("job-1")
+    assert store.collect_garbage() == 0
+    assert os.path.exists(used.path + ".extracted.txt")
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_research_content_is_read_by_content_id(tmp_path, monkeypatch):
+    """The research step resolves content IDs to stored files."""
+    store = UploadStore(root=str(tmp_path / "store"), upload_dir=str(tmp_path))
+    monkeypatch.setattr("src.services.research_extraction.upload_store", store)
+    monkeypatch.setattr("src.agents.research_agent.upload_store", store)
+    stored = await UploadService(store=store).save(make_upload(b"Quote: setup took a week", "notes.txt"))
+
+    service = ResearchExtractionService(max_workers=1)
+    try:
+        extracted = await service.get_contents([stored.content_id, "f" * 64])
+    finally:
+        service.shutdown()
+    assert extracted[stored.content_id] == "Quote: setup took a week"
+    assert extracted["f" * 64].startswith("[File no longer available")
+
+    agent = ResearchAgent.__new__(ResearchAgent)
+    content = agent.extract_research_content({"uploaded_files": [stored.content_id]})
+    assert f"File: {stored.content_id[:12]}.txt (.txt)" in content
+    assert "setup took a week" in content
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_research_labels_use_uploaded_filenames(tmp_path, monkeypatch):
+    """Research passages are labelled with the journey's original filenames, not content hashes."""
+    store = UploadStore(root=str(tmp_path / "store"), upload_dir=str(tmp_path))
+    monkeypatch.setattr("src.agents.research_agent.upload_store", store)
+    service = UploadService(store=store)
+    first = await service.save(make_upload(b"Quote: onboarding was confusing", "interviews.txt"))
+    second = await service.save(make_upload(b"Quote: support answered quickly", "interviews.txt"))
+
+    agent = ResearchAgent.__new__(ResearchAgent)
+    content = agent.extract_research_content({
+        "uploaded_files": [first.content_id, second.content_id],
+        "files": [{"content_id": first.content_id, "filename": "interviews.txt"},
+                  {"content_id": second.content_id, "filename": "interviews.txt"}]
+    })
+
+    assert "File: interviews.txt (.txt)\n" in content
+    assert f"File: interviews.txt (.txt) [{second.content_id[:8]}]" in content
+    assert first.content_id[:12] not in content
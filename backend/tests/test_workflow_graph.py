@@ -0,0 +1,74 @@
+"""
+Tests for the dependency-graph workflow engine.
+"""
+import asyncio
+
+import pytest
+
+from src.agents.workflow_graph import WorkflowGraph, WorkflowNode
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_independent_nodes_run_concurrently():
+    """Nodes that only share inputs overlap; dependents wait for both."""
+    running = set()
+    overlapped = []
+
+    def node(key, inputs):
+        async def run(values):
+            running.add(key)
+            await asyncio.sleep(0.05)
+            overlapped.append(set(running))
+            running.discard(key)
+            return key + ":" + ",".join(str(values[name]) for name in inputs)
+        return WorkflowNode(key=key, inputs=inputs, run=run)
+
+    graph = WorkflowGraph([
+        node("a", ("form",)),
+        node("b", ("form",)),
+        node("c", ("a", "b")),
+    ], initial_inputs=("form",))
+
+    results = await graph.execute({"form": 1})
+
+    assert results["c"] == "c:a:1,b:1"
+    assert {"a", "b"} in overlapped
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_failing_node_cancels_running_siblings():
+    """A failure stops the graph and cancels work still in flight."""
+    cancelled = asyncio.Event()
+
+    async def slow(values):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def broken(values):
+        raise RuntimeError("step failed")
+
+    graph = WorkflowGraph([
+        WorkflowNode(key="slow", inputs=(), run=slow),
+        WorkflowNode(key="broken", inputs=(), run=broken),
+    ])
+
+    with pytest.raises(RuntimeError, match="step failed"):
+        await graph.execute({})
+    assert cancelled.is_set()
+
+
+@pytest.mark.unit
+def test_cycles_are_rejected():
+    async def noop(values):
+        return None
+
+    with pytest.raises(ValueError):
+        WorkflowGraph([
+            WorkflowNode(key="a", inputs=("b",), run=noop),
+            WorkflowNode(key="b", inputs=("a",), run=noop),
+        ])
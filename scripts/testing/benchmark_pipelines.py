@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+"""
+Benchmark the full (eight agent steps) and fast (structured calls) journey pipelines.
+
+Runs both pipelines on the same journey request and reports wall-clock latency,
+tokens, estimated cost and output completeness. Calls the real OpenAI API:
+OPENAI_API_KEY must be set, and each run costs money.
+
+Usage (from the repository root):
+    python scripts/testing/benchmark_pipelines.py --runs 3 --pipelines fast,full
+    python scripts/testing/benchmark_pipelines.py --research path/to/interviews.pdf --json results.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "backend"))
+
+from src.agents.crew_coordinator import CrewCoordinator  # noqa: E402
+from src.models.auth import UserProfile  # noqa: E402
+from src.models.journey import JourneyFormData  # noqa: E402
+from src.services.job_manager import JobManager  # noqa: E402
+
+SAMPLE_FORM = {
+    "title": "Digital Bank Onboarding",
+    "industry": "Fintech",
+    "businessGoals": "Increase completed sign-ups and first deposits within 7 days",
+    "targetPersonas": ["Young professionals", "Small business owners"],
+    "journeyPhases": ["Awareness", "Consideration", "Sign-up", "First Deposit", "Retention"],
+    "additionalContext": "Mobile-first bank, KYC requires an ID photo and a selfie",
+}
+
+# Markers of the full pipeline's template output, counted as missing content
+PLACEHOLDER_MARKERS = ("ai-generated", "ai generated", "generated by crewai", "identified by ai", "touchpoint for ")
+
+
+def completeness(journey_map, form_data: dict) -> float:
+    """Share of expected persona and phase fields that hold real, non-placeholder content"""
+    def filled(value) -> bool:
+        values = value if isinstance(value, list) else [value]
+        text = " ".join(str(v) for v in values if v).strip().lower()
+        return bool(text) and not any(marker in text for marker in PLACEHOLDER_MARKERS)
+
+    checks = []
+    for persona in journey_map.personas:
+        checks += [filled(persona.name), filled(persona.occupation), filled(persona.goals),
+                   filled(persona.pain_points), filled(persona.quote)]
+    for phase in journey_map.phases:
+        checks += [filled(phase.actions), filled(phase.touchpoints), filled(phase.emotions),
+                   filled(phase.pain_points), filled(phase.opportunities), filled(phase.customer_quote)]
+    # Missing personas or phases count as empty fields
+    checks += [False] * 5 * max(0, len(form_data["target_personas"]) - len(journey_map.personas))
+    checks += [False] * 6 * max(0, len(form_data["journey_phases"]) - len(journey_map.phases))
+    return sum(checks) / len(checks) if checks else 0.0
+
+
+async def run_once(pipeline: str, form_data: dict) -> dict:
+    user = UserProfile(id="benchmark", email="benchmark@example.com", plan_type="pro",
+                       openai_api_key=os.getenv("OPENAI_API_KEY"), created_at=datetime.now(), updated_at=datetime.now())
+    coordinator = CrewCoordinator(user)
+    coordinator.ledger.budget = 0  # Measure, do not enforce
+    execute = coordinator.execute_fast_workflow if pipeline == "fast" else coordinator.execute_workflow
+    started = time.monotonic()
+    try:
+        result = await execute(form_data)
+    finally:
+        coordinator.close()
+    elapsed = time.monotonic() - started
+    journey_map = JobManager._convert_to_journey_map(result)
+    totals = coordinator.ledger.summary()["totals"]
+    return {
+        "pipeline": pipeline,
+        "latency_seconds": round(elapsed, 1),
+        "llm_requests": totals["requests"],
+        "total_tokens": totals["total_tokens"],
+        "cost_usd": totals["cost_usd"],
+        "completeness": round(completeness(journey_map, form_data), 3),
+    }
+
+
+def summarize(runs: list) -> dict:
+    return {
+        "runs": len(runs),
+        **{f"median_{name}": statistics.median(run[name] for run in runs)
+           for name in ("latency_seconds", "llm_requests", "total_tokens", "cost_usd", "completeness")},
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=1, help="Runs per pipeline")
+    parser.add_argument("--pipelines", default="fast,full", help="Comma-separated pipelines to compare")
+    parser.add_argument("--research", nargs="*", default=[], help="Research files to include")
+    parser.add_argument("--json", help="Write all runs and the summary to this file")
+    args = parser.parse_args()
+
+    if not os.getenv("OPENAI_API_KEY"):
+        sys.exit("OPENAI_API_KEY is required")
+
+    form_data = JourneyFormData(**SAMPLE_FORM, uploaded_files=[os.path.abspath(p) for p in args.research] or None).dict()
+    results = {}
+    for pipeline in args.pipelines.split(","):
+        runs = []
+        for i in range(args.runs):
+            run = await run_once(pipeline.strip(), form_data)
+            print(f"{pipeline} run {i + 1}: {run}")
+            runs.append(run)
+        results[pipeline] = {"runs": runs, "summary": summarize(runs)}
+
+    print(f"\n{'pipeline':<10}{'latency s':>12}{'requests':>10}{'tokens':>10}{'cost $':>10}{'complete':>10}")
+    for pipeline, result in results.items():
+        s = result["summary"]
+        print(f"{pipeline:<10}{s['median_latency_seconds']:>12}{s['median_llm_requests']:>10}"
+              f"{s['median_total_tokens']:>10}{s['median_cost_usd']:>10.4f}{s['median_completeness']:>10.0%}")
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
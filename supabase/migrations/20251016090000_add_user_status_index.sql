@@ -0,0 +1,10 @@
+-- Migration: Index user_journeys for per-user in-progress lookups
+-- Created at: 2025-10-16 09:00:00
+
+-- Up
+-- Supports the "does this user already have a running journey" check on journey creation
+CREATE INDEX IF NOT EXISTS idx_user_journeys_user_status_created
+  ON public.user_journeys (user_id, status, created_at DESC);
+
+-- Down
+-- DROP INDEX IF EXISTS public.idx_user_journeys_user_status_created;
@@ -0,0 +1,34 @@
+-- Migration: Batched progress updates for user_journeys
+-- Created at: 2025-10-16 10:00:00
+
+-- Up
+-- Applies the latest status/progress of many jobs in a single call.
+-- updates is a JSON array of {"job_id": text, "status": text, "progress_data": jsonb}.
+-- Runs with the caller's rights and is only executable by the service role the
+-- backend uses, so the public anon key cannot update other users' journeys.
+CREATE OR REPLACE FUNCTION public.update_journey_progress_batch(updates jsonb)
+RETURNS integer
+LANGUAGE plpgsql
+SECURITY INVOKER
+SET search_path = public
+AS $$
+DECLARE
+  updated_count integer;
+BEGIN
+  UPDATE public.user_journeys AS uj
+  SET status = u.status,
+      progress_data = u.progress_data,
+      updated_at = now()
+  FROM jsonb_to_recordset(updates) AS u(job_id text, status text, progress_data jsonb)
+  WHERE uj.job_id = u.job_id;
+
+  GET DIAGNOSTICS updated_count = ROW_COUNT;
+  RETURN updated_count;
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION public.update_journey_progress_batch(jsonb) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.update_journey_progress_batch(jsonb) TO service_role;
+
+-- Down
+-- DROP FUNCTION IF EXISTS public.update_journey_progress_batch(jsonb);
@@ -0,0 +1,11 @@
+-- Migration: Store workflow step checkpoints on user_journeys
+-- Created at: 2025-10-16 11:00:00
+
+-- Up
+-- Outputs of completed workflow steps, keyed by step (context_analysis, personas, ...).
+-- Lets a restarted backend resume a journey from its first incomplete step.
+ALTER TABLE public.user_journeys
+  ADD COLUMN IF NOT EXISTS checkpoint_data JSONB;
+
+-- Down
+-- ALTER TABLE public.user_journeys DROP COLUMN IF EXISTS checkpoint_data;